@@ -1,41 +1,86 @@
-import pyaudio
-import wave
-from transformers import (
-    WhisperForConditionalGeneration,
-    WhisperProcessor,
-    MarianMTModel,
-    MarianTokenizer,
-)
-import torch
-import soundfile as sf
-import librosa
+import argparse
+import json
+import os
+import queue
+import threading
 import time
-import pyttsx3  # Thêm thư viện TTS
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
 
-# Khởi tạo các mô hình toàn cục để tái sử dụng
-WHISPER_MODEL_PATH = r"C:\PROJECTS\S2T_model\PhoWhisper-small"
-TRANSLATION_MODEL_PATH = r"C:\PROJECTS\S2T_model\opus-mt-vi-en"
+import torch
 
-# Tải mô hình PhoWhisper một lần duy nhất
-print("Đang tải mô hình PhoWhisper từ local...")
-whisper_processor = WhisperProcessor.from_pretrained(WHISPER_MODEL_PATH)
-whisper_model = WhisperForConditionalGeneration.from_pretrained(WHISPER_MODEL_PATH)
+# Dùng chung các hàm xử lý âm thanh (VAD, cắt cửa sổ) với backend
+BACKEND_DIR = Path(__file__).resolve().parent / "trans_app_backend"
+sys.path.insert(0, str(BACKEND_DIR))
+from api.audio import (  # noqa: E402
+    WHISPER_SAMPLE_RATE,
+    WHISPER_WINDOW_SECONDS,
+    decode_audio,
+    detect_speech,
+    split_windows,
+    stitch_transcripts,
+)
+from api.decoding import (  # noqa: E402
+    DEFAULT_PROFILE,
+    PROFILES,
+    translation_generate_kwargs,
+    whisper_generate_kwargs,
+)
+from api.text import (  # noqa: E402
+    MAX_INPUT_TOKENS,
+    length_buckets,
+    reassemble,
+    segment_text,
+)
 
-# Tải mô hình dịch thuật một lần duy nhất
-print("Đang tải mô hình dịch thuật từ local...")
-translation_tokenizer = MarianTokenizer.from_pretrained(TRANSLATION_MODEL_PATH)
-translation_model = MarianMTModel.from_pretrained(TRANSLATION_MODEL_PATH)
+# Đường dẫn mô hình: tham số dòng lệnh > biến môi trường > thư mục models của backend
+WHISPER_MODEL_PATH = os.getenv(
+    "WHISPER_MODEL_PATH", str(BACKEND_DIR / "models" / "PhoWhisper-small")
+)
+TRANSLATION_MODEL_PATH = os.getenv(
+    "TRANSLATION_MODEL_PATH", str(BACKEND_DIR / "models" / "opus-mt-vi-en")
+)
+# Profile giải mã giống backend: "fast" (greedy), "balanced" hoặc "accurate"
+DECODING_PROFILE = DEFAULT_PROFILE
+# Đoạn nói dài hơn 30s được cắt thành các cửa sổ chồng lấn
+OVERLAP_SECONDS = 5.0
+AUDIO_EXTENSIONS = {".wav", ".flac", ".ogg", ".opus", ".mp3", ".m4a"}
 
-# Chuyển mô hình sang GPU nếu có
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-whisper_model = whisper_model.to(device)
-translation_model = translation_model.to(device)
-whisper_model.eval()  # Chuyển sang chế độ suy luận
-translation_model.eval()
+whisper_processor = whisper_model = None
+translation_tokenizer = translation_model = None
+
+
+# Tải mô hình một lần duy nhất, chỉ khi thật sự cần
+def load_models(whisper_path=None, translation_path=None, need_translation=True):
+    global whisper_processor, whisper_model, translation_tokenizer, translation_model
+    from transformers import (
+        MarianMTModel,
+        MarianTokenizer,
+        WhisperForConditionalGeneration,
+        WhisperProcessor,
+    )
+
+    if whisper_model is None:
+        path = whisper_path or WHISPER_MODEL_PATH
+        print(f"Đang tải mô hình PhoWhisper từ {path}...")
+        whisper_processor = WhisperProcessor.from_pretrained(path)
+        whisper_model = WhisperForConditionalGeneration.from_pretrained(path)
+        whisper_model = whisper_model.to(device).eval()  # Chế độ suy luận
+    if need_translation and translation_model is None:
+        path = translation_path or TRANSLATION_MODEL_PATH
+        print(f"Đang tải mô hình dịch thuật từ {path}...")
+        translation_tokenizer = MarianTokenizer.from_pretrained(path)
+        translation_model = MarianMTModel.from_pretrained(path)
+        translation_model = translation_model.to(device).eval()
 
 
 # Bước 1: Ghi âm trực tiếp
 def record_audio(output_filename="recording.wav", record_seconds=5):
+    import pyaudio
+
     CHUNK = 1024
     FORMAT = pyaudio.paInt16
     CHANNELS = 1
@@ -74,60 +119,129 @@ def record_audio(output_filename="recording.wav", record_seconds=5):
 
 
 # Bước 2: Speech-to-Text với PhoWhisper
+def speech_pieces(audio):
+    """Bỏ khoảng lặng, tách theo quãng nghỉ dài; mỗi đoạn nói là list cửa sổ (start_s, end_s, samples) <= 30s."""
+    pieces = []
+    for start, end in detect_speech(audio, WHISPER_SAMPLE_RATE):
+        offset = start / WHISPER_SAMPLE_RATE
+        windows = split_windows(
+            audio[start:end],
+            WHISPER_SAMPLE_RATE,
+            window_s=WHISPER_WINDOW_SECONDS,
+            overlap_s=OVERLAP_SECONDS,
+        )
+        pieces.append([(offset + s, offset + e, samples) for s, e, samples in windows])
+    return pieces
+
+
+def transcribe_pieces(pieces, batch_size=8):
+    """Phiên âm mọi cửa sổ theo batch rồi ghép lại; trả về một đoạn văn bản cho mỗi đoạn nói."""
+    windows = [samples for piece in pieces for _, _, samples in piece]
+    texts = []
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i:i + batch_size]
+        # Mỗi cửa sổ là một phần tử của batch; log-mel luôn được đệm về 30s
+        input_features = whisper_processor(
+            batch, sampling_rate=WHISPER_SAMPLE_RATE, return_tensors="pt"
+        ).input_features
+        input_features = input_features.to(device)
+
+        # Số beam và giới hạn token theo profile, tính từ đoạn dài nhất
+        longest = max(len(w) for w in batch) / WHISPER_SAMPLE_RATE
+        with torch.no_grad():
+            predicted_ids = whisper_model.generate(
+                input_features,
+                language="vi",
+                **whisper_generate_kwargs(DECODING_PROFILE, longest),
+            )
+        texts += whisper_processor.batch_decode(predicted_ids, skip_special_tokens=True)
+
+    texts = iter(text.strip() for text in texts)
+    return [stitch_transcripts([next(texts) for _ in piece]) for piece in pieces]
+
+
 def speech_to_text(audio_path):
     start_time = time.time()
     print("Đang chuyển giọng nói thành văn bản...")
 
-    # Đọc file âm thanh bằng soundfile (nhanh hơn librosa)
-    audio, sample_rate = sf.read(audio_path)
-    if sample_rate != 16000:
-        audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=16000)
-
-    # Chuyển đổi âm thanh thành input cho mô hình
-    input_features = whisper_processor(
-        audio, sampling_rate=16000, return_tensors="pt"
-    ).input_features
-    input_features = input_features.to(device)
-
-    # Tạo văn bản với greedy decoding (nhanh hơn beam search)
-    with torch.no_grad():
-        predicted_ids = whisper_model.generate(
-            input_features, language="vi", num_beams=1
-        )
-    text_vi = whisper_processor.batch_decode(predicted_ids, skip_special_tokens=True)[0]
+    audio = decode_audio(audio_path, WHISPER_SAMPLE_RATE)
+    pieces = speech_pieces(audio)
+    if not pieces:
+        print("Không phát hiện giọng nói, bỏ qua mô hình.")
+        return ""
+    text_vi = " ".join(filter(None, transcribe_pieces(pieces)))
 
     print(f"Thời gian xử lý speech-to-text: {time.time() - start_time:.2f} giây")
     return text_vi
 
 
 # Bước 3: Dịch từ tiếng Việt sang tiếng Anh
+def translate_sentences(sentences, max_batch_size=16):
+    # Dịch theo batch gom các câu có độ dài gần nhau,
+    # tránh vượt giới hạn 512 token và bị cắt mất nội dung
+    if not sentences:
+        return []
+    lengths = [
+        len(ids)
+        for ids in translation_tokenizer(
+            sentences, truncation=True, max_length=MAX_INPUT_TOKENS
+        )["input_ids"]
+    ]
+    translations = [""] * len(sentences)
+    for bucket in length_buckets(lengths, max_batch_size=max_batch_size):
+        inputs = translation_tokenizer(
+            [sentences[i] for i in bucket],
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=MAX_INPUT_TOKENS,
+        )
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+
+        kwargs = translation_generate_kwargs(
+            DECODING_PROFILE, inputs["input_ids"].shape[1]
+        )
+        with torch.no_grad():
+            translated = translation_model.generate(**inputs, **kwargs)
+        decoded = translation_tokenizer.batch_decode(translated, skip_special_tokens=True)
+        for i, text in zip(bucket, decoded):
+            translations[i] = text
+    return translations
+
+
 def translate_vi_to_en(text_vi):
     start_time = time.time()
     print("Đang dịch từ tiếng Việt sang tiếng Anh...")
 
-    # Tokenize và dịch
-    inputs = translation_tokenizer(
-        text_vi, return_tensors="pt", padding=True, truncation=True
-    )
-    inputs = {k: v.to(device) for k, v in inputs.items()}
-
-    with torch.no_grad():
-        translated = translation_model.generate(**inputs)
-    text_en = translation_tokenizer.decode(translated[0], skip_special_tokens=True)
+    paragraphs = segment_text(text_vi)
+    sentences = [sentence for sentences in paragraphs for sentence in sentences]
+    text_en = reassemble(paragraphs, translate_sentences(sentences))
 
     print(f"Thời gian xử lý dịch thuật: {time.time() - start_time:.2f} giây")
     return text_en
 
 
 # Bước 4: Text-to-Speech với pyttsx3
+_tts_engine = None
+
+
+def get_tts_engine():
+    # Khởi tạo engine TTS một lần, dùng lại cho các lần đọc sau
+    global _tts_engine
+    if _tts_engine is None:
+        import pyttsx3
+
+        _tts_engine = pyttsx3.init()
+        _tts_engine.setProperty("rate", 150)  # Tốc độ đọc (words per minute)
+        _tts_engine.setProperty("volume", 0.9)  # Âm lượng (0.0 đến 1.0)
+    return _tts_engine
+
+
 def text_to_speech(text_en):
     start_time = time.time()
     print("Đang đọc văn bản tiếng Anh...")
 
-    # Khởi tạo engine TTS
-    engine = pyttsx3.init()
-    engine.setProperty("rate", 150)  # Tốc độ đọc (words per minute)
-    engine.setProperty("volume", 0.9)  # Âm lượng (0.0 đến 1.0)
+    engine = get_tts_engine()
 
     # Đọc văn bản
     engine.say(text_en)
@@ -136,10 +250,167 @@ def text_to_speech(text_en):
     print(f"Thời gian xử lý text-to-speech: {time.time() - start_time:.2f} giây")
 
 
-# Pipeline chính
-def main():
+# Chế độ batch: xử lý hàng loạt file, không cần micro/loa
+def collect_inputs(inputs, manifest=None):
+    """(id, đường dẫn) của từng file: file lẻ, thư mục (quét đệ quy) và manifest."""
+    items = []
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            for file in sorted(p for p in path.rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS):
+                items.append((file.relative_to(path).as_posix(), file))
+        else:
+            items.append((path.as_posix(), path))
+    if manifest:
+        # Mỗi dòng là một đường dẫn hoặc JSON {"path": ..., "id": ...}; đường dẫn tương đối tính từ manifest
+        base = Path(manifest).parent
+        with open(manifest, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                record = json.loads(line) if line.startswith("{") else {"path": line}
+                path = Path(record["path"])
+                items.append((record.get("id") or record["path"], path if path.is_absolute() else base / path))
+    return items
+
+
+def load_checkpoint(output_path):
+    # File JSONL kết quả chính là checkpoint: bỏ qua các id đã xử lý thành công
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # dòng cuối có thể bị ghi dở khi tiến trình bị dừng
+            if not record.get("error"):
+                done.add(record["id"])
+    return done
+
+
+def drain(source, limit):
+    """Lấy một phần tử (chờ) rồi thêm những gì đã sẵn có, tối đa `limit`; None đánh dấu hết dữ liệu."""
+    batch = [source.get()]
+    while len(batch) < limit and batch[-1] is not None:
+        try:
+            batch.append(source.get_nowait())
+        except queue.Empty:
+            break
+    finished = batch[-1] is None
+    if finished:
+        batch.pop()
+    return batch, finished
+
+
+def run_batch(args):
+    items = collect_inputs(args.inputs, args.manifest)
+    done = load_checkpoint(args.output)
+    pending = [(item_id, path) for item_id, path in items if item_id not in done]
+    print(f"{len(items)} file, {len(items) - len(pending)} đã xong, còn {len(pending)}.")
+    if not pending:
+        return
+
+    torch.set_num_threads(args.threads)
+    load_models(args.whisper_model, args.translation_model, need_translation=not args.no_translate)
+
+    # Giải mã (thread pool) -> [decoded] -> Whisper -> [transcribed] -> Marian + ghi JSONL.
+    # `slots` giới hạn số file đang nằm trong pipeline nên bộ nhớ không tăng theo số file.
+    decoded = queue.Queue()
+    transcribed = queue.Queue()
+    slots = threading.BoundedSemaphore(args.queue_size)
+
+    def decode(item_id, path):
+        record = {"id": item_id, "path": str(path), "error": None, "begin": time.time()}
+        try:
+            audio = decode_audio(str(path), WHISPER_SAMPLE_RATE)
+            record["duration"] = round(len(audio) / WHISPER_SAMPLE_RATE, 2)
+            record["pieces"] = speech_pieces(audio)
+        except Exception as e:
+            record["error"] = f"decode: {e}"
+        decoded.put(record)
+
+    def produce():
+        with ThreadPoolExecutor(max_workers=args.decode_workers) as pool:
+            for item_id, path in pending:
+                slots.acquire()
+                pool.submit(decode, item_id, path)
+        decoded.put(None)
+
+    def transcribe_stage():
+        finished = False
+        while not finished:
+            # Gom vài file đã giải mã để các cửa sổ của chúng chạy chung batch
+            batch, finished = drain(decoded, args.batch_files)
+            ok = [record for record in batch if not record["error"]]
+            try:
+                pieces = [record["pieces"] for record in ok]
+                texts = iter(transcribe_pieces([p for file_pieces in pieces for p in file_pieces], args.batch_size))
+                for record, file_pieces in zip(ok, pieces):
+                    record["segments"] = [
+                        {"start": round(piece[0][0], 2), "end": round(piece[-1][1], 2), "text": next(texts)}
+                        for piece in file_pieces
+                    ]
+                    record["transcription"] = " ".join(s["text"] for s in record["segments"] if s["text"])
+            except Exception as e:
+                for record in ok:
+                    record["error"] = f"transcribe: {e}"
+            for record in batch:
+                record.pop("pieces", None)
+                transcribed.put(record)
+        transcribed.put(None)
+
+    threading.Thread(target=produce, name="batch-producer", daemon=True).start()
+    threading.Thread(target=transcribe_stage, name="batch-whisper", daemon=True).start()
+
+    started = time.time()
+    succeeded = failed = 0
+    with open(args.output, "a", encoding="utf-8") as out:
+        finished = False
+        while not finished:
+            batch, finished = drain(transcribed, args.batch_files)
+            ok = [record for record in batch if not record["error"]]
+            if not args.no_translate and ok:
+                # Câu của cả nhóm file được dịch chung, chia batch theo độ dài
+                layouts = [segment_text(record["transcription"]) for record in ok]
+                sentences = [s for paragraphs in layouts for p in paragraphs for s in p]
+                try:
+                    translations = iter(translate_sentences(sentences, args.batch_size * 2))
+                    for record, paragraphs in zip(ok, layouts):
+                        count = sum(len(p) for p in paragraphs)
+                        record["translation"] = reassemble(paragraphs, [next(translations) for _ in range(count)])
+                except Exception as e:
+                    for record in ok:
+                        record["error"] = f"translate: {e}"
+
+            # Ghi ngay khi xong, fsync để checkpoint không mất khi tiến trình bị dừng
+            for record in batch:
+                record["elapsed"] = round(time.time() - record.pop("begin"), 2)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if record["error"]:
+                    failed += 1
+                else:
+                    succeeded += 1
+                slots.release()
+            out.flush()
+            os.fsync(out.fileno())
+
+            processed = succeeded + failed
+            if batch:
+                rate = processed / (time.time() - started)
+                print(f"{processed}/{len(pending)} file ({failed} lỗi), {rate:.2f} file/giây")
+
+    print(f"Hoàn tất: {succeeded} thành công, {failed} lỗi -> {args.output}")
+
+
+# Pipeline chính (ghi âm trực tiếp)
+def run_interactive(args):
+    load_models(args.whisper_model, args.translation_model)
+
     # Ghi âm
-    audio_file = record_audio(record_seconds=10)  # Ghi âm 10 giây
+    audio_file = record_audio(record_seconds=args.seconds)
     if audio_file is None:
         print("Không thể ghi âm. Kiểm tra micro và thử lại.")
         return
@@ -152,6 +423,8 @@ def main():
     except Exception as e:
         print(f"Lỗi khi chuyển giọng nói thành văn bản: {e}")
         return
+    if not text_vi:
+        return
 
     # Dịch thuật
     try:
@@ -169,5 +442,40 @@ def main():
         return
 
 
+def main(argv=None):
+    global DECODING_PROFILE
+
+    parser = argparse.ArgumentParser(
+        description="Ghi âm -> PhoWhisper -> MarianMT -> đọc (mặc định), hoặc xử lý hàng loạt file với 'batch'."
+    )
+    parser.add_argument("--whisper-model", default=WHISPER_MODEL_PATH, help="Thư mục mô hình PhoWhisper")
+    parser.add_argument("--translation-model", default=TRANSLATION_MODEL_PATH, help="Thư mục mô hình dịch")
+    parser.add_argument("--profile", default=DECODING_PROFILE, choices=list(PROFILES), help="Profile giải mã")
+    parser.add_argument("--seconds", type=float, default=10, help="Thời gian ghi âm (chế độ tương tác)")
+    commands = parser.add_subparsers(dest="command")
+
+    batch = commands.add_parser(
+        "batch", help="Phiên âm/dịch hàng loạt file âm thanh ra JSONL (chạy lại sẽ tiếp tục từ checkpoint)"
+    )
+    batch.add_argument("inputs", nargs="*", help="File hoặc thư mục âm thanh (quét đệ quy)")
+    batch.add_argument("--manifest", help='Danh sách file: mỗi dòng một đường dẫn hoặc JSON {"path", "id"}')
+    batch.add_argument("-o", "--output", required=True, help="File JSONL kết quả (cũng là checkpoint)")
+    batch.add_argument("--no-translate", action="store_true", help="Chỉ phiên âm")
+    batch.add_argument("--batch-size", type=int, default=8, help="Số cửa sổ 30s mỗi lần chạy Whisper")
+    batch.add_argument("--batch-files", type=int, default=8, help="Số file gom lại mỗi lượt")
+    batch.add_argument("--decode-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    batch.add_argument("--queue-size", type=int, default=32, help="Số file tối đa đang nằm trong pipeline")
+    batch.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="Số luồng torch")
+
+    args = parser.parse_args(argv)
+    DECODING_PROFILE = args.profile
+    if args.command == "batch":
+        if not args.inputs and not args.manifest:
+            parser.error("batch cần ít nhất một file/thư mục hoặc --manifest")
+        run_batch(args)
+    else:
+        run_interactive(args)
+
+
 if __name__ == "__main__":
     main()
@@ -1,3 +1,22 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from .cache import translation_cache
+from .models import TranslationCacheEntry
+
+
+@admin.register(TranslationCacheEntry)
+class TranslationCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('source_text', 'translation', 'model_version', 'created_at')
+    list_filter = ('model_version',)
+    search_fields = ('source_text',)
+    actions = ['invalidate_stale', 'invalidate_all']
+
+    @admin.action(description="Invalidate entries from other model versions")
+    def invalidate_stale(self, request, queryset):
+        deleted = translation_cache.invalidate(stale_only=True)
+        self.message_user(request, f"Removed {deleted} stale cached translations", messages.SUCCESS)
+
+    @admin.action(description="Invalidate the whole translation cache")
+    def invalidate_all(self, request, queryset):
+        deleted = translation_cache.invalidate()
+        self.message_user(request, f"Removed {deleted} cached translations", messages.SUCCESS)
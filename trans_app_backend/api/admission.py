@@ -0,0 +1,146 @@
+import asyncio
+import collections
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; `retry_after` is a hint in whole seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded concurrency in front of one model.
+
+    At most `max_in_flight` requests run at once; up to `max_queue` more
+    wait in FIFO order for a free slot. A request is shed (Overloaded)
+    instead of queued when the queue is full, or when the expected wait,
+    estimated from the queue position and a moving average of recent
+    service times, is longer than `max_wait`; a queued request that still
+    has no slot after `max_wait` seconds is shed too. Rejecting early keeps
+    the latency of admitted requests bounded when the server is overloaded.
+    """
+
+    def __init__(self, name, max_in_flight, max_queue, max_wait):
+        self.name = name
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = max(0.0, float(max_wait))
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self._in_flight = 0
+        self._service_time = None  # EWMA (giây)
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.timed_out = 0
+
+    def _estimated_wait(self, position):
+        # Mỗi slot giải phóng sau trung bình `service_time`; vị trí `position` chờ khoảng position / slots lượt
+        service_time = self._service_time or 0.0
+        return math.ceil(position / self.max_in_flight) * service_time
+
+    def _retry_after(self, position):
+        return max(1, math.ceil(self._estimated_wait(position)))
+
+    @contextmanager
+    def admit(self):
+        self._acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def admit_async(self):
+        """`admit` for asyncio code: waiting for a slot happens in a worker thread, not on the event loop."""
+        future = asyncio.get_running_loop().run_in_executor(None, self._acquire)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Task bị hủy khi luồng vẫn đang chờ: trả lại slot nếu luồng lấy được
+            future.add_done_callback(lambda f: f.cancelled() or f.exception() or self._release(0.0))
+            raise
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self.admitted += 1
+                return
+            position = len(self._waiters) + 1
+            if len(self._waiters) >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise Overloaded(f"{self.name} is overloaded (queue full)", self._retry_after(position))
+            if self._estimated_wait(position) > self.max_wait:
+                self.rejected_deadline += 1
+                raise Overloaded(
+                    f"{self.name} is overloaded (expected wait over {self.max_wait:g}s)", self._retry_after(position)
+                )
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+
+        if waiter.wait(self.max_wait):
+            return
+        with self._lock:
+            if waiter.is_set():  # slot được trao ngay lúc hết hạn
+                return
+            self._waiters.remove(waiter)
+            self.timed_out += 1
+            raise Overloaded(f"{self.name} is overloaded (waited {self.max_wait:g}s)", self._retry_after(position))
+
+    def _release(self, elapsed):
+        with self._lock:
+            if self._service_time is None:
+                self._service_time = elapsed
+            else:
+                self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            if self._waiters:
+                # Trao slot trực tiếp cho người chờ lâu nhất (in_flight giữ nguyên)
+                self._waiters.popleft().set()
+                self.admitted += 1
+            else:
+                self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+                'queue_depth': len(self._waiters),
+                'max_queue': self.max_queue,
+                'max_wait': self.max_wait,
+                'avg_service_ms': round(self._service_time * 1000, 1) if self._service_time is not None else None,
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_deadline': self.rejected_deadline,
+                'timed_out': self.timed_out,
+            }
+
+
+whisper_admission = AdmissionController(
+    'whisper',
+    max_in_flight=settings.WHISPER_MAX_IN_FLIGHT,
+    max_queue=settings.WHISPER_ADMISSION_QUEUE,
+    max_wait=settings.ADMISSION_MAX_WAIT,
+)
+translation_admission = AdmissionController(
+    'translation',
+    max_in_flight=settings.TRANSLATION_MAX_IN_FLIGHT,
+    max_queue=settings.TRANSLATION_ADMISSION_QUEUE,
+    max_wait=settings.ADMISSION_MAX_WAIT,
+)
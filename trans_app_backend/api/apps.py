@@ -1,6 +1,32 @@
+import os
+import sys
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+def is_serving():
+    # Chỉ warm-up khi chạy server, không phải migrate/shell/test...
+    if os.environ.get('TRANS_APP_SERVING') == '1':
+        return True
+    if len(sys.argv) > 1 and sys.argv[1] == 'runserver':
+        # Với autoreloader, chỉ tiến trình con (RUN_MAIN) phục vụ request
+        return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+    return False
 
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        if not is_serving():
+            return
+        from trans_app.discovery import publish_base_url
+
+        threading.Thread(target=publish_base_url, name="publish-base-url", daemon=True).start()
+        if settings.MODEL_WARMUP:
+            from .inference import warm_up
+
+            warm_up()
@@ -0,0 +1,182 @@
+import hashlib
+import re
+from difflib import SequenceMatcher
+
+import numpy as np
+import soundfile as sf
+
+# Whisper chỉ nhìn được 30 giây âm thanh mỗi lần
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_WINDOW_SECONDS = 30.0
+
+
+def split_windows(audio, sample_rate=WHISPER_SAMPLE_RATE, window_s=WHISPER_WINDOW_SECONDS, overlap_s=5.0):
+    """
+    Split a waveform into overlapping windows.
+
+    Returns a list of (start_s, end_s, samples) tuples. Samples are slices of
+    the input array, so no audio is copied.
+    """
+    window = int(window_s * sample_rate)
+    step = window - int(overlap_s * sample_rate)
+    if step <= 0:
+        raise ValueError("overlap_s must be smaller than window_s")
+
+    total = len(audio)
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window, total)
+        windows.append((start / sample_rate, end / sample_rate, audio[start:end]))
+        if end >= total:
+            break
+        start += step
+    return windows
+
+
+def resample(audio, orig_sr, target_sr=WHISPER_SAMPLE_RATE):
+    """Band-limited FFT resampling (no extra dependency, no aliasing when downsampling)."""
+    if orig_sr == target_sr or len(audio) == 0:
+        return audio
+    n_out = int(round(len(audio) * target_sr / orig_sr))
+    spectrum = np.fft.rfft(audio)
+    # irfft cắt bớt (hạ mẫu) hoặc đệm 0 (tăng mẫu) phổ về đúng độ dài đầu ra
+    out = np.fft.irfft(spectrum[:n_out // 2 + 1], n=n_out) * (n_out / len(audio))
+    return out.astype(np.float32, copy=False)
+
+
+def decode_audio(source, target_sr=WHISPER_SAMPLE_RATE):
+    """
+    Decode an audio file straight into a mono float32 array at `target_sr`.
+
+    `source` may be a path or a seekable file-like object (e.g. an uploaded
+    file). libsndfile handles WAV/FLAC/OGG without touching the disk; other
+    formats fall back to pydub (ffmpeg).
+    """
+    try:
+        audio, sample_rate = sf.read(source, dtype='float32', always_2d=True)
+        audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    except sf.LibsndfileError:
+        import pydub
+
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        segment = pydub.AudioSegment.from_file(source).set_channels(1)
+        scale = float(1 << (8 * segment.sample_width - 1))
+        audio = np.asarray(segment.get_array_of_samples(), dtype=np.float32) / scale
+        sample_rate = segment.frame_rate
+    return resample(audio, sample_rate, target_sr)
+
+
+def audio_fingerprint(audio, *extra):
+    """sha256 of the float32 PCM samples (plus any extra key parts)."""
+    digest = hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32))
+    for part in extra:
+        digest.update(str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def frame_energy_db(audio, sample_rate=WHISPER_SAMPLE_RATE, frame_ms=30):
+    """Return the RMS energy (dBFS) of consecutive non-overlapping frames."""
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    count = len(audio) // frame
+    if count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = np.asarray(audio[:count * frame], dtype=np.float32).reshape(count, frame)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_threshold(energy, threshold_db=-45.0, margin_db=10.0):
+    """
+    Energy (dBFS) above which a frame counts as speech: `threshold_db`, raised
+    to the noise floor (10th percentile) plus `margin_db` when the frames
+    contain real quiet stretches (90th percentile more than `margin_db` above
+    the floor).
+    """
+    noise_floor, loud = np.percentile(energy, [10, 90])
+    if loud - noise_floor > margin_db:
+        return max(threshold_db, noise_floor + margin_db)
+    return threshold_db
+
+
+def detect_speech(audio, sample_rate=WHISPER_SAMPLE_RATE, threshold_db=-45.0, margin_db=10.0,
+                  min_silence_s=0.6, min_speech_s=0.15, pad_s=0.2, frame_ms=30):
+    """
+    Energy-based voice activity detection.
+
+    A frame counts as speech when its energy is above both `threshold_db` and
+    the estimated noise floor plus `margin_db`. The noise floor (10th
+    percentile) is only used when the clip has real quiet stretches, i.e. the
+    90th percentile is more than `margin_db` above it; a clip that is voiced
+    from start to end is judged by `threshold_db` alone. Speech runs
+    separated by less than `min_silence_s` are merged; longer pauses split
+    the audio. Returns a list of (start, end) sample indices, empty when the
+    clip is silent.
+    """
+    energy = frame_energy_db(audio, sample_rate, frame_ms)
+    if energy.size == 0:
+        return []
+
+    voiced = energy > speech_threshold(energy, threshold_db, margin_db)
+    if not voiced.any():
+        return []
+
+    # Tìm các đoạn liên tiếp có tiếng nói (theo đơn vị frame)
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    frame = int(sample_rate * frame_ms / 1000)
+    max_gap = int(np.ceil(min_silence_s * 1000 / frame_ms))
+    runs = [[starts[0], ends[0]]]
+    for start, end in zip(starts[1:], ends[1:]):
+        if start - runs[-1][1] < max_gap:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end])
+
+    pad = int(pad_s * sample_rate)
+    min_len = int(min_speech_s * sample_rate)
+    segments = []
+    for start, end in runs:
+        start_sample = max(0, start * frame - pad)
+        end_sample = min(len(audio), end * frame + pad)
+        if end * frame - start * frame >= min_len:
+            segments.append((start_sample, end_sample))
+    return segments
+
+
+def _normalize_word(word):
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def stitch_transcripts(texts, overlap_words=15):
+    """
+    Merge transcripts of overlapping windows.
+
+    The tail of the text so far is aligned with the head of the next window's
+    text; the longest common run of words marks where the overlap is, and the
+    duplicate words from the next window are dropped.
+    """
+    merged = []
+    for text in texts:
+        words = text.split()
+        if not words:
+            continue
+        if not merged:
+            merged = words
+            continue
+
+        tail = merged[-overlap_words:]
+        head = words[:overlap_words]
+        matcher = SequenceMatcher(
+            None, [_normalize_word(w) for w in tail], [_normalize_word(w) for w in head], autojunk=False
+        )
+        match = matcher.find_longest_match(0, len(tail), 0, len(head))
+        if match.size >= min(2, len(head)):
+            # Giữ phần trước vùng trùng của đoạn cũ, nối phần từ vùng trùng của đoạn mới
+            merged = merged[:len(merged) - len(tail) + match.a] + words[match.b:]
+        else:
+            merged = merged + words
+    return " ".join(merged)
@@ -0,0 +1,139 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Làn ưu tiên: số nhỏ hơn được lấy trước (request tương tác trước job nền)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class MicroBatcher:
+    """
+    Gom các yêu cầu đồng thời thành một batch trước khi gọi mô hình.
+
+    Mỗi lời gọi `submit` trả về một Future. Luồng nền lấy phần tử đầu tiên
+    trong hàng đợi, chờ thêm tối đa `max_wait` giây (hoặc đến khi đủ
+    `max_batch_size` phần tử) rồi gọi `batch_fn` một lần cho cả batch.
+    `batch_fn` nhận list đầu vào và phải trả về list kết quả cùng thứ tự.
+    Với `concurrency` > 1, nhiều batch có thể chạy cùng lúc (ví dụ khi
+    `batch_fn` gửi sang một pool tiến trình). Nếu có `key`, các phần tử
+    được chia nhóm theo `key(item)` (ví dụ profile giải mã) và mỗi nhóm
+    được gọi `batch_fn` riêng, vì chúng không thể chạy chung một lần generate.
+    Phần tử có `priority` nhỏ hơn luôn được lấy trước (ví dụ cửa sổ của
+    request tương tác trước cửa sổ của job nền); cùng priority thì theo FIFO.
+    """
+
+    def __init__(self, batch_fn, name, max_batch_size=8, max_wait=0.01, concurrency=1, key=None):
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self.concurrency = max(1, int(concurrency))
+        self.key = key
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._max_queue_depth = 0
+        self._batch_size_histogram = {}
+
+    def submit(self, item, priority=PRIORITY_INTERACTIVE):
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((priority, next(self._counter), item, future))
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def _ensure_worker(self):
+        if self._threads:
+            return
+        with self._lock:
+            if not self._threads:
+                for i in range(self.concurrency):
+                    thread = threading.Thread(target=self._run, name=f"{self.name}-batcher-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    # Hết cửa sổ chờ: chỉ lấy thêm những gì đã có sẵn
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [(item, future) for _, _, item, future in batch]
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Bỏ qua các Future đã bị hủy trước khi chạy
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            for group in self._group(batch):
+                self._execute(group)
+
+    def _group(self, batch):
+        if self.key is None:
+            return [batch] if batch else []
+        groups = {}
+        for item, future in batch:
+            groups.setdefault(self.key(item), []).append((item, future))
+        return list(groups.values())
+
+    def _execute(self, batch):
+        self._record(len(batch))
+        items = [item for item, _ in batch]
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: batch_fn returned {len(results)} results for {len(items)} inputs"
+                )
+        except Exception as e:
+            logger.error(f"Error in {self.name} batch of {len(items)}: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _record(self, size):
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            self._batch_size_histogram[size] = self._batch_size_histogram.get(size, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': round(self._items / self._batches, 2) if self._batches else 0.0,
+                'max_batch_size_seen': self._max_batch_seen,
+                'batch_size_histogram': dict(sorted(self._batch_size_histogram.items())),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+                'concurrency': self.concurrency,
+            }
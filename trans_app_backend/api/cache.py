@@ -0,0 +1,270 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with hit/miss/eviction counters.
+
+    With `ttl` (seconds), entries older than the TTL are treated as misses
+    and dropped on access.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max(0, int(max_size))
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_size == 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'ttl': self.ttl,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def normalize_text(text):
+    # Chuẩn hóa Unicode (NFC) và khoảng trắng để các chuỗi giống nhau có cùng khóa
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+# Các backend cho kết quả khác một chút so với eager fp32 nên phải tách khóa cache
+APPROXIMATE_BACKENDS = ('int8', 'onnx')
+
+
+def model_fingerprint(model_dir, backend=None):
+    """Hash of file names, sizes and mtimes in a model directory (plus a lossy backend, if any)."""
+    digest = hashlib.sha256()
+    model_dir = Path(model_dir)
+    if model_dir.is_dir():
+        for path in sorted(p for p in model_dir.iterdir() if p.is_file()):
+            stat = path.stat()
+            digest.update(f"{path.name}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+    if backend in APPROXIMATE_BACKENDS:
+        digest.update(backend.encode())
+    return digest.hexdigest()[:16]
+
+
+class TranslationCache:
+    """
+    Two-tier translation cache: in-process LRU in front of an optional
+    persistent tier stored in the Django database.
+
+    Keys are content addresses built from the normalized source text, the
+    model fingerprint and the generation parameters, so swapping the model in
+    `TRANSLATION_MODEL_PATH` never serves stale translations.
+
+    A full `invalidate` (usually run from another process: the management
+    command or the admin) bumps a generation counter in the database. Every
+    process re-reads it at most every `generation_check` seconds and, when
+    it changed, clears its LRU and calls the `on_invalidate` listeners
+    (the translation memory), so dropped translations stop being served
+    without a restart.
+    """
+
+    generation_name = 'translation'
+
+    def __init__(self, model_dir, max_size=10000, persistent=True, backend=None, generation_check=5.0):
+        self.model_version = model_fingerprint(model_dir, backend)
+        self.lru = LRUCache(max_size)
+        self.persistent = persistent
+        self.generation_check = generation_check
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._generation = None
+        self._generation_checked = None
+        self.persistent_hits = 0
+        self.persistent_errors = 0
+        self.invalidations = 0
+
+    def make_key(self, text, params=None):
+        payload = json.dumps(
+            [normalize_text(text), self.model_version, params or {}], sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def on_invalidate(self, callback):
+        """Call `callback()` whenever this process's in-memory entries are dropped."""
+        self._listeners.append(callback)
+
+    def _clear_local(self):
+        self.lru.clear()
+        with self._lock:
+            self.invalidations += 1
+        for callback in self._listeners:
+            callback()
+
+    def _read_generation(self):
+        from .models import CacheGeneration
+
+        return CacheGeneration.objects.filter(name=self.generation_name).values_list('value', flat=True).first() or 0
+
+    def check_generation(self):
+        """Clear the in-memory tier when another process invalidated the cache since the last check."""
+        if not self.persistent:
+            return
+        now = time.monotonic()
+        if self._generation_checked is not None and now - self._generation_checked < self.generation_check:
+            return
+        self._generation_checked = now
+        try:
+            generation = self._read_generation()
+        except DatabaseError as e:
+            self._persistent_error(e)
+            return
+        with self._lock:
+            changed = self._generation is not None and generation != self._generation
+            self._generation = generation
+        if changed:
+            logger.info(f"Translation cache invalidated by another process (generation {generation})")
+            self._clear_local()
+
+    def get(self, text, params=None):
+        self.check_generation()
+        key = self.make_key(text, params)
+        translation = self.lru.get(key)
+        if translation is not None or not self.persistent:
+            return translation
+
+        from .models import TranslationCacheEntry
+
+        try:
+            translation = (
+                TranslationCacheEntry.objects.filter(key=key).values_list("translation", flat=True).first()
+            )
+        except DatabaseError as e:
+            self._persistent_error(e)
+            return None
+        if translation is not None:
+            with self._lock:
+                self.persistent_hits += 1
+            self.lru.set(key, translation)
+        return translation
+
+    def set(self, text, translation, params=None):
+        key = self.make_key(text, params)
+        self.lru.set(key, translation)
+        if not self.persistent:
+            return
+
+        from .models import TranslationCacheEntry
+
+        try:
+            TranslationCacheEntry.objects.update_or_create(
+                key=key,
+                defaults={
+                    "model_version": self.model_version,
+                    "source_text": normalize_text(text),
+                    "translation": translation,
+                },
+            )
+        except DatabaseError as e:
+            self._persistent_error(e)
+
+    def invalidate(self, stale_only=False):
+        """
+        Drop cached translations. With `stale_only`, only persistent entries
+        produced by another model version are removed (running servers never
+        look those up). Otherwise every entry is removed and the generation
+        is bumped so running servers drop their in-memory copies too.
+        Returns the number of persistent rows deleted.
+        """
+        from .models import CacheGeneration, TranslationCacheEntry
+
+        entries = TranslationCacheEntry.objects.all()
+        if stale_only:
+            entries = entries.exclude(model_version=self.model_version)
+        deleted, _ = entries.delete()
+        if not stale_only:
+            CacheGeneration.objects.get_or_create(name=self.generation_name)
+            CacheGeneration.objects.filter(name=self.generation_name).update(value=F('value') + 1)
+            self._clear_local()
+        logger.info(f"Translation cache invalidated ({deleted} persistent entries removed)")
+        return deleted
+
+    def _persistent_error(self, error):
+        with self._lock:
+            self.persistent_errors += 1
+        logger.warning(f"Translation cache persistent tier unavailable: {str(error)}")
+
+    def stats(self):
+        stats = self.lru.stats()
+        stats.update({
+            'model_version': self.model_version,
+            'persistent': self.persistent,
+            'persistent_hits': self.persistent_hits,
+            'persistent_errors': self.persistent_errors,
+            'invalidations': self.invalidations,
+        })
+        return stats
+
+
+translation_cache = TranslationCache(
+    settings.TRANSLATION_MODEL_PATH,
+    max_size=settings.TRANSLATION_CACHE_SIZE,
+    persistent=settings.TRANSLATION_CACHE_PERSISTENT,
+    backend=settings.TRANSLATION_BACKEND,
+    generation_check=settings.TRANSLATION_CACHE_GENERATION_CHECK,
+)
+
+# Cache kết quả phiên âm theo dấu vân tay của PCM 16kHz đã chuẩn hóa (client gửi lại sau timeout)
+transcription_cache = LRUCache(settings.TRANSCRIPTION_CACHE_SIZE, ttl=settings.TRANSCRIPTION_CACHE_TTL or None)
@@ -0,0 +1,50 @@
+"""
+Decoding profiles shared by the API and the CLI (main_task2.py).
+
+A profile fixes the beam count and how the `max_new_tokens` cap is derived
+from the input: seconds of audio for Whisper, source tokens for Marian.
+Capping the output length stops runaway/repetitive generations early, and
+with beams > 1 `early_stopping` ends the search as soon as enough finished
+hypotheses exist. Pure Python so the CLI can import it without Django.
+"""
+
+PROFILES = {
+    'fast': {'num_beams': 1, 'tokens_per_second': 8, 'tokens_per_input_token': 1.5},
+    'balanced': {'num_beams': 2, 'tokens_per_second': 12, 'tokens_per_input_token': 2.0},
+    'accurate': {'num_beams': 5, 'tokens_per_second': 16, 'tokens_per_input_token': 2.5},
+}
+# Greedy như trước khi có profile: độ trễ mặc định không đổi, beam search là lựa chọn của client
+DEFAULT_PROFILE = 'fast'
+
+# Decoder của Whisper nhận tối đa 448 vị trí, trừ các token prompt (<|startoftranscript|><|vi|>...)
+WHISPER_MAX_NEW_TOKENS = 440
+MARIAN_MAX_NEW_TOKENS = 512
+MIN_NEW_TOKENS = 16
+
+
+def get_profile(name=None, default=DEFAULT_PROFILE):
+    """Validate a profile name (None selects `default`); raises ValueError for unknown names."""
+    name = name or default
+    if name not in PROFILES:
+        raise ValueError(f"Unknown decoding profile '{name}', expected one of: {', '.join(PROFILES)}")
+    return name
+
+
+def _beam_kwargs(num_beams):
+    if num_beams == 1:
+        return {'num_beams': 1, 'do_sample': False}
+    return {'num_beams': num_beams, 'early_stopping': True}
+
+
+def whisper_generate_kwargs(profile, duration):
+    """`generate` kwargs for Whisper given the longest clip in the batch (seconds)."""
+    config = PROFILES[profile]
+    max_new_tokens = int(MIN_NEW_TOKENS + config['tokens_per_second'] * duration)
+    return {**_beam_kwargs(config['num_beams']), 'max_new_tokens': min(max_new_tokens, WHISPER_MAX_NEW_TOKENS)}
+
+
+def translation_generate_kwargs(profile, input_tokens):
+    """`generate` kwargs for Marian given the longest source sequence in the batch (tokens)."""
+    config = PROFILES[profile]
+    max_new_tokens = int(MIN_NEW_TOKENS + config['tokens_per_input_token'] * input_tokens)
+    return {**_beam_kwargs(config['num_beams']), 'max_new_tokens': min(max_new_tokens, MARIAN_MAX_NEW_TOKENS)}
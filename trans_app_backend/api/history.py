@@ -0,0 +1,182 @@
+import atexit
+import base64
+import logging
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import TranslationHistory
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'api_translationhistory_fts'  # tạo bởi migration 0005 (chỉ SQLite có FTS5)
+
+
+class HistoryWriter:
+    """
+    Buffered writer for TranslationHistory rows.
+
+    `record` only puts an unsaved row on a bounded queue, so requests never
+    wait on the database. A background thread takes the first pending row,
+    waits up to `flush_interval` seconds for more (or until `batch_size`
+    rows) and inserts them with one bulk_create. When the queue is full new
+    rows are dropped and counted instead of slowing requests down.
+    """
+
+    def __init__(self, enabled, batch_size=100, flush_interval=1.0, max_pending=10000):
+        self.enabled = enabled
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, kind, input_text='', translation='', speech_url=None):
+        if not self.enabled:
+            return
+        self._ensure_thread()
+        entry = TranslationHistory(
+            kind=kind, input_text=input_text or '', translation=translation or '', speech_url=speech_url,
+        )
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self._write(self._collect())
+
+    def _write(self, batch):
+        try:
+            TranslationHistory.objects.bulk_create(batch, batch_size=self.batch_size)
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} history rows: {str(e)}")
+            with self._lock:
+                self.failed += len(batch)
+        finally:
+            close_old_connections()
+
+    def flush(self):
+        """Write everything still queued from the calling thread (used at exit)."""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write(batch)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pending': self._queue.qsize(),
+                'written': self.written,
+                'batches': self.batches,
+                'avg_batch_size': round(self.written / self.batches, 2) if self.batches else 0.0,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
+
+
+history_writer = HistoryWriter(
+    settings.HISTORY_ENABLED,
+    batch_size=settings.HISTORY_BATCH_SIZE,
+    flush_interval=settings.HISTORY_FLUSH_INTERVAL,
+    max_pending=settings.HISTORY_MAX_PENDING,
+)
+
+
+def encode_cursor(entry):
+    raw = f"{entry.created_at.isoformat()}|{entry.pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from `encode_cursor` output; raises ValueError when malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError as e:  # gồm cả lỗi base64 và UTF-8
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+_fts_available = None
+
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def fts_query(text):
+    """Turn user input into an FTS5 query: every word must match, as a prefix (no FTS syntax passes through)."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+
+def search(queryset, text):
+    if fts_available():
+        match = fts_query(text)
+        if not match:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+    return queryset.filter(Q(input_text__icontains=text) | Q(translation__icontains=text))
+
+
+def page(queryset, cursor=None, limit=50):
+    """
+    Keyset pagination, newest first: the page after `cursor` is found with a
+    seek on (created_at, id) instead of an OFFSET scan, so every page costs
+    the same however deep the client has paged. Returns (entries, next_cursor).
+    """
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    entries = list(queryset.order_by('-created_at', '-pk')[:limit + 1])
+    next_cursor = encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
@@ -0,0 +1,332 @@
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+
+import soundfile as sf
+from django.conf import settings
+
+from . import metrics
+from .decoding import PROFILES, get_profile, translation_generate_kwargs, whisper_generate_kwargs
+from .text import MAX_INPUT_TOKENS, length_buckets, reassemble, segment_text
+
+# torch/transformers được import trong hàm để các lệnh manage.py không phải trả giá import
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('eager', 'int8', 'compile', 'onnx')
+
+
+def artifact_dir(model_dir, backend):
+    """Cache directory for optimized artifacts, next to the model files."""
+    import torch
+
+    from .cache import model_fingerprint
+
+    version = re.sub(r"[^\w.]", "_", torch.__version__)
+    return Path(model_dir) / 'optimized' / f"{backend}-{model_fingerprint(model_dir)}-torch{version}"
+
+
+def load_model(hf_class, model_dir, backend, ort_class):
+    """
+    Load a seq2seq model with the requested CPU inference backend.
+
+    - eager: fp32 PyTorch, as shipped.
+    - int8: dynamic int8 quantization of the nn.Linear layers. The quantized
+      module is saved once and loaded directly on later starts.
+    - compile: torch.compile of the forward pass; Inductor's cache lives in
+      the artifact directory so kernels are reused across restarts.
+    - onnx: ONNX Runtime through optimum (optional dependency); the export
+      is saved once. Falls back to eager when optimum is not installed.
+
+    Returns (model, backend actually used).
+    """
+    import torch
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    if backend == 'onnx':
+        try:
+            from optimum import onnxruntime
+        except ImportError:
+            logger.warning("optimum[onnxruntime] is not installed, falling back to eager backend")
+            backend = 'eager'
+        else:
+            ort_model_class = getattr(onnxruntime, ort_class)
+            path = artifact_dir(model_dir, backend)
+            if (path / 'config.json').exists():
+                return ort_model_class.from_pretrained(path), backend
+            logger.info(f"Exporting {model_dir} to ONNX (cached in {path})")
+            model = ort_model_class.from_pretrained(model_dir, export=True)
+            model.save_pretrained(path)
+            return model, backend
+
+    if backend == 'int8':
+        path = artifact_dir(model_dir, backend) / 'model.pt'
+        if path.exists():
+            return torch.load(path, weights_only=False), backend
+        logger.info(f"Quantizing {model_dir} to int8 (cached in {path})")
+        model = hf_class.from_pretrained(model_dir).eval()
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        torch.save(model, path)
+        return model, backend
+
+    model = hf_class.from_pretrained(model_dir)
+    if backend == 'compile':
+        os.environ.setdefault('TORCHINDUCTOR_CACHE_DIR', str(artifact_dir(model_dir, backend)))
+        # generate() gọi forward nhiều lần với độ dài khác nhau nên dùng dynamic shape
+        model.forward = torch.compile(model.forward, dynamic=True)
+        # Encoder được gọi riêng (xem timed_generate) nên cũng phải compile
+        encoder = model.get_encoder()
+        encoder.forward = torch.compile(encoder.forward, dynamic=True)
+    return model, backend
+
+
+def timed_generate(model, name, encoder_inputs, **kwargs):
+    """
+    `generate` with the encoder and the autoregressive decoder timed as
+    separate stages: the encoder runs once up front and its output is
+    passed in as `encoder_outputs`. ONNX Runtime models are timed as one
+    `generate` stage.
+    """
+    import torch
+
+    if not isinstance(model, torch.nn.Module):
+        with metrics.stage('generate', name):
+            return model.generate(**encoder_inputs, **kwargs)
+    with metrics.stage('encoder', name):
+        encoder_outputs = model.get_encoder()(**encoder_inputs)
+    if 'attention_mask' in encoder_inputs:
+        kwargs['attention_mask'] = encoder_inputs['attention_mask']
+    with metrics.stage('decoder', name):
+        return model.generate(encoder_outputs=encoder_outputs, **kwargs)
+
+
+def _place(model, backend):
+    # int8 động và ONNX Runtime chỉ chạy trên CPU
+    import torch
+
+    device = "cuda" if torch.cuda.is_available() and backend in ('eager', 'compile') else "cpu"
+    if isinstance(model, torch.nn.Module):
+        model.to(device)
+        model.eval()
+    return device
+
+
+# Load PhoWhisper model
+class PhoWhisper:
+    def __init__(self, backend=None, assisted=None, draft_model_path=None):
+        from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+        self.model_name = str(settings.WHISPER_MODEL_PATH)
+        self.backend = backend or settings.WHISPER_BACKEND
+        if assisted is None:
+            assisted = settings.WHISPER_ASSISTED_DECODING
+        try:
+            self.processor = WhisperProcessor.from_pretrained(self.model_name)
+            self.model, self.backend = load_model(
+                WhisperForConditionalGeneration, self.model_name, self.backend, 'ORTModelForSpeechSeq2Seq'
+            )
+            self.device = _place(self.model, self.backend)
+            self.assistant = None
+            if assisted and self.backend == 'onnx':
+                logger.warning("Assisted decoding is not supported with the onnx backend, disabling it")
+            elif assisted:
+                # Mô hình nháp (ví dụ PhoWhisper-tiny) phải dùng chung tokenizer với mô hình chính
+                draft_model_path = str(draft_model_path or settings.WHISPER_DRAFT_MODEL_PATH)
+                self.assistant = WhisperForConditionalGeneration.from_pretrained(draft_model_path)
+                self.assistant.to(self.device)
+                self.assistant.eval()
+                logger.info(f"Assisted decoding enabled with draft model {draft_model_path} (fast profile only)")
+                default_profile = get_profile(None, settings.DECODING_PROFILE)
+                if PROFILES[default_profile]['num_beams'] != 1:
+                    logger.warning(
+                        f"Assisted decoding only applies to the greedy 'fast' profile; the default profile "
+                        f"'{default_profile}' uses beam search, so only requests asking for 'fast' will use it"
+                    )
+            logger.info(f"PhoWhisper model loaded successfully ({self.backend})")
+        except Exception as e:
+            logger.error(f"Failed to load PhoWhisper model: {str(e)}")
+            raise
+
+    def transcribe(self, audio_path, profile=None):
+        audio, sample_rate = sf.read(audio_path, dtype='float32')
+        return self.transcribe_batch([audio], sampling_rate=sample_rate, profile=profile)[0]
+
+    def transcribe_batch(self, audios, sampling_rate=16000, profile=None):
+        # Whisper luôn đệm input về cửa sổ 30s nên các log-mel có cùng kích thước,
+        # xếp chồng nhiều request vào một lần encoder/decoder
+        import torch
+
+        try:
+            with metrics.stage('features', 'phowhisper'):
+                inputs = self.processor(audios, sampling_rate=sampling_rate, return_tensors="pt")
+                input_features = inputs["input_features"].to(self.device)
+            duration = max(len(audio) for audio in audios) / sampling_rate
+            kwargs = whisper_generate_kwargs(get_profile(profile, settings.DECODING_PROFILE), duration)
+            with torch.no_grad():
+                if self.assistant is not None and kwargs['num_beams'] == 1:
+                    with metrics.stage('generate', 'phowhisper'):
+                        generated_ids = self.generate_assisted(input_features, **kwargs)
+                else:
+                    generated_ids = timed_generate(
+                        self.model, 'phowhisper', {'input_features': input_features}, language="vi", **kwargs
+                    )
+            with metrics.stage('detokenize', 'phowhisper'):
+                return self.processor.batch_decode(generated_ids, skip_special_tokens=True)
+        except Exception as e:
+            logger.error(f"Error during transcription: {str(e)}")
+            raise
+
+    def generate_assisted(self, input_features, **kwargs):
+        """
+        Greedy decoding where the draft model proposes several tokens and the
+        main model verifies them in one forward pass. Used only for the
+        'fast' profile (num_beams == 1); beam profiles bypass the assistant.
+
+        Only the tokens the main model would have picked itself are kept, so
+        the output is identical to plain greedy decoding. Assisted generation
+        works on one sequence at a time, so the batch is decoded item by item.
+        """
+        return [
+            self.model.generate(features[None], language="vi", assistant_model=self.assistant, **kwargs)[0]
+            for features in input_features
+        ]
+
+# Load mô hình dịch
+class TranslationModel:
+    def __init__(self, backend=None):
+        from transformers import MarianMTModel, MarianTokenizer
+
+        self.model_name = str(settings.TRANSLATION_MODEL_PATH)
+        self.backend = backend or settings.TRANSLATION_BACKEND
+        try:
+            self.tokenizer = MarianTokenizer.from_pretrained(self.model_name)
+            self.model, self.backend = load_model(
+                MarianMTModel, self.model_name, self.backend, 'ORTModelForSeq2SeqLM'
+            )
+            self.device = _place(self.model, self.backend)
+            logger.info(f"Translation model loaded successfully ({self.backend})")
+        except Exception as e:
+            logger.error(f"Failed to load Translation model: {str(e)}")
+            raise
+
+    def translate(self, text, profile=None):
+        # Tách câu để không vượt giới hạn 512 token của Marian
+        paragraphs = segment_text(text, settings.TRANSLATION_MAX_SENTENCE_CHARS)
+        sentences = [sentence for sentences in paragraphs for sentence in sentences]
+        return reassemble(paragraphs, self.translate_batch(sentences, profile)) if sentences else ""
+
+    def translate_batch(self, texts, profile=None):
+        # Chia batch theo độ dài token để câu ngắn không phải đệm theo câu dài nhất
+        import torch
+
+        try:
+            with metrics.stage('tokenize', 'translator'):
+                encoded = self.tokenizer(texts, truncation=True, max_length=MAX_INPUT_TOKENS)
+            lengths = [len(ids) for ids in encoded["input_ids"]]
+            profile = get_profile(profile, settings.DECODING_PROFILE)
+            results = [None] * len(texts)
+            for bucket in length_buckets(
+                lengths, max_batch_size=len(texts), max_tokens=settings.TRANSLATION_BATCH_MAX_TOKENS
+            ):
+                with metrics.stage('tokenize', 'translator'):
+                    inputs = self.tokenizer(
+                        [texts[i] for i in bucket], return_tensors="pt",
+                        padding=True, truncation=True, max_length=MAX_INPUT_TOKENS,
+                    )
+                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                kwargs = translation_generate_kwargs(profile, inputs["input_ids"].shape[1])
+                with torch.no_grad():
+                    translated = timed_generate(self.model, 'translator', inputs, **kwargs)
+                with metrics.stage('detokenize', 'translator'):
+                    decoded = self.tokenizer.batch_decode(translated, skip_special_tokens=True)
+                for i, translation in zip(bucket, decoded):
+                    results[i] = translation
+            return results
+        except Exception as e:
+            logger.error(f"Error during translation: {str(e)}")
+            raise
+
+
+MODEL_CLASSES = {
+    'phowhisper': PhoWhisper,
+    'translator': TranslationModel,
+}
+
+_models = {}
+_status = {name: 'not_loaded' for name in MODEL_CLASSES}
+_lock = threading.Lock()
+_model_locks = {name: threading.Lock() for name in MODEL_CLASSES}
+
+
+def get_model(name):
+    """Return the shared model instance, loading it on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _model_locks[name]:
+        if name not in _models:
+            with _lock:
+                _status[name] = 'loading'
+            try:
+                _models[name] = MODEL_CLASSES[name]()
+            except Exception as e:
+                with _lock:
+                    _status[name] = 'failed'
+                logger.critical(f"Failed to initialize model {name}: {str(e)}")
+                raise
+            with _lock:
+                _status[name] = 'loaded'
+        return _models[name]
+
+
+def model_status():
+    with _lock:
+        return dict(_status)
+
+
+def _tensor_bytes(value):
+    if hasattr(value, 'element_size'):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        # Trọng số int8 được đóng gói dạng tuple (weight, bias)
+        return sum(_tensor_bytes(item) for item in value)
+    return 0
+
+
+def model_memory():
+    """Bytes held by the weights of each loaded model (None for ONNX Runtime sessions)."""
+    memory = {}
+    for name, wrapper in list(_models.items()):
+        modules = [wrapper.model, getattr(wrapper, 'assistant', None)]
+        # Kiểm tra theo hành vi thay vì isinstance(torch.nn.Module): /metrics không được import torch
+        if not hasattr(wrapper.model, 'state_dict'):
+            memory[name] = None
+            continue
+        memory[name] = sum(
+            _tensor_bytes(value)
+            for module in modules if module is not None
+            for value in module.state_dict().values()
+        )
+    return memory
+
+
+def warm_up():
+    """Load all models (and the inference pool, if configured) in a background thread."""
+    def run():
+        from .workers import get_inference_pool
+
+        for name in MODEL_CLASSES:
+            try:
+                get_model(name)
+            except Exception:
+                return
+        get_inference_pool()
+
+    thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,219 @@
+import itertools
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, models
+from django.utils import timezone
+
+from .audio import WHISPER_SAMPLE_RATE
+from .batching import PRIORITY_BACKGROUND
+from .models import TranscriptionJob
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Asynchronous transcription jobs backed by a local worker pool.
+
+    Job state lives in the TranscriptionJob table, so queued jobs survive a
+    restart and can be polled from any process. Jobs are ordered by priority
+    (higher first), then by audio duration (shorter first), so interactive
+    clips do not wait behind long files.
+
+    A running job holds a lease owned by this process ("host:pid"), renewed
+    every third of `lease_seconds` while the process is alive. Only running
+    jobs whose lease has expired are put back in the queue, so with several
+    server processes a job is never transcribed twice while its owner is
+    still working on it. Job windows use the batcher's background lane:
+    interactive requests always get the free batch slots first.
+    """
+
+    def __init__(self, workers, directory, lease_seconds=60):
+        self.workers = workers
+        self.directory = Path(directory)
+        self.lease_seconds = max(1.0, float(lease_seconds))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"[:64]
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._events = {}  # job id -> [Event, số luồng đang chờ]
+        self._threads = []
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._maintain, name="job-lease", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.recover()
+
+    def recover(self):
+        """Re-enqueue queued jobs and running jobs whose owner's lease has expired."""
+        for job in TranscriptionJob.objects.filter(status=TranscriptionJob.STATUS_QUEUED):
+            self._enqueue(job)
+        self._requeue_expired()
+        logger.info(f"Job queue started with {self.workers} workers (owner {self.owner})")
+
+    def _lease(self):
+        return timezone.now() + timedelta(seconds=self.lease_seconds)
+
+    def _requeue_expired(self):
+        expired = TranscriptionJob.objects.filter(status=TranscriptionJob.STATUS_RUNNING).filter(
+            models.Q(lease_expires_at__lt=timezone.now()) | models.Q(lease_expires_at__isnull=True)
+        )
+        for job in expired:
+            # Điều kiện lặp lại trong update: chỉ một tiến trình lấy lại được job
+            requeued = expired.filter(pk=job.pk).update(
+                status=TranscriptionJob.STATUS_QUEUED, started_at=None, owner='', lease_expires_at=None
+            )
+            if requeued:
+                logger.warning(f"Requeued job {job.pk} with expired lease (owner {job.owner or 'unknown'})")
+                self._enqueue(job)
+
+    def _maintain(self):
+        """Heartbeat: renew the leases of this process's jobs, then take back jobs of dead processes."""
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            try:
+                TranscriptionJob.objects.filter(status=TranscriptionJob.STATUS_RUNNING, owner=self.owner).update(
+                    lease_expires_at=self._lease()
+                )
+                self._requeue_expired()
+            except Exception as e:
+                logger.error(f"Job lease maintenance error: {str(e)}")
+            finally:
+                close_old_connections()
+
+    def submit(self, samples, priority=0, profile=''):
+        self.start()
+        job = TranscriptionJob(priority=priority, profile=profile or '', duration=len(samples) / WHISPER_SAMPLE_RATE)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{job.id}.npy"
+        np.save(path, np.asarray(samples, dtype=np.float32))
+        job.audio_path = str(path)
+        job.save()
+        self._enqueue(job)
+        return job
+
+    def _enqueue(self, job):
+        self._queue.put((-job.priority, job.duration, next(self._counter), job.pk))
+
+    def cancel(self, job_id):
+        """Cancel a queued job. Returns False when the job already started or finished."""
+        cancelled = TranscriptionJob.objects.filter(pk=job_id, status=TranscriptionJob.STATUS_QUEUED).update(
+            status=TranscriptionJob.STATUS_CANCELLED, finished_at=timezone.now()
+        )
+        if cancelled:
+            self._finish(job_id)
+        return bool(cancelled)
+
+    def wait(self, job_id, timeout):
+        """
+        Block until the job finishes or `timeout` seconds pass (long-polling).
+
+        The wake-up event only exists while someone waits: a job finished by
+        another process never calls `_finish` here, so the last waiter
+        removes it.
+        """
+        job = TranscriptionJob.objects.get(pk=job_id)
+        if timeout <= 0 or job.status in TranscriptionJob.FINISHED:
+            return job
+        with self._lock:
+            entry = self._events.setdefault(job_id, [threading.Event(), 0])
+            entry[1] += 1
+        try:
+            job.refresh_from_db()  # job có thể vừa kết thúc trước khi event được tạo
+            if job.status not in TranscriptionJob.FINISHED:
+                entry[0].wait(timeout)
+                job.refresh_from_db()
+            return job
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0 and self._events.get(job_id) is entry:
+                    del self._events[job_id]
+
+    def _finish(self, job_id):
+        with self._lock:
+            entry = self._events.pop(job_id, None)
+        if entry is not None:
+            entry[0].set()
+        path = self.directory / f"{job_id}.npy"
+        if path.exists():
+            os.remove(path)
+
+    def _run(self):
+        while True:
+            _, _, _, job_id = self._queue.get()
+            self._process(job_id)
+
+    def _process(self, job_id):
+        from .views import transcribe_samples
+
+        try:
+            # Chỉ một worker chuyển được job từ queued sang running (job có thể đã bị hủy)
+            claimed = TranscriptionJob.objects.filter(
+                pk=job_id, status=TranscriptionJob.STATUS_QUEUED
+            ).update(
+                status=TranscriptionJob.STATUS_RUNNING,
+                started_at=timezone.now(),
+                owner=self.owner,
+                lease_expires_at=self._lease(),
+            )
+            if not claimed:
+                return
+            job = TranscriptionJob.objects.get(pk=job_id)
+            try:
+                samples = np.load(job.audio_path)
+                transcription, chunks = transcribe_samples(
+                    samples, profile=job.profile or None, priority=PRIORITY_BACKGROUND
+                )
+                job.result = {'transcription': transcription, 'chunks': chunks}
+                job.status = TranscriptionJob.STATUS_DONE
+            except Exception as e:
+                logger.error(f"Error in transcription job {job_id}: {str(e)}")
+                job.error = str(e)
+                job.status = TranscriptionJob.STATUS_FAILED
+            # Chỉ ghi kết quả khi còn giữ lease (job có thể đã được tiến trình khác lấy lại)
+            saved = TranscriptionJob.objects.filter(
+                pk=job_id, status=TranscriptionJob.STATUS_RUNNING, owner=self.owner
+            ).update(
+                result=job.result,
+                status=job.status,
+                error=job.error,
+                finished_at=timezone.now(),
+                lease_expires_at=None,
+            )
+            if not saved:
+                logger.warning(f"Job {job_id} lost its lease; result discarded")
+                return
+            self._finish(job_id)
+        except Exception as e:
+            logger.error(f"Job worker error for {job_id}: {str(e)}")
+        finally:
+            close_old_connections()
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize(),
+            'owner': self.owner,
+            'lease_seconds': self.lease_seconds,
+        }
+
+
+job_queue = JobQueue(settings.JOB_WORKERS, settings.JOB_STORAGE_DIR, settings.JOB_LEASE_SECONDS)
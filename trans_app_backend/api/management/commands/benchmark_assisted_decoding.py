@@ -0,0 +1,89 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.audio import WHISPER_SAMPLE_RATE, WHISPER_WINDOW_SECONDS, decode_audio
+from api.decoding import whisper_generate_kwargs
+from api.inference import PhoWhisper
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare greedy and assisted (draft model) PhoWhisper decoding on CPU: "
+        "decoded tokens per second and whether both produce identical output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("audio", nargs="+", help="Audio files (only the first 30s window of each is used).")
+        parser.add_argument(
+            "--draft", default=str(settings.WHISPER_DRAFT_MODEL_PATH),
+            help="Draft model directory (default: WHISPER_DRAFT_MODEL_PATH).",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per file and mode (after one warm-up).")
+        parser.add_argument("--threads", type=int, help="torch intra-op threads (default: torch's own choice).")
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        import torch
+
+        if options["threads"]:
+            torch.set_num_threads(options["threads"])
+        model = PhoWhisper(backend='eager', assisted=True, draft_model_path=options["draft"])
+        # So sánh trên CPU như máy chủ production
+        model.model.to('cpu')
+        model.assistant.to('cpu')
+        model.device = 'cpu'
+
+        window = int(WHISPER_WINDOW_SECONDS * WHISPER_SAMPLE_RATE)
+        results = []
+        for path in options["audio"]:
+            try:
+                audio = decode_audio(path, WHISPER_SAMPLE_RATE)[:window]
+            except Exception as e:
+                raise CommandError(f"Cannot decode {path}: {e}")
+            features = model.processor(
+                [audio], sampling_rate=WHISPER_SAMPLE_RATE, return_tensors="pt"
+            )["input_features"]
+            kwargs = whisper_generate_kwargs('fast', len(audio) / WHISPER_SAMPLE_RATE)
+
+            runs = {
+                'greedy': lambda: model.model.generate(features, language="vi", **kwargs)[0],
+                'assisted': lambda: model.generate_assisted(features, **kwargs)[0],
+            }
+            row = {'file': path, 'duration_s': round(len(audio) / WHISPER_SAMPLE_RATE, 2)}
+            outputs = {}
+            for mode, run in runs.items():
+                with torch.no_grad():
+                    outputs[mode] = run()  # khởi động
+                    timings = []
+                    for _ in range(max(1, options["repeat"])):
+                        started = time.perf_counter()
+                        run()
+                        timings.append(time.perf_counter() - started)
+                seconds = statistics.median(timings)
+                tokens = len(outputs[mode])
+                row[mode] = {
+                    'tokens': tokens,
+                    'median_ms': round(seconds * 1000, 1),
+                    'tokens_per_s': round(tokens / seconds, 1) if seconds else 0.0,
+                }
+            row['identical'] = outputs['greedy'].tolist() == outputs['assisted'].tolist()
+            row['speedup'] = round(row['greedy']['median_ms'] / row['assisted']['median_ms'], 2)
+            results.append(row)
+
+            style = self.style.SUCCESS if row['identical'] else self.style.ERROR
+            self.stdout.write(
+                f"{path} ({row['duration_s']}s): greedy {row['greedy']['tokens_per_s']} tok/s, "
+                f"assisted {row['assisted']['tokens_per_s']} tok/s, speedup {row['speedup']}x, "
+                + style(f"identical={row['identical']}")
+            )
+
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
+        if not all(row['identical'] for row in results):
+            raise CommandError("Assisted decoding output differs from greedy decoding")
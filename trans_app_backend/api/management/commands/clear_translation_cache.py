@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import translation_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Invalidate the persistent translation cache (run after replacing models/opus-mt-vi-en). "
+        "Running servers drop their in-memory cache and translation memory within "
+        "TRANSLATION_CACHE_GENERATION_CHECK seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale",
+            action="store_true",
+            help="Only remove entries produced by a different model version than the one on disk.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = translation_cache.invalidate(stale_only=options["stale"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {deleted} cached translations (current model version {translation_cache.model_version})"
+        ))
@@ -0,0 +1,125 @@
+import difflib
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.audio import WHISPER_SAMPLE_RATE, decode_audio
+from api.inference import BACKENDS, PhoWhisper, TranslationModel
+
+SAMPLE_SENTENCES = [
+    "Xin chào, bạn có khỏe không?",
+    "Hôm nay trời đẹp quá, chúng ta đi dạo công viên nhé.",
+    "Tôi muốn đặt một bàn cho bốn người vào tối thứ sáu.",
+    "Cuộc họp sẽ bắt đầu lúc chín giờ sáng mai tại phòng hội nghị tầng ba.",
+    "Xin lỗi, bạn có thể nói chậm hơn một chút được không?",
+    "Giá vé tàu từ Hà Nội đến Thành phố Hồ Chí Minh là bao nhiêu?",
+    "Chúng tôi đã hoàn thành dự án trước thời hạn hai tuần.",
+    "Bác sĩ khuyên tôi nên uống nhiều nước và nghỉ ngơi đầy đủ.",
+]
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = reference.split(), hypothesis.split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    # Khoảng cách Levenshtein theo từ
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def latency_summary(timings):
+    ordered = sorted(timings)
+    return {
+        'mean_ms': round(statistics.mean(ordered) * 1000, 1),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare inference backends (eager, int8, compile, onnx) for both models: load time, latency "
+        "and agreement with the eager fp32 output. Optimized artifacts are built and cached on first run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS,
+            help="Backends to compare; eager is always run as the reference.",
+        )
+        parser.add_argument("--audio", nargs="*", default=[], help="Audio files for the PhoWhisper report.")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per input (after one warm-up run).")
+        parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file.")
+
+    def handle(self, *args, **options):
+        backends = ['eager'] + [b for b in options["backends"] if b != 'eager']
+        audios = []
+        for path in options["audio"]:
+            try:
+                audios.append(decode_audio(path, WHISPER_SAMPLE_RATE))
+            except Exception as e:
+                raise CommandError(f"Cannot decode {path}: {e}")
+
+        report = {'translator': self.compare(
+            TranslationModel, backends, SAMPLE_SENTENCES, lambda m, x: m.translate(x), options["repeat"], False,
+        )}
+        if audios:
+            report['phowhisper'] = self.compare(
+                PhoWhisper, backends, audios,
+                lambda m, x: m.transcribe_batch([x], sampling_rate=WHISPER_SAMPLE_RATE)[0], options["repeat"], True,
+            )
+        else:
+            self.stdout.write("No --audio given, skipping PhoWhisper.")
+
+        for model_name, rows in report.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(model_name))
+            for row in rows:
+                quality = f"wer={row['wer']:.3f}" if 'wer' in row else f"similarity={row['similarity']:.3f}"
+                self.stdout.write(
+                    f"  {row['backend']:<8} load={row['load_s']:>6.1f}s  mean={row['mean_ms']:>7.1f}ms  "
+                    f"p50={row['p50_ms']:>7.1f}ms  p95={row['p95_ms']:>7.1f}ms  "
+                    f"speedup={row['speedup']:.2f}x  exact={row['exact_match']:.0%}  {quality}"
+                )
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['json_path']}"))
+
+    def compare(self, model_class, backends, inputs, run, repeat, speech):
+        rows, reference = [], None
+        for backend in backends:
+            started = time.perf_counter()
+            model = model_class(backend=backend)
+            load_s = time.perf_counter() - started
+
+            outputs, timings = [], []
+            for item in inputs:
+                outputs.append(run(model, item))  # lần đầu: khởi động (compile, cấp phát)
+                for _ in range(max(1, repeat)):
+                    started = time.perf_counter()
+                    run(model, item)
+                    timings.append(time.perf_counter() - started)
+            if reference is None:
+                reference = outputs
+
+            row = {'backend': model.backend, 'load_s': round(load_s, 2), **latency_summary(timings)}
+            row['exact_match'] = sum(a == b for a, b in zip(reference, outputs)) / len(outputs)
+            if speech:
+                row['wer'] = round(statistics.mean(word_error_rate(a, b) for a, b in zip(reference, outputs)), 4)
+            else:
+                row['similarity'] = round(statistics.mean(
+                    difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(reference, outputs)
+                ), 4)
+            rows.append(row)
+            del model
+
+        for row in rows:
+            row['speedup'] = round(rows[0]['mean_ms'] / row['mean_ms'], 2) if row['mean_ms'] else 0.0
+        return rows
@@ -0,0 +1,149 @@
+import difflib
+import logging
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from .cache import normalize_text, translation_cache
+from .decoding import PROFILES
+
+logger = logging.getLogger(__name__)
+
+
+def fold(text):
+    """
+    Matching form of a sentence: NFC, case-folded, punctuation and extra
+    spaces removed. Diacritics are kept: in Vietnamese they change the word
+    ("ma", "mà", "má" are different words).
+    """
+    return " ".join(re.findall(r"\w+", unicodedata.normalize("NFC", text).casefold()))
+
+
+class TranslationMemory:
+    """
+    Translation memory: serves a stored translation for sentences that
+    differ from an earlier one only in casing, whitespace or punctuation.
+
+    Entries are keyed by the folded sentence, the decoding profile and the
+    model version, so a match always has exactly the same words in the same
+    order; a sentence that adds, removes or changes a word (for example a
+    negation) is never served another sentence's translation. The reported
+    score is 1.0 only when the NFC-normalized texts are identical, otherwise
+    their character similarity (below 1).
+
+    The memory holds at most `max_size` sentences (least recently used are
+    evicted). It is filled from the persistent translation cache in a
+    background thread on first use, then from every new model translation,
+    and emptied whenever the translation cache is invalidated.
+    """
+
+    def __init__(self, enabled, max_size=50000, model_version=''):
+        self.enabled = enabled
+        self.max_size = max(0, int(max_size))
+        self.model_version = model_version
+        self._entries = OrderedDict()  # (model_version, profile, folded) -> (source, translation)
+        self._lock = threading.Lock()
+        self._loader = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, folded, profile):
+        return self.model_version, profile, folded
+
+    def add(self, source, translation, profile):
+        if not self.enabled or self.max_size == 0:
+            return
+        folded = fold(source)
+        if not folded or not translation:
+            return
+        key = self._key(folded, profile)
+        with self._lock:
+            self._entries[key] = (normalize_text(source), translation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, source, profile):
+        """Return (translation, score) of the stored sentence with the same words, or None."""
+        if not self.enabled:
+            return None
+        self._ensure_loaded()
+        folded = fold(source)
+        key = self._key(folded, profile)
+        with self._lock:
+            entry = self._entries.get(key) if folded else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        stored, translation = entry
+        source = normalize_text(source)
+        if source == stored:
+            return translation, 1.0
+        # Chỉ khác hoa/thường, khoảng trắng hoặc dấu câu: độ giống ký tự, giữ < 1 kể cả sau khi làm tròn
+        return translation, min(0.9999, difflib.SequenceMatcher(None, source, stored).ratio())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _ensure_loaded(self):
+        if self._loader is not None:
+            return
+        with self._lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self.load, name="translation-memory-loader", daemon=True)
+                self._loader.start()
+
+    def load(self):
+        """Fill the memory from the persistent cache (newest last, so they survive eviction)."""
+        from .models import TranslationCacheEntry
+
+        try:
+            cached = list(
+                TranslationCacheEntry.objects.filter(model_version=translation_cache.model_version)
+                .order_by('-pk')
+                .values_list('key', 'source_text', 'translation')[:self.max_size]
+            )
+        except DatabaseError as e:
+            logger.warning(f"Translation memory not loaded: {str(e)}")
+            return
+        finally:
+            close_old_connections()
+        # Bảng cache không lưu profile: tìm lại profile từ khóa (khóa chứa tham số giải mã).
+        # Lịch sử dịch không ghi profile nên không được nạp
+        for key, source, translation in cached[::-1]:
+            for profile in PROFILES:
+                if translation_cache.make_key(source, {'profile': profile}) == key:
+                    self.add(source, translation, profile)
+                    break
+        logger.info(f"Translation memory loaded {len(self._entries)} sentences")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'model_version': self.model_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+translation_memory = TranslationMemory(
+    settings.TRANSLATION_MEMORY_ENABLED,
+    max_size=settings.TRANSLATION_MEMORY_SIZE,
+    model_version=translation_cache.model_version,
+)
+translation_cache.on_invalidate(translation_memory.clear)
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Giây; đủ rộng cho cả bước tách token (ms) lẫn giải mã audio dài (hàng chục giây)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        key + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus text format.
+
+    Each label combination keeps per-bucket counts, a sum and a count;
+    `observe` is thread-safe and O(number of buckets).
+    """
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(key, dict(values, buckets=list(values['buckets']))) for key, values in series]
+        for key, values in series:
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, values['buckets']):
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {values['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {values['sum']:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values['count']}")
+        return lines
+
+
+def render_gauge(name, help_text, samples, kind='gauge'):
+    """Text-format lines for a metric computed at scrape time; `samples` is [(labels dict, value)]."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+    return lines
+
+
+stage_seconds = Histogram(
+    'trans_app_stage_seconds',
+    'Time spent in each processing stage (upload read, normalize, features, encoder, decoder, ...).',
+    labelnames=('model', 'stage'),
+)
+request_seconds = Histogram(
+    'trans_app_request_seconds', 'End-to-end API request latency.', labelnames=('endpoint', 'status'),
+)
+
+_capture = threading.local()
+
+
+def observe_stage(stage, seconds, model=''):
+    captured = getattr(_capture, 'observations', None)
+    if captured is not None:
+        captured.append((stage, seconds, model))
+    else:
+        stage_seconds.observe(seconds, model=model, stage=stage)
+
+
+@contextmanager
+def stage(name, model=''):
+    """Time the enclosed block as one observation of `trans_app_stage_seconds`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started, model)
+
+
+@contextmanager
+def capture():
+    """
+    Collect stage observations instead of recording them.
+
+    Used in inference worker processes: their observations are sent back
+    with each result and replayed into the web process's histograms.
+    """
+    _capture.observations = observations = []
+    try:
+        yield observations
+    finally:
+        _capture.observations = None
+
+
+def replay(observations):
+    for name, seconds, model in observations:
+        stage_seconds.observe(seconds, model=model, stage=name)
+
+
+def resident_memory():
+    """Current resident set size of this process in bytes (None where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,20 @@
+import time
+
+from . import metrics
+
+
+class RequestTimingMiddleware:
+    """Record the latency of every API request in `trans_app_request_seconds`, labelled by URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name and match.url_name != 'metrics':
+            metrics.request_seconds.observe(
+                time.perf_counter() - started, endpoint=match.url_name, status=response.status_code
+            )
+        return response
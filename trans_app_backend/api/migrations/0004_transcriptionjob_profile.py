@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_transcriptionjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transcriptionjob",
+            name="profile",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+    ]
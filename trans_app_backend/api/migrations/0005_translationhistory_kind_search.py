@@ -0,0 +1,84 @@
+from django.db import migrations, models
+
+# Chỉ mục full-text (SQLite FTS5, external content): chỉ lưu token, nội dung vẫn nằm
+# trong bảng api_translationhistory; trigger giữ chỉ mục đồng bộ khi ghi/sửa/xóa.
+FTS_CREATE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_translationhistory_fts USING fts5(
+        input_text, translation,
+        content='api_translationhistory', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_translationhistory_fts_ai AFTER INSERT ON api_translationhistory BEGIN
+        INSERT INTO api_translationhistory_fts(rowid, input_text, translation)
+        VALUES (new.id, new.input_text, new.translation);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_translationhistory_fts_ad AFTER DELETE ON api_translationhistory BEGIN
+        INSERT INTO api_translationhistory_fts(api_translationhistory_fts, rowid, input_text, translation)
+        VALUES ('delete', old.id, old.input_text, old.translation);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_translationhistory_fts_au AFTER UPDATE ON api_translationhistory BEGIN
+        INSERT INTO api_translationhistory_fts(api_translationhistory_fts, rowid, input_text, translation)
+        VALUES ('delete', old.id, old.input_text, old.translation);
+        INSERT INTO api_translationhistory_fts(rowid, input_text, translation)
+        VALUES (new.id, new.input_text, new.translation);
+    END
+    """,
+    "INSERT INTO api_translationhistory_fts(api_translationhistory_fts) VALUES ('rebuild')",
+]
+FTS_DROP = [
+    "DROP TRIGGER IF EXISTS api_translationhistory_fts_ai",
+    "DROP TRIGGER IF EXISTS api_translationhistory_fts_ad",
+    "DROP TRIGGER IF EXISTS api_translationhistory_fts_au",
+    "DROP TABLE IF EXISTS api_translationhistory_fts",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        # Database khác SQLite (hoặc SQLite không có FTS5) dùng tìm kiếm icontains trong api/history.py
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if not any('ENABLE_FTS5' in row[0] for row in cursor.fetchall()):
+                return
+            for statement in statements:
+                cursor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_transcriptionjob_profile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="translationhistory",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("transcribe", "Transcribe"),
+                    ("translate", "Translate"),
+                    ("tts", "Text to speech"),
+                    ("pipeline", "Pipeline"),
+                ],
+                default="translate",
+                max_length=16,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="translationhistory",
+            index=models.Index(fields=["kind", "created_at"], name="api_transla_kind_bd883a_idx"),
+        ),
+        migrations.RunPython(run_on_sqlite(FTS_CREATE), run_on_sqlite(FTS_DROP)),
+    ]
@@ -1,6 +1,20 @@
+import uuid
+
 from django.db import models
 
 class TranslationHistory(models.Model):
+    KIND_TRANSCRIBE = 'transcribe'
+    KIND_TRANSLATE = 'translate'
+    KIND_TTS = 'tts'
+    KIND_PIPELINE = 'pipeline'
+    KIND_CHOICES = [
+        (KIND_TRANSCRIBE, 'Transcribe'),
+        (KIND_TRANSLATE, 'Translate'),
+        (KIND_TTS, 'Text to speech'),
+        (KIND_PIPELINE, 'Pipeline'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_TRANSLATE)
     input_text = models.TextField(blank=True)  # Văn bản đầu vào (có thể rỗng)
     translation = models.TextField(blank=True)  # Văn bản đã dịch (có thể rỗng)
     speech_url = models.URLField(blank=True, null=True)  # URL file MP3 (có thể null)
@@ -11,4 +25,61 @@ class TranslationHistory(models.Model):
 
     class Meta:
         ordering = ['-created_at']  # Sắp xếp theo thời gian tạo (mới nhất trước)
-        indexes = [models.Index(fields=['created_at'])]  # Index để tối ưu truy vấn
\ No newline at end of file
+        indexes = [
+            models.Index(fields=['created_at']),  # Index để tối ưu truy vấn
+            models.Index(fields=['kind', 'created_at']),  # Lọc theo loại request mà vẫn phân trang theo index
+        ]
+
+
+class TranslationCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)  # sha256 của văn bản chuẩn hóa + phiên bản mô hình + tham số
+    model_version = models.CharField(max_length=32, db_index=True)
+    source_text = models.TextField()
+    translation = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.source_text} -> {self.translation}"
+
+
+
+class CacheGeneration(models.Model):
+    # Tăng mỗi khi cache bị xóa toàn bộ (lệnh quản trị, admin) để tiến trình server xóa cache trong bộ nhớ
+    name = models.CharField(max_length=32, unique=True)
+    value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class TranscriptionJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    ]
+    FINISHED = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    priority = models.IntegerField(default=0)  # Số lớn hơn được xử lý trước
+    duration = models.FloatField(default=0.0)  # Độ dài âm thanh (giây)
+    profile = models.CharField(max_length=16, blank=True)  # Profile giải mã (trống = DECODING_PROFILE)
+    audio_path = models.CharField(max_length=255, blank=True)  # PCM 16kHz float32 (.npy) chờ xử lý
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    owner = models.CharField(max_length=64, blank=True)  # "host:pid" của tiến trình đang chạy job
+    lease_expires_at = models.DateTimeField(blank=True, null=True)  # Hết hạn = tiến trình chủ đã chết
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
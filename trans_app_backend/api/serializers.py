@@ -1,7 +1,12 @@
 from rest_framework import serializers
-from .models import History
+from .models import TranslationHistory, TranscriptionJob
 
 class TranslationHistorySerializer(serializers.ModelSerializer):
     class Meta:
-        model = History
-        fields = ['id', 'input_text', 'translation', 'speech_url', 'created_at']
\ No newline at end of file
+        model = TranslationHistory
+        fields = ['id', 'kind', 'input_text', 'translation', 'speech_url', 'created_at']
+
+class TranscriptionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TranscriptionJob
+        fields = ['id', 'status', 'priority', 'profile', 'duration', 'result', 'error', 'created_at', 'started_at', 'finished_at']
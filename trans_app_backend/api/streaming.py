@@ -0,0 +1,236 @@
+import asyncio
+import json
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from .admission import Overloaded, whisper_admission
+from .audio import WHISPER_SAMPLE_RATE, WHISPER_WINDOW_SECONDS, frame_energy_db, speech_threshold
+from .decoding import get_profile
+from .throttling import TokenBucketThrottle
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_FORMATS = {
+    's16le': (np.dtype('<i2'), 32768.0),
+    'f32le': (np.dtype('<f4'), 1.0),
+}
+# Khung VAD 30ms, giống detect_speech
+VAD_FRAME_MS = 30
+VAD_FRAME = WHISPER_SAMPLE_RATE * VAD_FRAME_MS // 1000
+MIN_SPEECH_FRAMES = 5  # 150ms
+
+
+class TranscriptionSession:
+    """
+    Rolling audio buffer for one streaming client.
+
+    Incoming 16kHz mono PCM is appended to the buffer. Every
+    `partial_interval` seconds of new audio the buffer is decoded and a
+    partial transcript is pushed; when the speaker pauses (VAD finds
+    `min_silence` seconds after speech) or the buffer reaches Whisper's 30s
+    window, the utterance is decoded one last time, sent as final and
+    dropped from the buffer.
+
+    Voice activity is tracked incrementally: only the frames added by each
+    message are scored, so the per-message cost does not grow with the
+    utterance. Every decode takes a Whisper admission slot, like the HTTP
+    endpoints; a final decode that is shed or fails is reported to the
+    client as an error message.
+    """
+
+    def __init__(self, send, sample_format='s16le', profile=None):
+        self.send = send
+        self.set_format(sample_format)
+        self.set_profile(profile)
+        self.buffer = np.zeros(int(WHISPER_WINDOW_SECONDS * WHISPER_SAMPLE_RATE), dtype=np.float32)
+        self.length = 0
+        self.offset = 0.0  # thời điểm (giây) của mẫu đầu tiên trong buffer
+        self.since_partial = 0
+        self.partial_interval = int(settings.STREAMING_PARTIAL_INTERVAL * WHISPER_SAMPLE_RATE)
+        self.min_silence = settings.VAD_MIN_SILENCE_SECONDS
+        self._energy = np.empty(len(self.buffer) // VAD_FRAME, dtype=np.float32)  # dBFS từng khung trong buffer
+        self._frames = 0  # số khung đã tính năng lượng
+        self._decoding = None
+
+    def set_format(self, sample_format):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format: {sample_format}")
+        self.dtype, self.scale = SAMPLE_FORMATS[sample_format]
+
+    def set_profile(self, profile):
+        self.profile = get_profile(profile, settings.DECODING_PROFILE)
+
+    async def feed(self, data):
+        if len(data) % self.dtype.itemsize:
+            raise ValueError(f"Audio frame of {len(data)} bytes is not a whole number of samples")
+        samples = np.frombuffer(data, dtype=self.dtype).astype(np.float32) / self.scale
+        while len(samples):
+            space = len(self.buffer) - self.length
+            take = samples[:space]
+            self.buffer[self.length:self.length + len(take)] = take
+            self.length += len(take)
+            self.since_partial += len(take)
+            samples = samples[len(take):]
+            if self.length == len(self.buffer):
+                # Đầy cửa sổ 30s: chốt đoạn hiện tại
+                await self.finalize(self.length)
+
+        end = self.utterance_end()
+        if end is not None:
+            await self.finalize(end)
+        elif self.since_partial >= self.partial_interval and self._decoding is None:
+            self.since_partial = 0
+            if len(self._voiced()) < MIN_SPEECH_FRAMES:
+                return  # chưa có tiếng nói: không giải mã bản tạm
+            self._decoding = asyncio.ensure_future(self.partial())
+
+    def _score(self):
+        # Chỉ tính năng lượng cho các khung mới đủ 30ms
+        count = self.length // VAD_FRAME
+        if count > self._frames:
+            audio = self.buffer[self._frames * VAD_FRAME:count * VAD_FRAME]
+            self._energy[self._frames:count] = frame_energy_db(audio, WHISPER_SAMPLE_RATE, VAD_FRAME_MS)
+            self._frames = count
+
+    def _voiced(self, frames=None):
+        """Indices of the voiced frames among the first `frames` scored frames."""
+        energy = self._energy[:self._frames if frames is None else min(frames, self._frames)]
+        if not len(energy):
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(energy > speech_threshold(energy, settings.VAD_THRESHOLD_DB))
+
+    def utterance_end(self):
+        """Sample index where the current utterance ends, if the speaker has paused."""
+        self._score()
+        voiced = self._voiced()
+        if len(voiced) < MIN_SPEECH_FRAMES:
+            # Chỉ toàn khoảng lặng: bỏ đi, giữ lại một ít để không cắt mất âm đầu
+            keep = int(0.5 * WHISPER_SAMPLE_RATE)
+            if self.length > 2 * keep:
+                self.discard(self.length - keep)
+            return None
+        last_end = (voiced[-1] + 1) * VAD_FRAME
+        # Độ dài khoảng lặng ở cuối buffer
+        if (self.length - last_end) / WHISPER_SAMPLE_RATE >= self.min_silence:
+            return min(self.length, last_end + int(0.2 * WHISPER_SAMPLE_RATE))
+        return None
+
+    async def decode(self, audio):
+        from .views import transcription_batcher
+
+        async with whisper_admission.admit_async():
+            return await asyncio.wrap_future(transcription_batcher.submit((audio, self.profile)))
+
+    async def partial(self):
+        try:
+            text = await self.decode(self.buffer[:self.length].copy())
+            await self.send({'type': 'partial', 'text': text, 'start': round(self.offset, 2)})
+        except Overloaded:
+            pass  # bản tạm bị bỏ khi quá tải, bản cuối vẫn được giải mã
+        except Exception as e:
+            logger.error(f"Error in streaming partial decode: {str(e)}")
+        finally:
+            self._decoding = None
+
+    async def finalize(self, end):
+        if self._decoding is not None:
+            await self._decoding
+        self._score()
+        has_speech = len(self._voiced((end + VAD_FRAME - 1) // VAD_FRAME)) >= MIN_SPEECH_FRAMES
+        audio = self.buffer[:end].copy()
+        start = self.offset
+        self.discard(end)
+        self.since_partial = 0
+        if not has_speech:
+            return
+        end_time = round(start + len(audio) / WHISPER_SAMPLE_RATE, 2)
+        try:
+            text = await self.decode(audio)
+        except Overloaded as e:
+            await self.send({
+                'type': 'error', 'error': str(e), 'retry_after': e.retry_after,
+                'start': round(start, 2), 'end': end_time,
+            })
+            return
+        except Exception as e:
+            logger.error(f"Error in streaming final decode: {str(e)}")
+            await self.send({'type': 'error', 'error': 'Transcription failed', 'start': round(start, 2), 'end': end_time})
+            return
+        await self.send({'type': 'final', 'text': text, 'start': round(start, 2), 'end': end_time})
+
+    def discard(self, count):
+        remaining = self.length - count
+        self.buffer[:remaining] = self.buffer[count:self.length]
+        self.length = remaining
+        self.offset += count / WHISPER_SAMPLE_RATE
+        # Các khung không còn thẳng hàng với đầu buffer: tính lại phần còn lại (ngắn) ở lần sau
+        self._frames = 0
+
+    async def flush(self):
+        if self.length:
+            await self.finalize(self.length)
+
+
+async def transcription_stream(scope, receive, send):
+    """
+    ASGI WebSocket endpoint for real-time transcription.
+
+    Protocol: binary messages carry 16kHz mono PCM (s16le by default). Text
+    messages are JSON: {"type": "config", "sample_format": "f32le",
+    "profile": "fast"} switches the sample format and/or decoding profile,
+    and {"type": "stop"} flushes the last utterance and closes the socket.
+    The server sends {"type": "partial"|"final", "text", "start"[, "end"]}
+    messages, timestamps in seconds from stream start, and {"type": "error",
+    "error"} for a malformed message or an utterance that could not be
+    decoded (with "retry_after" when shed by admission control).
+
+    A connection takes one token from the client's rate-limit bucket (shared
+    with the HTTP model endpoints); a client over its limit gets an error
+    message and the socket is closed with 1013 (try again later).
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def send_json(payload):
+        await send({'type': 'websocket.send', 'text': json.dumps(payload, ensure_ascii=False)})
+
+    throttle = TokenBucketThrottle()
+    client = (scope.get('client') or ('unknown',))[0]
+    if not throttle.take(f"ip:{client}"):
+        await send_json({'type': 'error', 'error': 'Rate limit exceeded', 'retry_after': throttle.wait()})
+        await send({'type': 'websocket.close', 'code': 1013})
+        return
+
+    session = TranscriptionSession(send_json)
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+            if message.get('bytes'):
+                try:
+                    await session.feed(message['bytes'])
+                except ValueError as e:
+                    await send_json({'type': 'error', 'error': str(e)})
+                continue
+
+            try:
+                command = json.loads(message.get('text') or '{}')
+                if command.get('type') == 'config':
+                    if 'sample_format' in command:
+                        session.set_format(command['sample_format'])
+                    if 'profile' in command:
+                        session.set_profile(command['profile'])
+                elif command.get('type') == 'stop':
+                    await session.flush()
+                    await send({'type': 'websocket.close', 'code': 1000})
+                    return
+            except ValueError as e:
+                await send_json({'type': 'error', 'error': str(e)})
+    except Exception as e:
+        logger.error(f"Error in transcription stream: {str(e)}")
+        await send({'type': 'websocket.close', 'code': 1011})
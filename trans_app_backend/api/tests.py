@@ -1,3 +1,992 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import history, inference, metrics
+from .admission import AdmissionController, Overloaded
+from .audio import WHISPER_SAMPLE_RATE, decode_audio, detect_speech, resample, split_windows, stitch_transcripts
+from .batching import PRIORITY_BACKGROUND, MicroBatcher
+from .cache import LRUCache, TranslationCache
+from .decoding import (
+    DEFAULT_PROFILE, MARIAN_MAX_NEW_TOKENS, MIN_NEW_TOKENS, WHISPER_MAX_NEW_TOKENS, get_profile,
+    translation_generate_kwargs, whisper_generate_kwargs,
+)
+from .history import HistoryWriter, decode_cursor, encode_cursor, fts_query, page, search
+from .jobs import JobQueue
+from .memory import TranslationMemory, fold
+from .streaming import TranscriptionSession, transcription_stream
+from .text import length_buckets, reassemble, segment_text, split_long, split_sentences
+from .throttling import TokenBucketThrottle
+from .tts import TTSStore
+from .models import TranscriptionJob, TranslationCacheEntry, TranslationHistory
+from .uploads import AudioUploadHandler, DecodedAudioFile, UploadRejected, WavStream
+from .views import MetricsView, TranscribeView
+from .workers import InferencePool, WorkerCrashed
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def make_batcher(self, batch_fn=None, **kwargs):
+        calls = []
+
+        def record(items):
+            calls.append(list(items))
+            return batch_fn(items) if batch_fn else [item * 2 for item in items]
+
+        return MicroBatcher(record, 'test', **kwargs), calls
+
+    def test_concurrent_items_share_one_batch(self):
+        batcher, calls = self.make_batcher(max_batch_size=8, max_wait=0.2)
+        futures = [batcher.submit(i) for i in range(5)]
+        self.assertEqual([f.result(5) for f in futures], [0, 2, 4, 6, 8])
+        self.assertEqual(calls, [[0, 1, 2, 3, 4]])
+
+    def test_batch_size_is_capped(self):
+        gate = threading.Event()
+        batcher, calls = self.make_batcher(lambda items: gate.wait(5) and [item for item in items],
+                                           max_batch_size=2, max_wait=0.05)
+        futures = [batcher.submit(i) for i in range(5)]
+        gate.set()
+        self.assertEqual([f.result(5) for f in futures], list(range(5)))
+        self.assertTrue(all(len(call) <= 2 for call in calls))
+        self.assertEqual(batcher.stats()['items'], 5)
+
+    def test_exception_reaches_every_future(self):
+        def fail(items):
+            raise RuntimeError("model failed")
+
+        batcher, _ = self.make_batcher(fail, max_batch_size=4, max_wait=0.05)
+        futures = [batcher.submit(i) for i in range(3)]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "model failed"):
+                future.result(5)
+
+    def test_wrong_result_count_is_an_error(self):
+        batcher, _ = self.make_batcher(lambda items: items[:-1], max_wait=0)
+        with self.assertRaises(RuntimeError):
+            batcher(1, timeout=5)
+
+    def test_call_timeout(self):
+        gate = threading.Event()
+        batcher, _ = self.make_batcher(lambda items: gate.wait(5) and items, max_wait=0)
+        try:
+            with self.assertRaises(FutureTimeoutError):
+                batcher(1, timeout=0.05)
+        finally:
+            gate.set()
+
+    def test_key_splits_batches(self):
+        batcher, calls = self.make_batcher(max_batch_size=8, max_wait=0.2, key=lambda item: item % 2)
+        futures = [batcher.submit(i) for i in range(1, 5)]
+        self.assertEqual([f.result(5) for f in futures], [2, 4, 6, 8])
+        self.assertCountEqual(calls, [[1, 3], [2, 4]])
+
+    def test_interactive_items_go_before_background(self):
+        gate = threading.Event()
+
+        def slow(items):
+            gate.wait(5)
+            return items
+
+        batcher, calls = self.make_batcher(slow, max_batch_size=1, max_wait=0)
+        first = batcher.submit('first')
+        time.sleep(0.05)  # 'first' đang chạy, các phần tử sau nằm trong hàng đợi
+        background = [batcher.submit(f'job-{i}', PRIORITY_BACKGROUND) for i in range(2)]
+        interactive = batcher.submit('upload')
+        gate.set()
+        for future in [first, interactive, *background]:
+            future.result(5)
+        self.assertEqual(calls, [['first'], ['upload'], ['job-0'], ['job-1']])
+
+    def test_cancelled_items_are_skipped(self):
+        gate = threading.Event()
+
+        def slow(items):
+            gate.wait(5)
+            return items
+
+        batcher, calls = self.make_batcher(slow, max_batch_size=8, max_wait=0.05)
+        first = batcher.submit(0)
+        cancelled = batcher.submit(1)
+        kept = batcher.submit(2)
+        self.assertTrue(cancelled.cancel())
+        gate.set()
+        first.result(5)
+        self.assertEqual(kept.result(5), 2)
+        self.assertNotIn(1, [item for call in calls for item in call])
+
+
+def tone(seconds, amplitude=0.3, frequency=220.0, sample_rate=WHISPER_SAMPLE_RATE):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+class DetectSpeechTests(SimpleTestCase):
+    def test_silence_has_no_speech(self):
+        self.assertEqual(detect_speech(np.zeros(3 * WHISPER_SAMPLE_RATE, dtype=np.float32)), [])
+
+    def test_fully_voiced_clip_is_speech(self):
+        # Không có khoảng lặng nào: noise floor không được phép đẩy ngưỡng lên trên mọi frame
+        audio = tone(3.0)
+        segments = detect_speech(audio)
+        self.assertEqual(len(segments), 1)
+        start, end = segments[0]
+        self.assertLessEqual(start, WHISPER_SAMPLE_RATE // 10)
+        self.assertGreaterEqual(end, len(audio) - WHISPER_SAMPLE_RATE // 10)
+
+    def test_continuous_noise_is_speech(self):
+        rng = np.random.default_rng(0)
+        audio = (0.2 * rng.standard_normal(3 * WHISPER_SAMPLE_RATE)).astype(np.float32)
+        self.assertEqual(len(detect_speech(audio)), 1)
+
+    def test_long_pause_splits_segments(self):
+        audio = np.concatenate([tone(1.0), np.zeros(2 * WHISPER_SAMPLE_RATE, dtype=np.float32), tone(1.0)])
+        segments = detect_speech(audio)
+        self.assertEqual(len(segments), 2)
+        self.assertLess(segments[0][1], segments[1][0])
+
+
+def peak_frequency(audio, sample_rate):
+    spectrum = np.abs(np.fft.rfft(audio))
+    return np.argmax(spectrum) * sample_rate / len(audio)
+
+
+class ResampleTests(SimpleTestCase):
+    def test_downsample_keeps_length_and_pitch(self):
+        audio = tone(2.0, frequency=440.0, sample_rate=44100)
+        out = resample(audio, 44100)
+        self.assertEqual(out.dtype, np.float32)
+        self.assertEqual(len(out), 2 * WHISPER_SAMPLE_RATE)
+        self.assertAlmostEqual(peak_frequency(out, WHISPER_SAMPLE_RATE), 440.0, delta=1.0)
+        self.assertAlmostEqual(float(np.abs(out).max()), 0.3, delta=0.01)
+
+    def test_downsample_drops_content_above_nyquist(self):
+        # 10 kHz > 8 kHz (Nyquist của 16 kHz): phải bị lọc bỏ, không gập về thành 6 kHz
+        out = resample(tone(1.0, frequency=10000.0, sample_rate=44100), 44100)
+        self.assertLess(float(np.abs(out).max()), 0.01)
+
+    def test_upsample(self):
+        out = resample(tone(1.0, frequency=440.0, sample_rate=8000), 8000)
+        self.assertEqual(len(out), WHISPER_SAMPLE_RATE)
+        self.assertAlmostEqual(peak_frequency(out, WHISPER_SAMPLE_RATE), 440.0, delta=1.0)
+
+    def test_same_rate_is_unchanged(self):
+        audio = tone(0.5)
+        self.assertIs(resample(audio, WHISPER_SAMPLE_RATE), audio)
+
+
+class DecodeAudioTests(SimpleTestCase):
+    def test_wav_is_read_by_soundfile(self):
+        audio = decode_audio(io.BytesIO(wav_bytes(np.full((8000, 2), 16384), channels=2, sample_rate=8000)))
+        self.assertEqual(len(audio), WHISPER_SAMPLE_RATE)
+        self.assertAlmostEqual(float(audio.mean()), 0.5, places=3)
+
+    def test_unsupported_container_falls_back_to_pydub(self):
+        import pydub
+
+        # Stereo 16-bit 8 kHz, kênh trái 0.5 và kênh phải 0: gộp mono cho 0.25
+        frames = np.zeros((8000, 2), dtype='<i2')
+        frames[:, 0] = 16384
+        segment = pydub.AudioSegment(frames.tobytes(), sample_width=2, frame_rate=8000, channels=2)
+        source = io.BytesIO(b'\x00\x00\x00\x20ftypM4A ' + bytes(64))
+        with mock.patch.object(pydub.AudioSegment, 'from_file', return_value=segment) as from_file:
+            audio = decode_audio(source)
+        from_file.assert_called_once_with(source)
+        self.assertEqual(source.tell(), 0)
+        self.assertEqual(len(audio), WHISPER_SAMPLE_RATE)
+        self.assertAlmostEqual(float(audio.mean()), 0.25, places=3)
+
+
+class SplitWindowsTests(SimpleTestCase):
+    def test_windows_overlap_and_cover_the_clip(self):
+        audio = np.arange(70 * 10, dtype=np.float32)
+        windows = split_windows(audio, sample_rate=10, window_s=30, overlap_s=5)
+        self.assertEqual([(start, end) for start, end, _ in windows], [(0, 30), (25, 55), (50, 70)])
+        self.assertEqual(len(windows[-1][2]), 200)
+
+    def test_short_clip_is_one_window(self):
+        audio = np.zeros(50, dtype=np.float32)
+        self.assertEqual(len(split_windows(audio, sample_rate=10)), 1)
+
+    def test_overlap_must_be_smaller_than_window(self):
+        with self.assertRaises(ValueError):
+            split_windows(np.zeros(10), sample_rate=10, window_s=5, overlap_s=5)
+
+
+class StitchTranscriptsTests(SimpleTestCase):
+    def test_overlap_is_removed(self):
+        texts = ["xin chào tôi tên là Nam", "tên là Nam và tôi đến từ Hà Nội"]
+        self.assertEqual(stitch_transcripts(texts), "xin chào tôi tên là Nam và tôi đến từ Hà Nội")
+
+    def test_overlap_ignores_case_and_punctuation(self):
+        texts = ["hôm nay trời đẹp quá,", "Trời đẹp quá. Chúng ta đi chơi"]
+        self.assertEqual(stitch_transcripts(texts), "hôm nay Trời đẹp quá. Chúng ta đi chơi")
+
+    def test_no_overlap_concatenates(self):
+        self.assertEqual(stitch_transcripts(["một hai", "", "ba bốn"]), "một hai ba bốn")
+
+
+class TextSegmentationTests(SimpleTestCase):
+    def test_sentences_split_before_capital_or_number(self):
+        self.assertEqual(
+            split_sentences("Tôi đi học. Trời mưa to! 3 người đến muộn... và về sớm."),
+            ["Tôi đi học.", "Trời mưa to!", "3 người đến muộn... và về sớm."],
+        )
+
+    def test_abbreviations_do_not_end_sentences(self):
+        text = "Ông ấy sống ở TP. Hồ Chí Minh. PGS. TS. Nguyễn Văn A dạy ở đó."
+        self.assertEqual(
+            split_sentences(text), ["Ông ấy sống ở TP. Hồ Chí Minh.", "PGS. TS. Nguyễn Văn A dạy ở đó."]
+        )
+
+    def test_long_sentence_splits_at_clauses_then_words(self):
+        sentence = "một hai ba; bốn năm sáu, bảy tám chín mười"
+        pieces = split_long(sentence, max_chars=20)
+        self.assertTrue(all(len(piece) <= 20 for piece in pieces))
+        self.assertEqual(" ".join(pieces), sentence)
+        self.assertEqual(pieces[0], "một hai ba;")
+
+    def test_segment_and_reassemble_keep_paragraphs(self):
+        paragraphs = segment_text("Xin chào. Bạn khỏe không?\n\n  Tôi   khỏe.  ")
+        self.assertEqual(paragraphs, [["Xin chào.", "Bạn khỏe không?"], ["Tôi khỏe."]])
+        self.assertEqual(reassemble(paragraphs, ["Hello.", "How are you?", "I am fine."]),
+                         "Hello. How are you?\nI am fine.")
+
+    def test_empty_text_has_no_paragraphs(self):
+        self.assertEqual(segment_text("  \n "), [])
+
+    def test_length_buckets_respect_limits(self):
+        lengths = [5, 50, 6, 48, 7, 100]
+        buckets = length_buckets(lengths, max_batch_size=2, max_tokens=120)
+        self.assertCountEqual([i for bucket in buckets for i in bucket], range(len(lengths)))
+        for bucket in buckets:
+            self.assertLessEqual(len(bucket), 2)
+            self.assertLessEqual(len(bucket) * max(lengths[i] for i in bucket), 120)
+        self.assertEqual(buckets[0], [0, 2])
+
+
+class DecodingProfileTests(SimpleTestCase):
+    def test_profile_kwargs(self):
+        # 10 giây audio / 20 token nguồn
+        self.assertEqual(whisper_generate_kwargs('fast', 10), {'num_beams': 1, 'do_sample': False, 'max_new_tokens': 96})
+        self.assertEqual(whisper_generate_kwargs('balanced', 10), {'num_beams': 2, 'early_stopping': True, 'max_new_tokens': 136})
+        self.assertEqual(whisper_generate_kwargs('accurate', 10), {'num_beams': 5, 'early_stopping': True, 'max_new_tokens': 176})
+        self.assertEqual(translation_generate_kwargs('fast', 20), {'num_beams': 1, 'do_sample': False, 'max_new_tokens': 46})
+        self.assertEqual(translation_generate_kwargs('balanced', 20), {'num_beams': 2, 'early_stopping': True, 'max_new_tokens': 56})
+        self.assertEqual(translation_generate_kwargs('accurate', 20), {'num_beams': 5, 'early_stopping': True, 'max_new_tokens': 66})
+
+    def test_empty_input_gets_minimum_budget(self):
+        self.assertEqual(whisper_generate_kwargs('accurate', 0)['max_new_tokens'], MIN_NEW_TOKENS)
+        self.assertEqual(translation_generate_kwargs('accurate', 0)['max_new_tokens'], MIN_NEW_TOKENS)
+
+    def test_caps(self):
+        self.assertEqual(whisper_generate_kwargs('accurate', 30)['max_new_tokens'], WHISPER_MAX_NEW_TOKENS)
+        self.assertEqual(whisper_generate_kwargs('fast', 3600)['max_new_tokens'], WHISPER_MAX_NEW_TOKENS)
+        self.assertEqual(translation_generate_kwargs('accurate', 512)['max_new_tokens'], MARIAN_MAX_NEW_TOKENS)
+        # Ngay dưới ngưỡng thì chưa bị cắt
+        self.assertEqual(whisper_generate_kwargs('fast', 50)['max_new_tokens'], 416)
+
+    def test_get_profile(self):
+        self.assertEqual(get_profile(), DEFAULT_PROFILE)
+        self.assertEqual(get_profile(None, default='balanced'), 'balanced')
+        self.assertEqual(get_profile('accurate'), 'accurate')
+        with self.assertRaises(ValueError):
+            get_profile('greedy')
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire_after_ttl(self):
+        cache = LRUCache(max_size=4, ttl=0.05)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        time.sleep(0.1)
+        self.assertEqual(cache.get('a', 'missing'), 'missing')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations'], stats['size']), (1, 1, 1, 0))
+
+    def test_zero_size_disables_cache(self):
+        cache = LRUCache(max_size=0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+
+class TranslationMemoryTests(SimpleTestCase):
+    def setUp(self):
+        self.memory = TranslationMemory(True, max_size=4, model_version='v1')
+        self.memory._loader = threading.current_thread()  # không nạp từ database
+        self.memory.add("Tôi thích ăn phở.", "I like eating pho.", 'fast')
+
+    def test_fold_keeps_diacritics(self):
+        self.assertEqual(fold("  Má  ơi, MÀ! "), "má ơi mà")
+        self.assertNotEqual(fold("ma"), fold("mà"))
+
+    def test_identical_text_scores_one(self):
+        self.assertEqual(self.memory.lookup("Tôi  thích ăn phở.", 'fast'), ("I like eating pho.", 1.0))
+
+    def test_case_and_punctuation_are_reused_below_one(self):
+        translation, score = self.memory.lookup("tôi thích ăn phở!", 'fast')
+        self.assertEqual(translation, "I like eating pho.")
+        self.assertLess(score, 1.0)
+
+    def test_word_changes_are_never_reused(self):
+        for text in ("Tôi không thích ăn phở.", "Tôi thích phở.", "Tôi thích ăn bún.", "Toi thich an pho."):
+            self.assertIsNone(self.memory.lookup(text, 'fast'), text)
+
+    def test_entries_are_keyed_by_profile_and_model(self):
+        self.assertIsNone(self.memory.lookup("Tôi thích ăn phở.", 'accurate'))
+        self.memory.model_version = 'v2'
+        self.assertIsNone(self.memory.lookup("Tôi thích ăn phở.", 'fast'))
+
+
+class TTSStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = TTSStore(self.directory.name, max_bytes=0, max_age=0, sweep_interval=0)
+
+    def test_concurrent_requests_synthesize_once(self):
+        calls = []
+        start = threading.Barrier(8)
+
+        def synthesize(path):
+            calls.append(path)
+            time.sleep(0.05)
+            with open(path, 'wb') as f:
+                f.write(b'audio')
+
+        def request():
+            start.wait(5)
+            return self.store.get_or_create('key', synthesize, 'wav')
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.store.stats()['hits'], 7)
+        self.assertEqual(self.store._key_locks, {})
+
+    def test_sweep_keeps_files_being_written(self):
+        old = self.store.directory / 'old.wav'
+        old.write_bytes(b'x' * 100)
+        os.utime(old, (time.time() - 60, time.time() - 60))
+
+        def synthesize(path):
+            with open(path, 'wb') as f:
+                f.write(b'audio')
+            os.utime(path, (time.time() - 120, time.time() - 120))  # file dở dang cũ nhất thư mục
+            self.store.max_bytes = 1
+            self.assertEqual(self.store.sweep(), 1)
+
+        filename, hit = self.store.get_or_create('key', synthesize, 'wav')
+        self.assertFalse(hit)
+        self.assertTrue((self.store.directory / filename).exists())
+        self.assertFalse(old.exists())
+
+    def test_sweep_removes_stale_temp_files(self):
+        stale = self.store.directory / 'key.abc.tmp'
+        stale.write_bytes(b'partial')
+        os.utime(stale, (time.time() - 2 * 3600, time.time() - 2 * 3600))
+        self.assertEqual(self.store.sweep(), 1)
+        self.assertFalse(stale.exists())
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def hold_slot(self, controller):
+        """Occupy one slot from another thread until the returned event is set."""
+        admitted, release = threading.Event(), threading.Event()
+
+        def run():
+            with controller.admit():
+                admitted.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.assertTrue(admitted.wait(5))
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(release.set)
+        return release
+
+    def test_full_queue_is_shed(self):
+        controller = AdmissionController('test', max_in_flight=1, max_queue=0, max_wait=5)
+        self.hold_slot(controller)
+        with self.assertRaises(Overloaded) as ctx:
+            with controller.admit():
+                pass
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        self.assertEqual(controller.stats()['rejected_queue_full'], 1)
+
+    def test_waiter_gets_released_slot(self):
+        controller = AdmissionController('test', max_in_flight=1, max_queue=1, max_wait=5)
+        release = self.hold_slot(controller)
+        threading.Timer(0.05, release.set).start()
+        with controller.admit():
+            self.assertEqual(controller.stats()['in_flight'], 1)
+        stats = controller.stats()
+        self.assertEqual((stats['admitted'], stats['in_flight'], stats['queue_depth']), (2, 0, 0))
+
+    def test_waiter_times_out(self):
+        controller = AdmissionController('test', max_in_flight=1, max_queue=1, max_wait=0.05)
+        self.hold_slot(controller)
+        with self.assertRaises(Overloaded):
+            with controller.admit():
+                pass
+        self.assertEqual(controller.stats()['timed_out'], 1)
+        self.assertEqual(controller.stats()['queue_depth'], 0)
+
+    def test_expected_wait_over_deadline_is_shed(self):
+        controller = AdmissionController('test', max_in_flight=1, max_queue=8, max_wait=1)
+        self.hold_slot(controller)
+        controller._service_time = 3.0  # mỗi request trước mất khoảng 3s
+        with self.assertRaises(Overloaded) as ctx:
+            with controller.admit():
+                pass
+        self.assertEqual(ctx.exception.retry_after, 3)
+        self.assertEqual(controller.stats()['rejected_deadline'], 1)
+
+
+@override_settings(CLIENT_RATE_LIMIT=1, CLIENT_RATE_BURST=2)
+class TokenBucketThrottleTests(SimpleTestCase):
+    class LimitedView:
+        token_bucket_scope = 'model'
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.buckets = OrderedDict()
+
+    def allow(self, ip='10.0.0.1', view=LimitedView):
+        throttle = TokenBucketThrottle()
+        throttle._buckets = self.buckets  # mỗi test một bộ bucket riêng
+        request = self.factory.post('/', REMOTE_ADDR=ip)
+        request.user = AnonymousUser()
+        return throttle.allow_request(request, view()), throttle.wait()
+
+    def test_burst_then_rejected_with_retry_after(self):
+        self.assertTrue(self.allow()[0])
+        self.assertTrue(self.allow()[0])
+        allowed, wait = self.allow()
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 0.9)
+        self.assertLessEqual(wait, 1.0)
+
+    def test_clients_have_separate_buckets(self):
+        for _ in range(3):
+            self.allow('10.0.0.1')
+        self.assertTrue(self.allow('10.0.0.2')[0])
+
+    def test_unscoped_views_are_not_limited(self):
+        self.assertTrue(all(self.allow(view=object)[0] for _ in range(5)))
+
+    @override_settings(CLIENT_RATE_LIMIT=0)
+    def test_zero_rate_disables_limit(self):
+        self.assertTrue(all(self.allow()[0] for _ in range(5)))
+
+
+def wav_bytes(samples, bits=16, channels=1, sample_rate=16000, extensible=False, extra_chunks=(), data_size=None):
+    """RIFF/WAVE file from integer PCM samples (frames x channels), with optional chunks before `data`."""
+    width = bits // 8
+    data = b''.join(int(value).to_bytes(width, 'little', signed=bits > 8) for value in np.ravel(samples))
+    block_align = channels * width
+    fmt = struct.pack('<HHIIHH', 0xFFFE if extensible else 1, channels, sample_rate,
+                      sample_rate * block_align, block_align, bits)
+    if extensible:
+        # cbSize, valid bits, channel mask, SubFormat GUID (KSDATAFORMAT_SUBTYPE_PCM)
+        fmt += struct.pack('<HHI', 22, bits, 0) + b'\x01\x00\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71'
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+    for chunk_id, payload in extra_chunks:
+        body += chunk_id + struct.pack('<I', len(payload)) + payload + b'\x00' * (len(payload) % 2)
+    body += b'data' + struct.pack('<I', len(data) if data_size is None else data_size) + data
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def decode_wav(data, piece=7, max_bytes=1 << 20):
+    stream = WavStream(max_bytes)
+    for i in range(0, len(data), piece):
+        stream.feed(data[i:i + piece])
+    return stream.finish()
+
+
+class WavStreamTests(SimpleTestCase):
+    def test_pcm16_in_small_pieces(self):
+        audio, sample_rate = decode_wav(wav_bytes([0, 16384, -32768, 32767]), piece=1)
+        self.assertEqual(sample_rate, 16000)
+        np.testing.assert_allclose(audio, [0, 0.5, -1, 32767 / 32768])
+
+    def test_extensible_24bit_stereo_is_mixed_down(self):
+        samples = [[4194304, -4194304], [8388607, 8388607], [-8388608, 0]]
+        audio, _ = decode_wav(wav_bytes(samples, bits=24, channels=2, extensible=True))
+        np.testing.assert_allclose(audio, [0.0, 8388607 / 8388608, -0.5])
+
+    def test_odd_chunks_are_padded(self):
+        # Chunk LIST kích thước lẻ có byte đệm; chunk data 8-bit lẻ được theo sau bởi byte đệm và một chunk khác
+        data = wav_bytes([128, 192, 64], bits=8, extra_chunks=[(b'LIST', b'abc')])
+        data += b'\x00' + b'fact' + struct.pack('<I', 4) + b'\x03\x00\x00\x00'
+        audio, _ = decode_wav(data, piece=3)
+        np.testing.assert_allclose(audio, [0.0, 0.5, -0.5])
+
+    def test_truncated_data_keeps_complete_frames(self):
+        data = wav_bytes([100, 200, 300], data_size=100)[:-1]  # header hứa 100 byte, frame cuối bị cắt
+        audio, _ = decode_wav(data)
+        np.testing.assert_allclose(audio, [100 / 32768, 200 / 32768])
+
+    def test_truncated_header_is_rejected(self):
+        with self.assertRaises(UploadRejected):
+            decode_wav(wav_bytes([1, 2, 3])[:30])
+
+    def test_unsupported_sample_format_is_rejected(self):
+        data = bytearray(wav_bytes([1, 2]))
+        data[20:22] = struct.pack('<H', 2)  # ADPCM
+        with self.assertRaises(UploadRejected):
+            decode_wav(bytes(data))
+
+    def test_upload_handler_records_read_and_normalize_stages(self):
+        data = wav_bytes(np.zeros(1600, dtype=np.int16))
+        handler = AudioUploadHandler()
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file('audio', 'clip.wav', 'audio/wav', len(data))
+        with metrics.capture() as observations:
+            for i in range(0, len(data), 1000):
+                self.assertIsNone(handler.receive_data_chunk(data[i:i + 1000], i))
+            upload = handler.file_complete(len(data))
+        self.assertEqual(len(upload.samples), 1600)
+        self.assertEqual([stage for stage, _, _ in observations], ['upload_read', 'normalize'])
+
+    def test_decoded_file_behaves_like_a_file(self):
+        upload = DecodedAudioFile(np.zeros(4, dtype=np.float32), 'clip.wav', 'audio/wav', 44, 'wav')
+        self.assertEqual(upload.read(), b'')
+        self.assertEqual(list(upload.chunks()), [])
+        upload.close()
+
+
+def pcm16(audio):
+    return (np.clip(audio, -1, 1) * 32767).astype('<i2').tobytes()
+
+
+class TranscriptionSessionTests(SimpleTestCase):
+    def run_session(self, chunks, decode=None):
+        sent = []
+
+        async def send(payload):
+            sent.append(payload)
+
+        async def fake_decode(audio):
+            return f"{len(audio)} samples"
+
+        async def run():
+            session = TranscriptionSession(send)
+            session.decode = decode or fake_decode
+            for chunk in chunks:
+                await session.feed(chunk)
+            if session._decoding is not None:
+                await session._decoding
+
+        asyncio.run(run())
+        return sent
+
+    def speech_then_silence(self):
+        audio = np.concatenate([tone(1.5), np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32)])
+        piece = WHISPER_SAMPLE_RATE // 10
+        return [pcm16(audio[i:i + piece]) for i in range(0, len(audio), piece)]
+
+    def test_pause_after_speech_sends_one_final(self):
+        finals = [m for m in self.run_session(self.speech_then_silence()) if m['type'] == 'final']
+        self.assertEqual(len(finals), 1)
+        self.assertEqual(finals[0]['start'], 0.0)
+        self.assertGreaterEqual(finals[0]['end'], 1.5)
+        self.assertLess(finals[0]['end'], 2.5)
+
+    def test_silence_sends_nothing(self):
+        silence = pcm16(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32))
+        self.assertEqual(self.run_session([silence] * 3), [])
+
+    def test_overloaded_final_is_reported(self):
+        async def overloaded(audio):
+            raise Overloaded("whisper is overloaded (queue full)", 2)
+
+        messages = self.run_session(self.speech_then_silence(), decode=overloaded)
+        self.assertEqual([m['type'] for m in messages], ['error'])
+        self.assertEqual(messages[0]['retry_after'], 2)
+
+
+@override_settings(CLIENT_RATE_LIMIT=0)
+class TranscriptionStreamTests(SimpleTestCase):
+    def run_stream(self, messages):
+        incoming = [{'type': 'websocket.connect'}, *messages, {'type': 'websocket.disconnect'}]
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(transcription_stream({'type': 'websocket', 'client': ('127.0.0.1', 5000)}, receive, send))
+        return sent
+
+    def test_odd_length_frame_is_an_error_message(self):
+        sent = self.run_stream([
+            {'type': 'websocket.receive', 'bytes': b'\x01\x02\x03'},
+            {'type': 'websocket.receive', 'text': json.dumps({'type': 'stop'})},
+        ])
+        self.assertEqual(sent[0], {'type': 'websocket.accept'})
+        self.assertEqual(json.loads(sent[1]['text'])['type'], 'error')
+        self.assertEqual(sent[-1], {'type': 'websocket.close', 'code': 1000})
+
+    @override_settings(CLIENT_RATE_LIMIT=1, CLIENT_RATE_BURST=1)
+    def test_client_over_rate_limit_is_refused(self):
+        TokenBucketThrottle._buckets.pop('ip:127.0.0.1', None)
+        self.addCleanup(TokenBucketThrottle._buckets.pop, 'ip:127.0.0.1', None)
+        self.run_stream([])
+        sent = self.run_stream([])
+        self.assertEqual(json.loads(sent[1]['text'])['type'], 'error')
+        self.assertEqual(sent[-1], {'type': 'websocket.close', 'code': 1013})
+
+
+class HistoryWriterTests(TestCase):
+    def test_flush_writes_and_full_queue_drops(self):
+        writer = HistoryWriter(True, batch_size=2, max_pending=3)
+        writer._thread = threading.current_thread()  # không chạy luồng nền, ghi bằng flush()
+        for i in range(5):
+            writer.record(TranslationHistory.KIND_TRANSLATE, f"câu {i}", f"sentence {i}")
+        writer.flush()
+        stats = writer.stats()
+        self.assertEqual((stats['written'], stats['batches'], stats['dropped'], stats['pending']), (3, 2, 2, 0))
+        self.assertEqual(
+            list(TranslationHistory.objects.order_by('pk').values_list('input_text', flat=True)),
+            ["câu 0", "câu 1", "câu 2"],
+        )
+
+    def test_disabled_writer_records_nothing(self):
+        writer = HistoryWriter(False)
+        writer.record(TranslationHistory.KIND_TTS, "hello")
+        self.assertIsNone(writer._thread)
+        self.assertEqual(writer.stats()['pending'], 0)
+
+
+class HistoryQueryTests(TestCase):
+    def add(self, input_text, translation='', created_at=None):
+        entry = TranslationHistory.objects.create(input_text=input_text, translation=translation)
+        if created_at is not None:
+            TranslationHistory.objects.filter(pk=entry.pk).update(created_at=created_at)
+        return entry
+
+    def test_pages_with_equal_timestamps_have_no_gaps_or_duplicates(self):
+        now = timezone.now()
+        for i in range(7):
+            # 5 bản ghi cùng thời điểm: thứ tự chỉ còn phân biệt bằng id
+            self.add(f"câu {i}", created_at=now if i < 5 else now + timedelta(seconds=i))
+        expected = list(TranslationHistory.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        seen, cursor = [], None
+        while True:
+            entries, cursor = page(TranslationHistory.objects.all(), cursor, limit=2)
+            seen += [entry.pk for entry in entries]
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_cursor_round_trip_and_invalid_cursor(self):
+        entry = self.add("xin chào")
+        self.assertEqual(decode_cursor(encode_cursor(entry)), (entry.created_at, entry.pk))
+        for cursor in ("not a cursor", "bm90LWEtY3Vyc29y", "!!!"):
+            with self.assertRaises(ValueError):
+                page(TranslationHistory.objects.all(), cursor)
+
+    def test_fts_query_neutralizes_syntax(self):
+        self.assertEqual(fts_query('xin" OR chào* NEAR(a'), '"xin"* "OR"* "chào"* "NEAR"* "a"*')
+        self.assertEqual(fts_query('"*()'), '')
+
+    def test_fts_prefix_search(self):
+        if not history.fts_available():
+            self.skipTest("SQLite without FTS5")
+        match = self.add("Xin chào các bạn", "Hello everyone")
+        self.add("Tạm biệt", "Goodbye")
+        queryset = TranslationHistory.objects.all()
+        self.assertEqual(list(search(queryset, "chà")), [match])
+        self.assertEqual(list(search(queryset, "chao")), [match])  # bỏ dấu khi so khớp
+        self.assertEqual(list(search(queryset, "every")), [match])
+        self.assertEqual(list(search(queryset, 'xin" OR tạm*')), [])
+        self.assertEqual(list(search(queryset, '"()*')), [])
+
+    def test_like_fallback_without_fts(self):
+        match = self.add("Xin chào các bạn", "Hello everyone")
+        self.add("Tạm biệt", "Goodbye")
+        with mock.patch.object(history, 'fts_available', return_value=False):
+            self.assertEqual(list(search(TranslationHistory.objects.all(), "EVERYONE")), [match])
+            self.assertEqual(list(search(TranslationHistory.objects.all(), "o\" OR 1")), [])
+
+
+@mock.patch('api.jobs.close_old_connections')  # giữ kết nối của transaction trong test
+class JobQueueTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.jobs = JobQueue(workers=0, directory=directory.name, lease_seconds=30)
+        self.jobs._threads = [threading.current_thread()]  # không chạy worker/heartbeat nền
+
+    def samples(self, seconds):
+        return np.zeros(int(seconds * WHISPER_SAMPLE_RATE), dtype=np.float32)
+
+    def queued_ids(self):
+        ids = []
+        while not self.jobs._queue.empty():
+            ids.append(self.jobs._queue.get_nowait()[-1])
+        return ids
+
+    def test_priority_then_shorter_audio_first(self, _):
+        long_job = self.jobs.submit(self.samples(3))
+        short_job = self.jobs.submit(self.samples(1))
+        urgent = self.jobs.submit(self.samples(5), priority=1)
+        self.assertEqual(self.queued_ids(), [urgent.pk, short_job.pk, long_job.pk])
+
+    def test_cancel_only_queued_jobs(self, _):
+        job = self.jobs.submit(self.samples(1))
+        self.assertTrue(self.jobs.cancel(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, TranscriptionJob.STATUS_CANCELLED)
+        self.assertFalse(os.path.exists(job.audio_path))
+        self.assertFalse(self.jobs.cancel(job.pk))
+
+    def test_process_records_owner_and_result(self, _):
+        job = self.jobs.submit(self.samples(1))
+        with mock.patch('api.views.transcribe_samples', return_value=("xin chào", [])) as transcribe:
+            self.jobs._process(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, TranscriptionJob.STATUS_DONE)
+        self.assertEqual(job.result['transcription'], "xin chào")
+        self.assertEqual(job.owner, self.jobs.owner)
+        self.assertEqual(transcribe.call_args.kwargs['priority'], PRIORITY_BACKGROUND)
+        self.assertFalse(os.path.exists(job.audio_path))
+
+    def test_result_discarded_after_losing_the_lease(self, _):
+        job = self.jobs.submit(self.samples(1))
+
+        def taken_over(*args, **kwargs):
+            TranscriptionJob.objects.filter(pk=job.pk).update(owner='other:1')
+            return "muộn", []
+
+        with mock.patch('api.views.transcribe_samples', side_effect=taken_over):
+            self.jobs._process(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.owner, job.result), (TranscriptionJob.STATUS_RUNNING, 'other:1', None))
+
+    def test_only_expired_leases_are_requeued(self, _):
+        now = timezone.now()
+        expired = self.jobs.submit(self.samples(1))
+        alive = self.jobs.submit(self.samples(1))
+        legacy = self.jobs.submit(self.samples(1))
+        self.queued_ids()
+        running = TranscriptionJob.objects.filter(pk__in=[expired.pk, alive.pk, legacy.pk])
+        running.update(status=TranscriptionJob.STATUS_RUNNING, owner='other:1', started_at=now)
+        TranscriptionJob.objects.filter(pk=expired.pk).update(lease_expires_at=now - timedelta(seconds=1))
+        TranscriptionJob.objects.filter(pk=alive.pk).update(lease_expires_at=now + timedelta(seconds=30))
+
+        self.jobs.recover()
+        self.assertCountEqual(self.queued_ids(), [expired.pk, legacy.pk])
+        statuses = dict(TranscriptionJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[alive.pk], TranscriptionJob.STATUS_RUNNING)
+        self.assertEqual(statuses[expired.pk], TranscriptionJob.STATUS_QUEUED)
+        self.assertEqual(TranscriptionJob.objects.get(pk=expired.pk).owner, '')
+
+    def test_wait_leaves_no_event_behind(self, _):
+        job = self.jobs.submit(self.samples(1))
+        # Job do tiến trình khác xử lý: _finish không bao giờ chạy ở đây
+        self.assertEqual(self.jobs.wait(job.pk, 0.01).status, TranscriptionJob.STATUS_QUEUED)
+        self.assertEqual(self.jobs._events, {})
+
+
+class TranslationCacheInvalidationTests(TestCase):
+    def make_cache(self):
+        return TranslationCache('/nonexistent-model', max_size=16, generation_check=0)
+
+    def test_invalidation_from_another_process_clears_memory_tiers(self):
+        server, command = self.make_cache(), self.make_cache()
+        cleared = []
+        server.on_invalidate(lambda: cleared.append(True))
+        server.set("Xin chào.", "Hello.", {'profile': 'fast'})
+        self.assertEqual(server.get("Xin chào.", {'profile': 'fast'}), "Hello.")
+
+        self.assertEqual(command.invalidate(), 1)
+        self.assertFalse(TranslationCacheEntry.objects.exists())
+        self.assertIsNone(server.get("Xin chào.", {'profile': 'fast'}))
+        self.assertEqual(cleared, [True])
+        self.assertEqual(server.stats()['size'], 0)
+
+    def test_stale_only_keeps_current_entries(self):
+        cache = self.make_cache()
+        cache.set("Xin chào.", "Hello.")
+        TranslationCacheEntry.objects.create(key='old', model_version='other', source_text="a", translation="b")
+        self.assertEqual(cache.invalidate(stale_only=True), 1)
+        self.assertEqual(cache.get("Xin chào."), "Hello.")
+        self.assertEqual(cache.stats()['invalidations'], 0)
+
+
+def stub_worker(models, threads, tasks, results):
+    # Worker giả (không cần torch): 'crash' làm tiến trình chết giữa chừng như khi bị OOM killer
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, target, method, args, kwargs = task
+        if method == 'crash':
+            os._exit(1)
+        results.put((task_id, True, args[0], []))
+
+
+class InferencePoolTests(SimpleTestCase):
+    def start_pool(self, max_restarts):
+        pool = InferencePool({}, workers=1, threads=1, max_restarts=max_restarts)
+        pool.poll_interval = 0.05
+        pool._start(multiprocessing.get_context('fork'), stub_worker)
+        self.addCleanup(lambda: [process.terminate() for process in pool._processes])
+        return pool
+
+    def test_crash_fails_pending_calls_and_restarts(self):
+        pool = self.start_pool(max_restarts=1)
+        self.assertEqual(pool.call('m', 'echo', 1, timeout=10), 1)
+        # Lệnh 'echo' xếp sau 'crash' trong cùng lô cũng phải lỗi, không treo
+        batch = [pool.submit('m', 'crash'), pool.submit('m', 'echo', 2)]
+        for future in batch:
+            with self.assertRaises(WorkerCrashed):
+                future.result(10)
+        self.assertEqual(pool.call('m', 'echo', 3, timeout=10), 3)
+        stats = pool.stats()
+        self.assertEqual((stats['restarts'], stats['alive'], stats['broken']), (1, 1, None))
+
+    def test_pool_stops_after_max_restarts(self):
+        pool = self.start_pool(max_restarts=0)
+        with self.assertRaises(WorkerCrashed):
+            pool.call('m', 'crash', timeout=10)
+        self.assertIsNotNone(pool.broken)
+        with self.assertRaises(WorkerCrashed):
+            pool.submit('m', 'echo', 4).result(0)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_render(self):
+        histogram = metrics.Histogram('t_seconds', 'Test latency.', labelnames=('stage',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, stage='dec"ode')
+        self.assertEqual(histogram.render(), [
+            '# HELP t_seconds Test latency.',
+            '# TYPE t_seconds histogram',
+            't_seconds_bucket{stage="dec\\"ode",le="0.1"} 1',
+            't_seconds_bucket{stage="dec\\"ode",le="1"} 3',
+            't_seconds_bucket{stage="dec\\"ode",le="+Inf"} 4',
+            't_seconds_sum{stage="dec\\"ode"} 4.050000',
+            't_seconds_count{stage="dec\\"ode"} 4',
+        ])
+
+    def test_render_gauge_skips_missing_values(self):
+        lines = metrics.render_gauge('t_bytes', 'Test gauge.', [({'model': 'a'}, 1024), ({'model': 'b'}, None), ({}, 0.5)])
+        self.assertEqual(lines, ['# HELP t_bytes Test gauge.', '# TYPE t_bytes gauge', 't_bytes{model="a"} 1024', 't_bytes 0.5'])
+
+    def test_capture_and_replay(self):
+        stage_seconds = metrics.Histogram('t_stage_seconds', 'Test stages.', labelnames=('model', 'stage'))
+        with mock.patch.object(metrics, 'stage_seconds', stage_seconds):
+            # Như trong worker: quan sát được gom lại, chưa ghi vào histogram
+            with metrics.capture() as observations:
+                metrics.observe_stage('encoder', 0.2, model='whisper')
+                with metrics.stage('decoder', model='whisper'):
+                    pass
+            self.assertEqual([name for name, _, _ in observations], ['encoder', 'decoder'])
+            self.assertEqual(stage_seconds.render()[2:], [])
+            metrics.replay(observations)
+        self.assertIn('t_stage_seconds_count{model="whisper",stage="encoder"} 1', stage_seconds.render())
+        self.assertIn('t_stage_seconds_count{model="whisper",stage="decoder"} 1', stage_seconds.render())
+
+
+class ModelMemoryTests(TestCase):
+    def setUp(self):
+        # Mô hình ONNX Runtime không có state_dict: /metrics phải chạy được mà không cần torch
+        tensor = mock.Mock(numel=lambda: 10, element_size=lambda: 4)
+        patcher = mock.patch.dict(inference._models, {
+            'whisper': mock.Mock(model=mock.Mock(state_dict=lambda: {'weight': tensor, 'packed': (tensor, tensor)}),
+                                 assistant=None),
+            'onnx': mock.Mock(model=object(), assistant=None),
+        }, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_model_memory_without_torch(self):
+        self.assertEqual(inference.model_memory(), {'whisper': 120, 'onnx': None})
+
+    def test_metrics_endpoint(self):
+        response = MetricsView.as_view()(RequestFactory().get('/api/v1/metrics/'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE trans_app_stage_seconds histogram', body)
+        self.assertIn('trans_app_model_memory_bytes{model="whisper"} 120', body)
+        self.assertNotIn('trans_app_model_memory_bytes{model="onnx"}', body)
+
+
+class TranscriptionCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = LRUCache(max_size=8, ttl=60)
+        self.transcribe = mock.Mock(return_value=('xin chào', []))
+        for target, value in (('transcription_cache', self.cache), ('transcribe_samples', self.transcribe),
+                              ('history_writer', mock.Mock())):
+            patcher = mock.patch(f'api.views.{target}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Token bucket của model sẽ chặn các request liên tiếp trong test
+        patcher = mock.patch.object(TranscribeView, 'throttle_classes', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, samples, profile='fast'):
+        upload = SimpleUploadedFile('clip.wav', wav_bytes(samples), content_type='audio/wav')
+        response = self.client.post('/api/v1/transcribe/', {'audio': upload, 'profile': profile})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['cached']
+
+    def test_identical_audio_hits_cache(self):
+        samples = (tone(1.0) * 32767).astype(np.int16)
+        self.assertFalse(self.post(samples))
+        self.assertTrue(self.post(samples))
+        self.assertEqual(self.transcribe.call_count, 1)
+        # Cùng nội dung nhưng khác mẫu PCM: là audio khác
+        self.assertFalse(self.post(samples // 2))
+
+    def test_profiles_do_not_share_entries(self):
+        samples = (tone(1.0) * 32767).astype(np.int16)
+        self.assertFalse(self.post(samples, 'fast'))
+        self.assertFalse(self.post(samples, 'accurate'))
+        self.assertTrue(self.post(samples, 'accurate'))
+        self.assertEqual([call.kwargs['profile'] for call in self.transcribe.call_args_list], ['fast', 'accurate'])
+
+    def test_entries_expire(self):
+        samples = (tone(1.0) * 32767).astype(np.int16)
+        self.assertFalse(self.post(samples))
+        with mock.patch('api.cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertFalse(self.post(samples))
+        self.assertEqual(self.transcribe.call_count, 2)
+        self.assertEqual(self.cache.stats()['expirations'], 1)
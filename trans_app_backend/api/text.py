@@ -0,0 +1,113 @@
+"""
+Vietnamese text segmentation for translation.
+
+Marian models are trained on sentence pairs and accept at most 512 tokens,
+so long inputs are split into sentences, translated as a batch and put back
+together in the original order. Only the standard library is used so the
+CLI (main_task2.py) can share this module without Django.
+"""
+
+import re
+
+# Giới hạn cứng của MarianMT
+MAX_INPUT_TOKENS = 512
+# Câu dài hơn ngưỡng này được tách tiếp tại ranh giới mệnh đề
+MAX_SENTENCE_CHARS = 400
+
+# Viết tắt thường đứng trước danh từ riêng/số: "TP. Hồ Chí Minh", "PGS. TS. Nguyễn Văn A", "Q. 1"
+ABBREVIATIONS = {
+    'tp', 'tx', 'tt', 'q', 'p', 'h', 'x', 'ts', 'ths', 'pgs', 'gs', 'bs', 'ks', 'ls', 'ncs', 'cn',
+    'mr', 'mrs', 'ms', 'dr', 'st', 'no',
+}
+
+_END = re.compile(r"[.!?…]+[\"'”’)\]]*\s+")
+_OPENERS = "\"'“‘([-–"
+_CLAUSE = re.compile(r"(?<=[;:])\s+")
+_PHRASE = re.compile(r"(?<=,)\s+")
+
+
+def _is_boundary(text, match):
+    rest = text[match.end():].lstrip(_OPENERS)
+    if not rest or not (rest[0].isupper() or rest[0].isdigit()):
+        return False
+    punctuation = match.group().rstrip()
+    if punctuation.rstrip("\"'”’)]") == '.':
+        word = re.search(r"(\w+)$", text[:match.start()])
+        if word and word.group(1).lower() in ABBREVIATIONS:
+            return False
+    return True
+
+
+def split_sentences(paragraph):
+    """Split one paragraph at sentence-final punctuation followed by an upper-case word or a number."""
+    sentences, start = [], 0
+    for match in _END.finditer(paragraph):
+        if _is_boundary(paragraph, match):
+            sentences.append(paragraph[start:match.end()].strip())
+            start = match.end()
+    tail = paragraph[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _pack(parts, max_chars, joiner=" "):
+    # Gộp lại các mảnh liền nhau miễn là không vượt quá max_chars
+    packed = []
+    for part in parts:
+        if packed and len(packed[-1]) + len(joiner) + len(part) <= max_chars:
+            packed[-1] = packed[-1] + joiner + part
+        else:
+            packed.append(part)
+    return packed
+
+
+def split_long(sentence, max_chars=MAX_SENTENCE_CHARS):
+    """Break an over-long sentence at ';' / ':', then ',', then between words."""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    for pattern in (_CLAUSE, _PHRASE):
+        parts = pattern.split(sentence)
+        if len(parts) > 1:
+            return [piece for part in _pack(parts, max_chars) for piece in split_long(part, max_chars)]
+    return _pack(sentence.split(), max_chars)
+
+
+def segment_text(text, max_chars=MAX_SENTENCE_CHARS):
+    """Split text into paragraphs (at line breaks) of translatable sentences: [[sentence, ...], ...]."""
+    paragraphs = []
+    for paragraph in re.split(r"\s*\n\s*", text.strip()):
+        paragraph = re.sub(r"\s+", " ", paragraph)
+        sentences = [piece for sentence in split_sentences(paragraph) for piece in split_long(sentence, max_chars)]
+        if sentences:
+            paragraphs.append(sentences)
+    return paragraphs
+
+
+def reassemble(paragraphs, translations):
+    """Inverse of segment_text for the flat, in-order list of translated sentences."""
+    translations = iter(translations)
+    return "\n".join(
+        " ".join(t for t in (next(translations).strip() for _ in sentences) if t) for sentences in paragraphs
+    )
+
+
+def length_buckets(lengths, max_batch_size=16, max_tokens=4096):
+    """
+    Group indices of similar length so each batch wastes little padding.
+
+    Indices are sorted by length and packed while the padded batch
+    (size x longest) stays within `max_tokens`. Returns lists of indices
+    into `lengths`; callers put results back by index.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets, current = [], []
+    for i in order:
+        longest = max(lengths[i], lengths[current[-1]]) if current else lengths[i]
+        if current and (len(current) >= max_batch_size or (len(current) + 1) * longest > max_tokens):
+            buckets.append(current)
+            current = []
+        current.append(i)
+    if current:
+        buckets.append(current)
+    return buckets
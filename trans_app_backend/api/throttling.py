@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Per-client token bucket for the model endpoints.
+
+    Only views that set `token_bucket_scope` are limited (like DRF's
+    ScopedRateThrottle); all scopes share one bucket per client, so a
+    client cannot multiply its budget by spreading requests over endpoints.
+    Each client may burst `CLIENT_RATE_BURST` requests and then gets
+    `CLIENT_RATE_LIMIT` requests per second; rejected requests get HTTP 429
+    with Retry-After set to when the next token is available.
+    Buckets live in process memory; the least recently seen clients are
+    forgotten beyond `max_clients` (they start again with a full bucket).
+    """
+
+    max_clients = 10000
+    _buckets = OrderedDict()  # client -> (tokens, last refill)
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.rate = settings.CLIENT_RATE_LIMIT
+        self.burst = max(1.0, settings.CLIENT_RATE_BURST)
+        self.retry_after = None
+
+    def get_client(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        if getattr(view, 'token_bucket_scope', None) is None:
+            return True
+        return self.take(self.get_client(request))
+
+    def take(self, client):
+        """Take one token from `client`'s bucket; False (with `retry_after` set) when it is empty."""
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.retry_after = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
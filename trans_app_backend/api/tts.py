@@ -0,0 +1,414 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from pathlib import Path
+
+from django.conf import settings
+
+from . import metrics
+from .cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class TTSBackend:
+    """
+    Base class for speech synthesis backends.
+
+    `synthesize` writes a complete audio file; `stream` yields audio bytes as
+    they are produced so the response can start before synthesis finishes.
+    """
+
+    name = None
+    extension = None
+    content_type = None
+
+    def voice(self):
+        """Settings that change the audio output (part of the TTS store key)."""
+        return {'backend': self.name}
+
+    def synthesize(self, text, path):
+        raise NotImplementedError
+
+    def stream(self, text):
+        raise NotImplementedError
+
+    def finalize_stream(self, path):
+        """Fix up a file written from `stream` output (no-op by default)."""
+
+
+class GTTSBackend(TTSBackend):
+    """Google Text-to-Speech (needs network access)."""
+
+    name = 'gtts'
+    extension = 'mp3'
+    content_type = 'audio/mpeg'
+
+    def __init__(self, lang='en', slow=False):
+        self.lang = lang
+        self.slow = slow
+
+    def voice(self):
+        return {'backend': self.name, 'lang': self.lang, 'slow': self.slow}
+
+    def _tts(self, text):
+        from gtts import gTTS
+
+        return gTTS(text=text, lang=self.lang, slow=self.slow)
+
+    def synthesize(self, text, path):
+        self._tts(text).save(path)
+
+    def stream(self, text):
+        # gTTS chia văn bản thành nhiều phần, mỗi phần là một khung MP3 độc lập
+        yield from self._tts(text).stream()
+
+
+def split_sentences(text):
+    return [part for part in re.split(r"(?<=[.!?;:])\s+", text.strip()) if part]
+
+
+class Pyttsx3Backend(TTSBackend):
+    """
+    Offline synthesis through pyttsx3 (SAPI5 / NSSpeechSynthesizer / eSpeak).
+
+    The engine is created once and reused; it is not thread-safe, so calls
+    are serialized.
+    """
+
+    name = 'pyttsx3'
+    extension = 'wav'
+    content_type = 'audio/wav'
+
+    def __init__(self, rate=150, volume=0.9):
+        import pyttsx3
+
+        self.rate = rate
+        self.volume = volume
+        self.engine = pyttsx3.init()
+        self.engine.setProperty("rate", rate)  # Tốc độ đọc (words per minute)
+        self.engine.setProperty("volume", volume)  # Âm lượng (0.0 đến 1.0)
+        self._lock = threading.Lock()
+
+    def voice(self):
+        return {'backend': self.name, 'rate': self.rate, 'volume': self.volume}
+
+    def synthesize(self, text, path):
+        with self._lock:
+            self.engine.save_to_file(text, str(path))
+            self.engine.runAndWait()
+
+    def _synthesize_frames(self, text):
+        fd, temp_path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            self.synthesize(text, temp_path)
+            with wave.open(temp_path, 'rb') as wf:
+                return wf.getparams(), wf.readframes(wf.getnframes())
+        finally:
+            os.remove(temp_path)
+
+    def stream(self, text):
+        # Tổng hợp từng câu; header WAV được gửi trước với độ dài "không xác định"
+        header_sent = False
+        for sentence in split_sentences(text):
+            params, frames = self._synthesize_frames(sentence)
+            if not header_sent:
+                yield streaming_wav_header(params.nchannels, params.sampwidth, params.framerate)
+                header_sent = True
+            yield frames
+
+    def finalize_stream(self, path):
+        # Ghi lại kích thước thật vào header sau khi đã stream xong
+        size = os.path.getsize(path)
+        with open(path, 'r+b') as f:
+            f.seek(4)
+            f.write(struct.pack("<I", size - 8))
+            f.seek(40)
+            f.write(struct.pack("<I", size - 44))
+
+
+def streaming_wav_header(channels, sample_width, sample_rate):
+    unknown = 0xFFFFFFFF
+    return b"".join([
+        b"RIFF", struct.pack("<I", unknown), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                             sample_rate * channels * sample_width, channels * sample_width, sample_width * 8),
+        b"data", struct.pack("<I", unknown),
+    ])
+
+
+class StubBackend(TTSBackend):
+    """
+    Offline stand-in for benchmarks: writes silence whose length follows the
+    text (about 0.3s per word) after an optional fixed delay, so load tests
+    exercise the TTS store and responses without a real synthesizer.
+    """
+
+    name = 'stub'
+    extension = 'wav'
+    content_type = 'audio/wav'
+    sample_rate = 16000
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def _wav(self, text):
+        time.sleep(self.delay)
+        frames = int(self.sample_rate * 0.3 * max(1, len(text.split())))
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(bytes(frames * 2))
+        return buffer.getvalue()
+
+    def synthesize(self, text, path):
+        with open(path, 'wb') as f:
+            f.write(self._wav(text))
+
+    def stream(self, text):
+        yield self._wav(text)
+
+
+TTS_BACKENDS = {
+    GTTSBackend.name: lambda: GTTSBackend(lang=settings.TTS_LANG),
+    Pyttsx3Backend.name: lambda: Pyttsx3Backend(rate=settings.TTS_RATE, volume=settings.TTS_VOLUME),
+    StubBackend.name: lambda: StubBackend(delay=settings.TTS_STUB_DELAY_MS / 1000),
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_tts_backend():
+    """Return the process-wide backend selected by settings.TTS_BACKEND (created once)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                try:
+                    factory = TTS_BACKENDS[settings.TTS_BACKEND]
+                except KeyError:
+                    raise ValueError(f"Unknown TTS backend: {settings.TTS_BACKEND}")
+                _backend = factory()
+                logger.info(f"TTS backend initialized: {_backend.name}")
+    return _backend
+
+
+# File .tmp không được ghi thêm lâu hơn ngưỡng này là rác của tiến trình đã chết
+STALE_TEMP_SECONDS = 3600
+
+
+class TTSStore:
+    """
+    Content-addressed store for synthesized speech.
+
+    Files are named after a hash of the text and voice settings, so identical
+    requests reuse the same file. A background sweeper removes files older
+    than `max_age` seconds and, when the directory grows past `max_bytes`,
+    the least recently used ones. Files still being written (`*.tmp`) are
+    left alone; only temp files untouched for STALE_TEMP_SECONDS (left by a
+    crashed process) are removed.
+    """
+
+    def __init__(self, directory, max_bytes, max_age, sweep_interval):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> [lock, số luồng đang dùng hoặc chờ lock]
+        self._sweeper = None
+        self.hits = 0
+        self.misses = 0
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+
+    def key(self, text, **voice):
+        payload = json.dumps([normalize_text(text), voice], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _acquire_key_lock(self, key):
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _release_key_lock(self, key):
+        # Chỉ bỏ lock khi không còn ai giữ hoặc chờ, để mọi request cùng key dùng chung một lock
+        with self._lock:
+            entry = self._key_locks[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._key_locks[key]
+
+    def get_or_create(self, key, synthesize, extension="mp3"):
+        """
+        Return (filename, hit). On a miss `synthesize(path)` is called to write
+        the audio; concurrent requests for the same key synthesize only once.
+        """
+        self._ensure_sweeper()
+        filename = f"{key}.{extension}"
+        path = self.directory / filename
+
+        lock = self._acquire_key_lock(key)
+        try:
+            with lock:
+                if path.exists():
+                    # Cập nhật mtime để sweeper coi file là vừa được dùng (LRU)
+                    os.utime(path)
+                    self._count(hit=True)
+                    return filename, True
+
+                self.directory.mkdir(parents=True, exist_ok=True)
+                temp_path = self.directory / f"{key}.{uuid.uuid4().hex}.tmp"
+                try:
+                    with metrics.stage('tts_synthesis', 'tts'):
+                        synthesize(temp_path)
+                    with metrics.stage('file_write', 'tts'):
+                        os.replace(temp_path, path)  # ghi nguyên tử, không ai đọc được file dở dang
+                finally:
+                    if temp_path.exists():
+                        os.remove(temp_path)
+                self._count(hit=False)
+                return filename, False
+        finally:
+            self._release_key_lock(key)
+
+    def open_cached(self, key, extension="mp3"):
+        """Return the path of a stored file (counting a hit) or None (counting a miss)."""
+        self._ensure_sweeper()
+        path = self.directory / f"{key}.{extension}"
+        if path.exists():
+            os.utime(path)
+            self._count(hit=True)
+            return path
+        self._count(hit=False)
+        return None
+
+    def tee(self, key, chunks, extension="mp3", finalize=None):
+        """
+        Yield `chunks` while writing them to the store; the file only becomes
+        visible once the whole stream has been written (and `finalize`d).
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{key}.{extension}"
+        temp_path = self.directory / f"{key}.{uuid.uuid4().hex}.tmp"
+        write_seconds = 0.0
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in chunks:
+                    started = time.perf_counter()
+                    f.write(chunk)
+                    write_seconds += time.perf_counter() - started
+                    yield chunk
+            started = time.perf_counter()
+            if finalize is not None:
+                finalize(temp_path)
+            os.replace(temp_path, path)
+            metrics.observe_stage('file_write', write_seconds + time.perf_counter() - started, 'tts')
+        finally:
+            if temp_path.exists():
+                os.remove(temp_path)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None or self.sweep_interval <= 0:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name="tts-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error sweeping TTS store: {str(e)}")
+            time.sleep(self.sweep_interval)
+
+    def sweep(self):
+        """Evict files by age, then oldest-first until the store fits in `max_bytes`."""
+        if not self.directory.exists():
+            return 0
+        now = time.time()
+        files = []
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if entry.name.endswith('.tmp'):
+                # File đang được tổng hợp/stream: xóa sẽ làm os.replace của request đó lỗi
+                if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                    removed += self._remove(entry.path, stat.st_size)
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = 0
+        survivors = []
+        for mtime, size, path in files:
+            if self.max_age and now - mtime > self.max_age:
+                removed += self._remove(path, size)
+            else:
+                survivors.append((mtime, size, path))
+                total += size
+
+        if self.max_bytes:
+            for mtime, size, path in sorted(survivors):
+                if total <= self.max_bytes:
+                    break
+                removed += self._remove(path, size)
+                total -= size
+        if removed:
+            logger.info(f"TTS store sweep removed {removed} files")
+        return removed
+
+    def _remove(self, path, size):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        with self._lock:
+            self.evicted_files += 1
+            self.evicted_bytes += size
+        return 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evicted_files': self.evicted_files,
+                'evicted_bytes': self.evicted_bytes,
+                'max_bytes': self.max_bytes,
+                'max_age': self.max_age,
+            }
+
+
+tts_store = TTSStore(
+    Path(settings.MEDIA_ROOT) / 'tts',
+    max_bytes=settings.TTS_STORE_MAX_BYTES,
+    max_age=settings.TTS_STORE_MAX_AGE,
+    sweep_interval=settings.TTS_STORE_SWEEP_INTERVAL,
+)
@@ -0,0 +1,308 @@
+import io
+import struct
+import tempfile
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+
+from . import metrics
+from .audio import WHISPER_SAMPLE_RATE, decode_audio, resample
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class UploadRejected(Exception):
+    pass
+
+
+def sniff_format(head):
+    """Container format from the first 12 bytes of a file: 'wav', 'flac', 'ogg' (Opus/Vorbis) or None."""
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'OggS':
+        return 'ogg'
+    return None
+
+
+def pcm_to_float(data, format_tag, bits):
+    """Interleaved little-endian PCM bytes to float32 in [-1, 1)."""
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        if bits == 32:
+            return np.frombuffer(data, dtype='<f4')
+        if bits == 64:
+            return np.frombuffer(data, dtype='<f8').astype(np.float32)
+    elif format_tag == WAVE_FORMAT_PCM:
+        if bits == 8:
+            return (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+        if bits == 16:
+            return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768
+        if bits == 24:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            # Byte cao mang dấu: dịch trái 24 rồi dịch phải số học 8 để mở rộng dấu
+            values = (raw[:, 0] << 8 | raw[:, 1] << 16 | raw[:, 2] << 24) >> 8
+            return values.astype(np.float32) / 8388608
+        if bits == 32:
+            return np.frombuffer(data, dtype='<i4').astype(np.float32) / 2147483648
+    raise UploadRejected(f"Unsupported WAV sample format ({format_tag:#06x}, {bits} bits)")
+
+
+class WavStream:
+    """
+    Incremental WAV (RIFF) decoder.
+
+    `feed` accepts the file in arbitrary pieces; complete frames of the
+    data chunk are converted to mono float32 as they arrive and written into
+    a buffer preallocated from the data chunk size (or from `max_bytes` when
+    the header does not know it), so no copy of the encoded file is kept.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.format_tag = None
+        self.channels = None
+        self.sample_rate = None
+        self.bits = None
+        self.block_align = None
+        self._pending = b''
+        self._state = 'riff'
+        self._needed = 12  # số byte header/fmt cần gom đủ trước khi xử lý
+        self._skip = 0
+        self._data_left = None  # None = đọc đến hết file
+        self._data_padding = 0
+        self._buffer = None
+        self._frames = 0
+
+    def feed(self, data):
+        self._pending += data
+        while self._pending:
+            if self._state == 'skip':
+                skipped = min(self._skip, len(self._pending))
+                self._pending = self._pending[skipped:]
+                self._skip -= skipped
+                if self._skip == 0:
+                    self._expect('chunk', 8)
+            elif self._state == 'data':
+                if not self._consume_data():
+                    return  # chờ thêm byte cho frame chưa đủ
+            else:
+                if len(self._pending) < self._needed:
+                    return
+                block, self._pending = self._pending[:self._needed], self._pending[self._needed:]
+                if self._state == 'riff':
+                    self._expect('chunk', 8)
+                elif self._state == 'fmt':
+                    self._parse_fmt(block)
+                    self._expect('chunk', 8)
+                else:
+                    self._chunk(block[:4], struct.unpack('<I', block[4:])[0])
+
+    def _expect(self, state, size):
+        self._state = state
+        self._needed = size
+
+    def _chunk(self, chunk_id, size):
+        if chunk_id == b'fmt ':
+            if size < 16 or size > 1024:
+                raise UploadRejected("Invalid WAV fmt chunk")
+            self._expect('fmt', size + size % 2)
+        elif chunk_id == b'data':
+            if self.format_tag is None:
+                raise UploadRejected("Invalid WAV file (data before fmt chunk)")
+            self._start_data(size)
+        else:
+            # Chunk phụ (LIST, fact...): bỏ qua, kể cả byte đệm khi kích thước lẻ
+            self._skip = size + size % 2
+            self._state = 'skip'
+
+    def _parse_fmt(self, fmt):
+        format_tag, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            format_tag = struct.unpack('<H', fmt[24:26])[0]  # hai byte đầu của SubFormat GUID
+        if channels == 0 or sample_rate == 0 or block_align != channels * ((bits + 7) // 8):
+            raise UploadRejected("Invalid WAV fmt chunk")
+        pcm_to_float(b'', format_tag, bits)  # kiểm tra định dạng mẫu được hỗ trợ
+        self.format_tag, self.channels, self.sample_rate = format_tag, channels, sample_rate
+        self.bits, self.block_align = bits, block_align
+
+    def _start_data(self, size):
+        if size == 0xFFFFFFFF or size > self.max_bytes:
+            # Header ghi khi đang stream: chưa biết độ dài thật, dữ liệu kéo dài đến hết file
+            self._data_left = None
+            size = self.max_bytes
+        else:
+            self._data_left = size
+            self._data_padding = size % 2
+        self._buffer = np.empty(size // self.block_align, dtype=np.float32)
+        self._state = 'data'
+
+    def _consume_data(self):
+        """Convert the complete frames received so far; returns False when more bytes are needed."""
+        available = len(self._pending) if self._data_left is None else min(len(self._pending), self._data_left)
+        usable = available - available % self.block_align
+        if usable:
+            chunk, self._pending = self._pending[:usable], self._pending[usable:]
+            samples = pcm_to_float(chunk, self.format_tag, self.bits)
+            if self.channels > 1:
+                samples = samples.reshape(-1, self.channels).mean(axis=1)
+            end = self._frames + len(samples)
+            if end > len(self._buffer):
+                raise UploadRejected("WAV data is longer than the upload limit")
+            self._buffer[self._frames:end] = samples
+            self._frames = end
+            if self._data_left is not None:
+                self._data_left -= usable
+        if self._data_left is not None and self._data_left < self.block_align:
+            # Hết chunk data: phần lẻ không đủ frame và byte đệm được bỏ qua như chunk phụ
+            self._skip = self._data_left + self._data_padding
+            if self._skip:
+                self._state = 'skip'
+            else:
+                self._expect('chunk', 8)
+            return True
+        return bool(usable)
+
+    def finish(self):
+        if self._buffer is None:
+            raise UploadRejected("Invalid or truncated WAV file (no audio data)")
+        return self._buffer[:self._frames], self.sample_rate
+
+
+class StreamingAudioDecoder:
+    """
+    Decode an audio upload piece by piece.
+
+    The container is identified from the first 12 bytes, so anything that
+    is not WAV, FLAC or Ogg (Opus/Vorbis) is rejected before the rest of
+    the body is read. WAV is decoded as it arrives (WavStream); compressed
+    formats are small, so their bytes are spooled and decoded once complete.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.format = None
+        self.received = 0
+        self._head = b''
+        self._wav = None
+        self._spool = None
+
+    def feed(self, data):
+        self.received += len(data)
+        if self.received > self.max_bytes:
+            raise UploadRejected(f"File too large, maximum size is {self.max_bytes // (1024 * 1024)}MB")
+        if self.format is None:
+            self._head += data
+            if len(self._head) < 12:
+                return
+            self.format = sniff_format(self._head)
+            if self.format is None:
+                raise UploadRejected("Unsupported audio format (expected WAV, FLAC or Ogg/Opus)")
+            data, self._head = self._head, b''
+            if self.format == 'wav':
+                self._wav = WavStream(self.max_bytes)
+            else:
+                self._spool = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        if self._wav is not None:
+            self._wav.feed(data)
+        else:
+            self._spool.write(data)
+
+    def finish(self, target_sr=WHISPER_SAMPLE_RATE):
+        """Return the whole upload as mono float32 at `target_sr`."""
+        if self.format is None:
+            raise UploadRejected("Empty or truncated audio file")
+        if self._wav is not None:
+            audio, sample_rate = self._wav.finish()
+            return resample(audio, sample_rate, target_sr)
+        try:
+            self._spool.seek(0)
+            return decode_audio(self._spool, target_sr)
+        except Exception as e:
+            raise UploadRejected(f"Invalid {self.format} audio file") from e
+        finally:
+            self._spool.close()
+
+
+class DecodedAudioFile(UploadedFile):
+    """
+    An `audio` upload already decoded by AudioUploadHandler; `samples` is 16kHz mono float32.
+
+    The encoded bytes are not kept, so the file object is an empty buffer:
+    read(), chunks() and close() (called by Django when the request ends) work.
+    """
+
+    def __init__(self, samples, name, content_type, size, audio_format):
+        super().__init__(io.BytesIO(), name, content_type, size)
+        self.samples = samples
+        self.audio_format = audio_format
+
+
+class AudioUploadHandler(FileUploadHandler):
+    """
+    Upload handler for the `audio` form field.
+
+    Bytes are validated and decoded as Django's multipart parser receives
+    them, instead of being buffered in memory or a temporary file and
+    decoded afterwards; the other upload handlers never see this field. A
+    rejected upload stops parsing right away; the reason is left in
+    `request.audio_upload_error` for the view to report. Time spent handling
+    the received pieces is recorded as the `upload_read` stage and the final
+    decode/resample as `normalize`, like the fallback path in the views.
+    """
+
+    audio_field = 'audio'
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.decoder = None
+        self.read_seconds = 0.0
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name != self.audio_field:
+            self.decoder = None
+            return
+        self.decoder = StreamingAudioDecoder(settings.AUDIO_UPLOAD_MAX_BYTES)
+        self.read_seconds = 0.0
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.decoder is None:
+            return raw_data
+        started = time.perf_counter()
+        try:
+            self.decoder.feed(raw_data)
+        except UploadRejected as e:
+            self._reject(e)
+        finally:
+            # Cộng dồn thời gian xử lý từng mảnh, không tính thời gian chờ mạng giữa các mảnh
+            self.read_seconds += time.perf_counter() - started
+        return None
+
+    def file_complete(self, file_size):
+        if self.decoder is None:
+            return None
+        decoder, self.decoder = self.decoder, None
+        metrics.observe_stage('upload_read', self.read_seconds)
+        try:
+            with metrics.stage('normalize'):
+                samples = decoder.finish()
+        except UploadRejected as e:
+            # Vẫn trả về một file để các handler sau không nhận field này
+            self._set_error(e)
+            samples = None
+        return DecodedAudioFile(samples, self.file_name, self.content_type, file_size, decoder.format)
+
+    def _set_error(self, error):
+        if self.request is not None:
+            self.request.audio_upload_error = str(error)
+
+    def _reject(self, error):
+        self._set_error(error)
+        raise StopUpload(connection_reset=True)
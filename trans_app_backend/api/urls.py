@@ -1,9 +1,18 @@
 from django.urls import path
-from .views import TranscribeView, TranslateView, TTSView, PingView
+from .views import (
+    TranscribeView, TranslateView, TTSView, PipelineView, JobListView, JobDetailView, PingView, StatsView,
+    MetricsView, HistoryView,
+)
 
 urlpatterns = [
     path('v1/transcribe/', TranscribeView.as_view(), name='transcribe'),
     path('v1/translate/', TranslateView.as_view(), name='translate'),
     path('v1/tts/', TTSView.as_view(), name='tts'),
+    path('v1/pipeline/', PipelineView.as_view(), name='pipeline'),
+    path('v1/jobs/', JobListView.as_view(), name='jobs'),
+    path('v1/jobs/<uuid:job_id>/', JobDetailView.as_view(), name='job-detail'),
     path('v1/ping/', PingView.as_view(), name='ping'),
+    path('v1/stats/', StatsView.as_view(), name='stats'),
+    path('v1/history/', HistoryView.as_view(), name='history'),
+    path('v1/metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -2,86 +2,276 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
 from rest_framework import status
-from gtts import gTTS
-import os
-from pathlib import Path
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
-from transformers import MarianMTModel, MarianTokenizer
-import soundfile as sf
-import torch
-import uuid
+import io
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 import pydub
 from django.core.exceptions import ValidationError
 from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from . import metrics
+from .admission import Overloaded, translation_admission, whisper_admission
+from .batching import PRIORITY_INTERACTIVE, MicroBatcher
+from .inference import get_model, model_memory, model_status
+from .workers import get_inference_pool, inference_pool_stats
+from .cache import model_fingerprint, transcription_cache, translation_cache
+from .memory import translation_memory
+from .tts import get_tts_backend, tts_store
+from .jobs import job_queue
+from .history import history_writer, page, search
+from .decoding import get_profile
+from .text import reassemble, segment_text
+from .models import TranscriptionJob, TranslationHistory
+from .uploads import DecodedAudioFile
+from .serializers import TranscriptionJobSerializer, TranslationHistorySerializer
+from .audio import (
+    WHISPER_SAMPLE_RATE, WHISPER_WINDOW_SECONDS, audio_fingerprint, decode_audio, detect_speech,
+    split_windows, stitch_transcripts,
+)
 
 logger = logging.getLogger(__name__)
 
-# Load PhoWhisper model
-class PhoWhisper:
-    def __init__(self):
-        self.model_name = "models/PhoWhisper-small"
-        try:
-            self.processor = WhisperProcessor.from_pretrained(self.model_name)
-            self.model = WhisperForConditionalGeneration.from_pretrained(self.model_name)
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.model.to(self.device)
-            self.model.eval()
-            logger.info("PhoWhisper model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load PhoWhisper model: {str(e)}")
-            raise
+# Mô hình được nạp lười khi batch đầu tiên chạy (hoặc bởi warm-up lúc server khởi động)
+# Mỗi phần tử là (đầu vào, profile); batcher đã chia nhóm theo profile
+def _batch_fn(target, method):
+    def run(items):
+        inputs = [item for item, _ in items]
+        profile = items[0][1]
+        pool = get_inference_pool()
+        if pool is None:
+            return getattr(get_model(target), method)(inputs, profile=profile)
+        return pool.call(target, method, inputs, profile=profile, timeout=settings.INFERENCE_TIMEOUT)
+    return run
 
-    def transcribe(self, audio_path):
-        try:
-            audio, sample_rate = sf.read(audio_path)
-            inputs = self.processor(audio, sampling_rate=sample_rate, return_tensors="pt")
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            with torch.no_grad():
-                generated_ids = self.model.generate(inputs["input_features"], language="vi")
-            transcription = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-            return transcription
-        except Exception as e:
-            logger.error(f"Error during transcription: {str(e)}")
-            raise
 
-# Load mô hình dịch
-class TranslationModel:
-    def __init__(self):
-        self.model_name = "models/opus-mt-vi-en"
-        try:
-            self.tokenizer = MarianTokenizer.from_pretrained(self.model_name)
-            self.model = MarianMTModel.from_pretrained(self.model_name)
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.model.to(self.device)
-            self.model.eval()
-            logger.info("Translation model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load Translation model: {str(e)}")
-            raise
+def _profile_key(item):
+    return item[1]
 
-    def translate(self, text):
-        try:
-            inputs = self.tokenizer(text, return_tensors="pt", padding=True)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            with torch.no_grad():
-                translated = self.model.generate(**inputs)
-            translation = self.tokenizer.decode(translated[0], skip_special_tokens=True)
-            return translation
-        except Exception as e:
-            logger.error(f"Error during translation: {str(e)}")
-            raise
+whisper_version = model_fingerprint(settings.WHISPER_MODEL_PATH, settings.WHISPER_BACKEND)
+
+# Gom các yêu cầu đồng thời thành batch
+transcription_batcher = MicroBatcher(
+    _batch_fn('phowhisper', 'transcribe_batch'),
+    name='transcription',
+    max_batch_size=settings.TRANSCRIPTION_BATCH_MAX_SIZE,
+    max_wait=settings.TRANSCRIPTION_BATCH_WAIT_MS / 1000,
+    concurrency=max(1, settings.INFERENCE_WORKERS),
+    key=_profile_key,
+)
+translation_batcher = MicroBatcher(
+    _batch_fn('translator', 'translate_batch'),
+    name='translation',
+    max_batch_size=settings.TRANSLATION_BATCH_MAX_SIZE,
+    max_wait=settings.TRANSLATION_BATCH_WAIT_MS / 1000,
+    concurrency=max(1, settings.INFERENCE_WORKERS),
+    key=_profile_key,
+)
+pipeline_executor = ThreadPoolExecutor(max_workers=settings.PIPELINE_WORKERS, thread_name_prefix='pipeline')
+
+def audio_upload_error(request):
+    """Error response for a missing, rejected or oversized `audio` upload (None when it is usable)."""
+    audio_file = request.FILES.get('audio')  # chạy multipart parser và AudioUploadHandler
+    error = getattr(request, 'audio_upload_error', None)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    if audio_file is None:
+        return Response({'error': 'No audio file provided'}, status=status.HTTP_400_BAD_REQUEST)
+    if audio_file.size > settings.AUDIO_UPLOAD_MAX_BYTES:
+        return Response(
+            {'error': f"File too large, maximum size is {settings.AUDIO_UPLOAD_MAX_BYTES // (1024 * 1024)}MB"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def decode_upload(audio_file):
+    if isinstance(audio_file, DecodedAudioFile):
+        return audio_file.samples  # đã giải mã trong lúc nhận upload
+    # Upload qua handler khác: giải mã trực tiếp trong bộ nhớ; Django chỉ ghi ra file tạm
+    # với upload lớn hơn FILE_UPLOAD_MAX_MEMORY_SIZE
+    with metrics.stage('upload_read'):
+        audio_file.seek(0)
+        data = io.BytesIO(audio_file.read())
+    with metrics.stage('normalize'):
+        return decode_audio(data)
+
+
+def overloaded_response(error):
+    return Response(
+        {'error': str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(error.retry_after)},
+    )
+
+
+def describe_text(text):
+    """Text for log lines: the payload itself only when LOG_TEXT_PAYLOADS is on."""
+    return text if settings.LOG_TEXT_PAYLOADS else f"<{len(text)} chars>"
+
+
+def speech_segments(samples, sampling_rate=WHISPER_SAMPLE_RATE):
+    """
+    Split 16kHz mono samples into units for Whisper.
+
+    Leading/trailing silence is trimmed and the audio is split on long pauses;
+    a silent clip yields no segments. Speech longer than Whisper's 30s window
+    is split further into overlapping windows. Returns one list of
+    (start_s, end_s, samples) windows per speech segment.
+    """
+    if settings.VAD_ENABLED:
+        segments = detect_speech(
+            samples, sampling_rate,
+            threshold_db=settings.VAD_THRESHOLD_DB,
+            min_silence_s=settings.VAD_MIN_SILENCE_SECONDS,
+        )
+    else:
+        segments = [(0, len(samples))]
+
+    pieces = []
+    for seg_start, seg_end in segments:
+        offset = seg_start / sampling_rate
+        windows = split_windows(
+            samples[seg_start:seg_end], sampling_rate,
+            window_s=WHISPER_WINDOW_SECONDS,
+            overlap_s=settings.LONG_FORM_OVERLAP_SECONDS,
+        )
+        pieces.append([(offset + start, offset + end, window) for start, end, window in windows])
+    return pieces
+
+
+def transcribe_samples(samples, sampling_rate=WHISPER_SAMPLE_RATE, profile=None, priority=PRIORITY_INTERACTIVE):
+    """
+    Transcribe 16kHz mono samples of any length.
 
-# Khởi tạo các mô hình (dùng try-except để xử lý lỗi khởi tạo)
-try:
-    phowhisper = PhoWhisper()
-    translator = TranslationModel()
-except Exception as e:
-    logger.critical(f"Failed to initialize models: {str(e)}")
-    raise
+    A silent clip returns an empty result without touching the model. All
+    speech windows are submitted together, so they are decoded as one batch.
+    Background callers (jobs) pass a lower `priority` so their windows only
+    take batch slots that interactive requests leave free; they wait without
+    the interactive TRANSCRIPTION_TIMEOUT. Returns the transcription and the
+    per-chunk transcripts with timestamps.
+    """
+    profile = get_profile(profile, settings.DECODING_PROFILE)
+    pieces = speech_segments(samples, sampling_rate)
+    if not pieces:
+        logger.info("No speech detected, skipping transcription")
+        return "", []
+
+    futures = [
+        [transcription_batcher.submit((window, profile), priority) for _, _, window in windows] for windows in pieces
+    ]
+    timeout = settings.TRANSCRIPTION_TIMEOUT if priority == PRIORITY_INTERACTIVE else None
+    texts = [[future.result(timeout=timeout) for future in group] for group in futures]
+
+    chunks = [
+        {'start': round(start, 2), 'end': round(end, 2), 'text': text}
+        for windows, group in zip(pieces, texts)
+        for (start, end, _), text in zip(windows, group)
+    ]
+    # Các cửa sổ trong cùng một đoạn chồng lấn nhau; giữa các đoạn thì không
+    transcription = " ".join(filter(None, (stitch_transcripts(group) for group in texts)))
+    return transcription, chunks
+
+
+def translate_text(text, profile=None, admission=translation_admission):
+    """
+    Translate sentence by sentence through the cache, the translation
+    memory and the batcher.
+
+    Sentences missing from the exact cache are looked up in the translation
+    memory (same words, differing only in case or punctuation); the rest are submitted at once so the batcher can
+    translate them together. The output keeps the input's sentence and
+    paragraph order. Returns (translation, cached, match_score): `cached` is
+    True when no sentence needed the model, `match_score` is the lowest
+    memory similarity used (None when no sentence came from the memory).
+
+    Only requests that need the model go through `admission`, which raises
+    Overloaded when the translation model is saturated.
+    """
+    profile = get_profile(profile, settings.DECODING_PROFILE)
+    params = {'profile': profile}
+    paragraphs = segment_text(text, settings.TRANSLATION_MAX_SENTENCE_CHARS)
+    sentences = [sentence for sentences in paragraphs for sentence in sentences]
+    translations = [translation_cache.get(sentence, params) for sentence in sentences]
+    scores = []
+    for i, sentence in enumerate(sentences):
+        if translations[i] is None:
+            match = translation_memory.lookup(sentence, profile)
+            if match is not None:
+                translations[i], score = match
+                scores.append(score)
+    missing = [i for i, translation in enumerate(translations) if translation is None]
+    with admission.admit() if admission is not None and missing else nullcontext():
+        pending = {i: translation_batcher.submit((sentences[i], profile)) for i in missing}
+        for i, future in pending.items():
+            translations[i] = future.result()
+            translation_cache.set(sentences[i], translations[i], params)
+            translation_memory.add(sentences[i], translations[i], profile)
+    match_score = round(min(scores), 4) if scores else None
+    return reassemble(paragraphs, translations), not pending, match_score
+
+
+def synthesize_speech(text):
+    """Synthesize into the TTS store. Returns (url, cached)."""
+    backend = get_tts_backend()
+    key = tts_store.key(text, **backend.voice())
+    filename, cached = tts_store.get_or_create(
+        key, lambda path: backend.synthesize(text, path), backend.extension
+    )
+    return f"{settings.BASE_URL}/media/tts/{filename}", cached  # Dùng BASE_URL
+
+
+def run_speech_pipeline(samples, profile=None):
+    """
+    Speech-to-speech pipeline: PhoWhisper -> Marian -> TTS.
+
+    Every speech segment runs through the three stages in its own pipeline
+    thread. All Whisper windows are submitted up front so they share
+    batches; as soon as one segment is transcribed its translation starts,
+    and synthesis starts as soon as its translation is ready, while other
+    segments are still in earlier stages.
+    """
+    profile = get_profile(profile, settings.DECODING_PROFILE)
+    pieces = speech_segments(samples)
+    futures = [[transcription_batcher.submit((window, profile)) for _, _, window in windows] for windows in pieces]
+    started = time.perf_counter()
+
+    def run_segment(windows, window_futures):
+        timings = {}
+        texts = [future.result(timeout=settings.TRANSCRIPTION_TIMEOUT) for future in window_futures]
+        transcription = stitch_transcripts(texts)
+        timings['transcribe_done_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        segment = {
+            'start': round(windows[0][0], 2),
+            'end': round(windows[-1][1], 2),
+            'transcription': transcription,
+            'translation': '',
+            'match_score': None,
+            'url': None,
+        }
+        if transcription:
+            stage_start = time.perf_counter()
+            # Pipeline đã được nhận qua whisper_admission, không bị loại giữa chừng
+            segment['translation'], _, segment['match_score'] = translate_text(transcription, profile, admission=None)
+            timings['translate_ms'] = round((time.perf_counter() - stage_start) * 1000, 1)
+
+        if segment['translation']:
+            stage_start = time.perf_counter()
+            segment['url'], _ = synthesize_speech(segment['translation'])
+            timings['tts_ms'] = round((time.perf_counter() - stage_start) * 1000, 1)
+        timings['done_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        segment['timings'] = timings
+        return segment
+
+    segment_futures = [
+        pipeline_executor.submit(run_segment, windows, window_futures)
+        for windows, window_futures in zip(pieces, futures)
+    ]
+    return [future.result() for future in segment_futures]
 
 class TranscribeView(APIView):
     parser_classes = [MultiPartParser]
+    token_bucket_scope = 'model'
 
     def post(self, request):
         """
@@ -92,7 +282,12 @@ class TranscribeView(APIView):
             in: formData
             type: file
             required: true
-            description: Audio file in WAV format (max 10MB)
+            description: Audio file (WAV, FLAC or Ogg/Opus; max 10MB)
+          - name: profile
+            in: formData
+            type: string
+            required: false
+            description: Decoding profile (fast, balanced or accurate; defaults to DECODING_PROFILE)
         responses:
           200:
             description: Transcription successful
@@ -102,46 +297,47 @@ class TranscribeView(APIView):
                 transcription:
                   type: string
                   description: Transcribed text
+                chunks:
+                  type: array
+                  description: Per-window transcripts with start/end timestamps (seconds)
+                cached:
+                  type: boolean
+                  description: Whether the result was served from the audio fingerprint cache
           400:
             description: Bad request (e.g., invalid file, file too large)
+          429:
+            description: Client rate limit exceeded (see Retry-After)
+          503:
+            description: Transcription model overloaded (see Retry-After)
         """
         try:
-            # Kiểm tra file âm thanh
-            if 'audio' not in request.FILES:
-                return Response({'error': 'No audio file provided'}, status=status.HTTP_400_BAD_REQUEST)
-            
+            # Kiểm tra file âm thanh (định dạng được nhận diện theo nội dung, không theo đuôi file)
+            error = audio_upload_error(request)
+            if error is not None:
+                return error
             audio_file = request.FILES['audio']
-            if audio_file.size > 10 * 1024 * 1024:  # 10MB
-                return Response({'error': 'File too large, maximum size is 10MB'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Kiểm tra định dạng file
-            if not audio_file.name.lower().endswith('.wav'):
-                return Response({'error': 'Only WAV files are supported'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Lưu file tạm
-            temp_dir = Path('media/temp_audio')
-            temp_dir.mkdir(parents=True, exist_ok=True)
-            temp_path = temp_dir / 'audio.wav'
-            
             try:
-                with open(temp_path, 'wb') as f:
-                    for chunk in audio_file.chunks():
-                        f.write(chunk)
-                
-                # Chuẩn hóa file âm thanh
-                audio = pydub.AudioSegment.from_file(temp_path)
-                audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)  # Mono, 16kHz, 16-bit
-                audio.export(temp_path, format='wav')
-
-                logger.info(f"Processing audio file: {temp_path}")
-                transcription = phowhisper.transcribe(temp_path)
-                logger.info(f"Transcription completed: {transcription}")
-                return Response({'transcription': transcription})
-            finally:
-                # Đảm bảo xóa file tạm ngay cả khi có lỗi
-                if temp_path.exists():
-                    os.remove(temp_path)
-                    logger.debug(f"Temporary file removed: {temp_path}")
+                profile = get_profile(request.data.get('profile'), settings.DECODING_PROFILE)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            samples = decode_upload(audio_file)
+
+            logger.info(f"Processing audio upload: {audio_file.name} ({len(samples) / WHISPER_SAMPLE_RATE:.1f}s)")
+            key = audio_fingerprint(samples, whisper_version, profile)
+            result = transcription_cache.get(key)
+            cached = result is not None
+            if not cached:
+                with whisper_admission.admit():
+                    result = transcribe_samples(samples, profile=profile)
+                transcription_cache.set(key, result)
+            transcription, chunks = result
+            logger.info(f"Transcription completed (cached={cached}): {describe_text(transcription)}")
+            history_writer.record(TranslationHistory.KIND_TRANSCRIBE, input_text=transcription)
+            return Response({'transcription': transcription, 'chunks': chunks, 'cached': cached})
+        except Overloaded as e:
+            logger.warning(f"Transcription rejected: {str(e)}")
+            return overloaded_response(e)
         except pydub.exceptions.PydubException as e:
             logger.error(f"Error processing audio file with pydub: {str(e)}")
             return Response({'error': 'Invalid audio file format'}, status=status.HTTP_400_BAD_REQUEST)
@@ -150,6 +346,8 @@ class TranscribeView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class TranslateView(APIView):
+    token_bucket_scope = 'model'
+
     def post(self, request):
         """
         Translate text from Vietnamese to English using MarianMT model.
@@ -160,6 +358,11 @@ class TranslateView(APIView):
             type: string
             required: true
             description: Text to translate (Vietnamese)
+          - name: profile
+            in: body
+            type: string
+            required: false
+            description: Decoding profile (fast, balanced or accurate; defaults to DECODING_PROFILE)
         responses:
           200:
             description: Translation successful
@@ -169,26 +372,48 @@ class TranslateView(APIView):
                 translation:
                   type: string
                   description: Translated text (English)
+                cached:
+                  type: boolean
+                  description: Whether the translation was served without running the model
+                match_score:
+                  type: number
+                  description: Lowest translation-memory similarity (0-1) among reused sentences, null if none
           400:
             description: Bad request (e.g., missing text)
+          429:
+            description: Client rate limit exceeded (see Retry-After)
+          503:
+            description: Translation model overloaded (see Retry-After)
         """
         try:
             text = request.data.get('text')
             if not text or not isinstance(text, str) or text.strip() == "":
                 return Response({'error': 'Text is required and cannot be empty'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            logger.info(f"Translating text: {text}")
-            translation = translator.translate(text)
-            logger.info(f"Translation completed: {translation}")
-            return Response({'translation': translation})
+            try:
+                profile = get_profile(request.data.get('profile'), settings.DECODING_PROFILE)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            logger.info(f"Translating text: {describe_text(text)}")
+            translation, cached, match_score = translate_text(text, profile)
+            logger.info(
+                f"Translation completed (cached={cached}, match_score={match_score}): {describe_text(translation)}"
+            )
+            history_writer.record(TranslationHistory.KIND_TRANSLATE, input_text=text, translation=translation)
+            return Response({'translation': translation, 'cached': cached, 'match_score': match_score})
+        except Overloaded as e:
+            logger.warning(f"Translation rejected: {str(e)}")
+            return overloaded_response(e)
         except Exception as e:
             logger.error(f"Error in TranslateView: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class TTSView(APIView):
+    token_bucket_scope = 'model'
+
     def post(self, request):
         """
-        Convert text to speech using gTTS (Google Text-to-Speech).
+        Convert text to speech using the configured TTS backend (gTTS or offline pyttsx3).
         ---
         parameters:
           - name: text
@@ -196,6 +421,11 @@ class TTSView(APIView):
             type: string
             required: true
             description: Text to convert to speech (English)
+          - name: stream
+            in: body
+            type: boolean
+            required: false
+            description: Stream the audio in the response body instead of returning a URL
         responses:
           200:
             description: TTS successful
@@ -204,7 +434,10 @@ class TTSView(APIView):
               properties:
                 url:
                   type: string
-                  description: URL to the generated audio file (MP3)
+                  description: URL to the generated audio file (MP3 for gTTS, WAV for pyttsx3)
+                cached:
+                  type: boolean
+                  description: Whether an existing file for the same text was reused
           400:
             description: Bad request (e.g., missing text)
         """
@@ -213,32 +446,240 @@ class TTSView(APIView):
             if not text or not isinstance(text, str) or text.strip() == "":
                 return Response({'error': 'Text is required and cannot be empty'}, status=status.HTTP_400_BAD_REQUEST)
             
-            tts_dir = Path('media/tts')
-            tts_dir.mkdir(parents=True, exist_ok=True)
-            filename = f"{uuid.uuid4()}.mp3"
-            file_path = tts_dir / filename
-            
+            if str(request.data.get('stream', '')).lower() in ('1', 'true'):
+                history_writer.record(TranslationHistory.KIND_TTS, input_text=text)
+                backend = get_tts_backend()
+                key = tts_store.key(text, **backend.voice())
+                # Trả âm thanh ngay khi tổng hợp xong từng phần, đồng thời lưu vào store
+                path = tts_store.open_cached(key, backend.extension)
+                if path is not None:
+                    return FileResponse(open(path, 'rb'), content_type=backend.content_type)
+                chunks = tts_store.tee(key, backend.stream(text), backend.extension, backend.finalize_stream)
+                return StreamingHttpResponse(chunks, content_type=backend.content_type)
+
             try:
-                tts = gTTS(text=text, lang='en')
-                tts.save(file_path)
-                url = f"{settings.BASE_URL}/media/tts/{filename}"  # Dùng BASE_URL
-                logger.info(f"TTS file created: {url}")
-                return Response({'url': url})
+                url, cached = synthesize_speech(text)
             except Exception as e:
                 logger.error(f"Error generating TTS: {str(e)}")
-                if file_path.exists():
-                    os.remove(file_path)
-                    logger.debug(f"Temporary TTS file removed: {file_path}")
                 raise
+            logger.info(f"TTS {'cache hit' if cached else 'file created'}: {url}")
+            history_writer.record(TranslationHistory.KIND_TTS, input_text=text, speech_url=url)
+            return Response({'url': url, 'cached': cached})
         except Exception as e:
             logger.error(f"Error in TTSView: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class PipelineView(APIView):
+    parser_classes = [MultiPartParser]
+    token_bucket_scope = 'model'
+
+    def post(self, request):
+        """
+        Speech-to-speech in one call: transcribe, translate and synthesize server-side.
+        ---
+        parameters:
+          - name: audio
+            in: formData
+            type: file
+            required: true
+            description: Audio file (WAV, FLAC or Ogg/Opus; max 10MB)
+          - name: profile
+            in: formData
+            type: string
+            required: false
+            description: Decoding profile (fast, balanced or accurate; defaults to DECODING_PROFILE)
+        responses:
+          200:
+            description: Pipeline successful
+            schema:
+              type: object
+              properties:
+                transcription:
+                  type: string
+                  description: Transcribed text (Vietnamese)
+                translation:
+                  type: string
+                  description: Translated text (English)
+                segments:
+                  type: array
+                  description: Per-segment transcription, translation, translation-memory match score, audio URL and stage timings
+                timings:
+                  type: object
+                  description: Wall-clock time per stage in milliseconds
+          400:
+            description: Bad request (e.g., invalid file, file too large)
+          429:
+            description: Client rate limit exceeded (see Retry-After)
+          503:
+            description: Transcription model overloaded (see Retry-After)
+        """
+        try:
+            error = audio_upload_error(request)
+            if error is not None:
+                return error
+            audio_file = request.FILES['audio']
+            try:
+                profile = get_profile(request.data.get('profile'), settings.DECODING_PROFILE)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            started = time.perf_counter()
+            samples = decode_upload(audio_file)
+            decode_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            with whisper_admission.admit():
+                segments = run_speech_pipeline(samples, profile)
+            total_ms = round((time.perf_counter() - started) * 1000, 1)
+            timings = {
+                'decode_ms': decode_ms,
+                'transcribe_ms': max((s['timings']['transcribe_done_ms'] for s in segments), default=0.0),
+                'translate_ms': round(sum(s['timings'].get('translate_ms', 0.0) for s in segments), 1),
+                'tts_ms': round(sum(s['timings'].get('tts_ms', 0.0) for s in segments), 1),
+                'total_ms': total_ms,
+            }
+            logger.info(f"Pipeline completed: {len(segments)} segments in {total_ms}ms")
+            transcription = " ".join(s['transcription'] for s in segments if s['transcription'])
+            translation = " ".join(s['translation'] for s in segments if s['translation'])
+            urls = [s['url'] for s in segments if s['url']]
+            history_writer.record(
+                TranslationHistory.KIND_PIPELINE, input_text=transcription, translation=translation,
+                speech_url=urls[0] if len(urls) == 1 else None,  # nhiều đoạn: URL nằm trong từng segment
+            )
+            return Response({
+                'transcription': transcription,
+                'translation': translation,
+                'segments': segments,
+                'timings': timings,
+            })
+        except Overloaded as e:
+            logger.warning(f"Pipeline rejected: {str(e)}")
+            return overloaded_response(e)
+        except pydub.exceptions.PydubException as e:
+            logger.error(f"Error processing audio file with pydub: {str(e)}")
+            return Response({'error': 'Invalid audio file format'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error in PipelineView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class JobListView(APIView):
+    parser_classes = [MultiPartParser]
+    token_bucket_scope = 'model'
+
+    def post(self, request):
+        """
+        Submit an audio file for asynchronous transcription.
+        ---
+        parameters:
+          - name: audio
+            in: formData
+            type: file
+            required: true
+            description: Audio file (WAV, FLAC or Ogg/Opus; max 10MB)
+          - name: priority
+            in: formData
+            type: integer
+            required: false
+            description: Higher priorities run first (default 0)
+          - name: profile
+            in: formData
+            type: string
+            required: false
+            description: Decoding profile (fast, balanced or accurate; defaults to DECODING_PROFILE)
+        responses:
+          202:
+            description: Job accepted
+            schema:
+              type: object
+              properties:
+                id:
+                  type: string
+                  description: Job id to poll at api/v1/jobs/<id>/
+          400:
+            description: Bad request (e.g., invalid file, file too large)
+        """
+        try:
+            error = audio_upload_error(request)
+            if error is not None:
+                return error
+            audio_file = request.FILES['audio']
+            try:
+                priority = int(request.data.get('priority', 0))
+            except (TypeError, ValueError):
+                return Response({'error': 'Priority must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                profile = get_profile(request.data.get('profile'), settings.DECODING_PROFILE)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            samples = decode_upload(audio_file)
+            job = job_queue.submit(samples, priority=priority, profile=profile)
+            logger.info(f"Transcription job queued: {job.id} ({job.duration:.1f}s, priority {priority})")
+            return Response(TranscriptionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        except pydub.exceptions.PydubException as e:
+            logger.error(f"Error processing audio file with pydub: {str(e)}")
+            return Response({'error': 'Invalid audio file format'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error in JobListView: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class JobDetailView(APIView):
+    def get(self, request, job_id):
+        """
+        Get the status (and result) of a transcription job.
+        ---
+        parameters:
+          - name: wait
+            in: query
+            type: number
+            required: false
+            description: Long-poll up to this many seconds for the job to finish
+        responses:
+          200:
+            description: Job status; result holds transcription and chunks when done
+          404:
+            description: Job not found
+        """
+        try:
+            wait = min(float(request.query_params.get('wait', 0)), settings.JOB_MAX_WAIT)
+        except ValueError:
+            return Response({'error': 'wait must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        job_queue.start()
+        try:
+            job = job_queue.wait(job_id, wait)
+        except TranscriptionJob.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(TranscriptionJobSerializer(job).data)
+
+    def delete(self, request, job_id):
+        """
+        Cancel a queued transcription job.
+        ---
+        responses:
+          200:
+            description: Job cancelled
+          404:
+            description: Job not found
+          409:
+            description: Job already running or finished
+        """
+        job_queue.start()
+        if not TranscriptionJob.objects.filter(pk=job_id).exists():
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not job_queue.cancel(job_id):
+            return Response({'error': 'Job is already running or finished'}, status=status.HTTP_409_CONFLICT)
+        return Response(TranscriptionJobSerializer(TranscriptionJob.objects.get(pk=job_id)).data)
+
 class PingView(APIView):
     def get(self, request):
         """
-        Check if the API server is running.
+        Check if the API server is running (liveness) and whether the models are loaded (readiness).
         ---
+        parameters:
+          - name: check
+            in: query
+            type: string
+            required: false
+            description: Pass "ready" to get HTTP 503 until all models are loaded
         responses:
           200:
             description: Server is running
@@ -248,5 +689,165 @@ class PingView(APIView):
                 status:
                   type: string
                   description: Server status
+                ready:
+                  type: boolean
+                  description: Whether all models are loaded
+                models:
+                  type: object
+                  description: Load state per model (not_loaded, loading, loaded, failed)
+          503:
+            description: Models not loaded yet (only with check=ready)
+        """
+        models = model_status()
+        ready = all(state == 'loaded' for state in models.values())
+        payload = {'status': 'ok', 'ready': ready, 'models': models}
+        if request.query_params.get('check') == 'ready' and not ready:
+            return Response(payload, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(payload)
+
+class StatsView(APIView):
+    def get(self, request):
+        """
+        Report inference batching and cache statistics.
+        ---
+        responses:
+          200:
+            description: Queue depth and batch size statistics per batcher
+        """
+        return Response({
+            'transcription': transcription_batcher.stats(),
+            'translation': translation_batcher.stats(),
+            'transcription_cache': transcription_cache.stats(),
+            'translation_cache': translation_cache.stats(),
+            'translation_memory': translation_memory.stats(),
+            'tts_store': tts_store.stats(),
+            'jobs': job_queue.stats(),
+            'admission': {
+                'whisper': whisper_admission.stats(),
+                'translation': translation_admission.stats(),
+            },
+            'history': history_writer.stats(),
+            'inference_pool': inference_pool_stats(),
+        })
+
+class HistoryView(APIView):
+    def get(self, request):
+        """
+        List recorded transcribe/translate/TTS/pipeline requests, newest first.
+        ---
+        parameters:
+          - name: q
+            in: query
+            type: string
+            required: false
+            description: Full-text search over input text and translation (all words must match)
+          - name: kind
+            in: query
+            type: string
+            required: false
+            description: Only this request type (transcribe, translate, tts or pipeline)
+          - name: cursor
+            in: query
+            type: string
+            required: false
+            description: next_cursor from the previous page
+          - name: limit
+            in: query
+            type: integer
+            required: false
+            description: Page size (defaults to HISTORY_PAGE_SIZE, at most HISTORY_MAX_PAGE_SIZE)
+        responses:
+          200:
+            description: One page of history
+            schema:
+              type: object
+              properties:
+                results:
+                  type: array
+                  description: History entries
+                next_cursor:
+                  type: string
+                  description: Cursor for the next page (null on the last page)
+          400:
+            description: Bad request (e.g., invalid cursor or kind)
+        """
+        try:
+            limit = int(request.query_params.get('limit', settings.HISTORY_PAGE_SIZE))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.HISTORY_MAX_PAGE_SIZE))
+
+        queryset = TranslationHistory.objects.all()
+        kind = request.query_params.get('kind')
+        if kind:
+            if kind not in dict(TranslationHistory.KIND_CHOICES):
+                return Response({'error': f"Unknown kind: {kind}"}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(kind=kind)
+        query = request.query_params.get('q', '').strip()
+        if query:
+            queryset = search(queryset, query)
+        try:
+            entries, next_cursor = page(queryset, request.query_params.get('cursor'), limit)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': TranslationHistorySerializer(entries, many=True).data,
+            'next_cursor': next_cursor,
+        })
+
+class MetricsView(APIView):
+    def get(self, request):
+        """
+        Prometheus text-format metrics.
+        ---
+        responses:
+          200:
+            description: Per-stage and request latency histograms, queue depths, cache hit rates and model memory
         """
-        return Response({'status': 'ok'})
\ No newline at end of file
+        lines = metrics.stage_seconds.render() + metrics.request_seconds.render()
+        batchers = {'transcription': transcription_batcher, 'translation': translation_batcher}
+        admission = {'whisper': whisper_admission, 'translation': translation_admission}
+        lines += metrics.render_gauge(
+            'trans_app_queue_depth', 'Items waiting in each inference batcher or job queue.',
+            [({'queue': name}, batcher.stats()['queue_depth']) for name, batcher in batchers.items()]
+            + [({'queue': 'jobs'}, job_queue.stats()['queue_depth'])]
+            + [({'queue': f'admission_{name}'}, controller.stats()['queue_depth'])
+               for name, controller in admission.items()],
+        )
+        lines += metrics.render_gauge(
+            'trans_app_in_flight', 'Requests currently admitted to each model.',
+            [({'model': name}, controller.stats()['in_flight']) for name, controller in admission.items()],
+        )
+        lines += metrics.render_gauge(
+            'trans_app_shed_total', 'Requests rejected by admission control, by reason.',
+            [({'model': name, 'reason': reason}, controller.stats()[key])
+             for name, controller in admission.items()
+             for reason, key in (('queue_full', 'rejected_queue_full'), ('deadline', 'rejected_deadline'),
+                                 ('timeout', 'timed_out'))],
+            kind='counter',
+        )
+        caches = {
+            'transcription': transcription_cache.stats(),
+            'translation': translation_cache.stats(),
+            'translation_memory': translation_memory.stats(),
+            'tts_store': tts_store.stats(),
+        }
+        lines += metrics.render_gauge(
+            'trans_app_cache_requests_total', 'Cache lookups by result.',
+            [({'cache': name, 'result': result}, stats[result])
+             for name, stats in caches.items() for result in ('hits', 'misses')],
+            kind='counter',
+        )
+        lines += metrics.render_gauge(
+            'trans_app_cache_hit_ratio', 'Fraction of cache lookups that were hits.',
+            [({'cache': name}, stats['hit_rate']) for name, stats in caches.items()],
+        )
+        lines += metrics.render_gauge(
+            'trans_app_model_memory_bytes', 'Bytes held by the weights of each loaded model.',
+            [({'model': name}, size) for name, size in model_memory().items()],
+        )
+        lines += metrics.render_gauge(
+            'trans_app_process_resident_memory_bytes', 'Resident memory of the web process.',
+            [({}, metrics.resident_memory())],
+        )
+        return HttpResponse("\n".join(lines) + "\n", content_type='text/plain; version=0.0.4; charset=utf-8')
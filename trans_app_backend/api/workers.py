@@ -0,0 +1,210 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashed(RuntimeError):
+    """An inference worker process died while calls were pending (or the pool gave up restarting it)."""
+
+
+def _worker_main(models, threads, tasks, results):
+    # Chạy trong tiến trình con: trọng số mô hình nằm trong shared memory của tiến trình cha
+    import torch
+
+    torch.set_num_threads(threads)
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, target, method, args, kwargs = task
+        # Thời gian từng bước được gửi về tiến trình cha cùng kết quả
+        with metrics.capture() as observations:
+            try:
+                with torch.inference_mode():
+                    value = getattr(models[target], method)(*args, **kwargs)
+                outcome = (task_id, True, value)
+            except Exception as e:
+                outcome = (task_id, False, f"{type(e).__name__}: {e}")
+        results.put(outcome + (observations,))
+
+
+class InferencePool:
+    """
+    Pool of inference worker processes sharing one copy of the model weights.
+
+    The parent loads the models once and moves their tensors into shared
+    memory; worker processes (started with `spawn`) receive handles to the
+    same storage, so RAM does not grow with the number of workers. Calls are
+    sent over a multiprocessing queue and resolved as Futures by a dispatcher
+    thread, so several batches can be in flight at once.
+
+    The dispatcher polls the result queue with a timeout and checks that the
+    workers are alive. When one dies (killed by the OOM killer, a native
+    crash), every pending call fails with WorkerCrashed, since it is unknown
+    which task the dead worker held. A worker killed mid-send can leave the
+    queues' shared locks held, so the queues are recreated and all workers
+    restarted; after `max_restarts` crashes the pool is marked broken and
+    new calls fail immediately instead of waiting forever.
+
+    The pool lives inside one web process: each server process that imports
+    the app starts its own pool and its own copy of the weights, so run a
+    single web process (e.g. `uvicorn` without `--workers`) when
+    INFERENCE_WORKERS > 0 and scale with the pool instead.
+    """
+
+    poll_interval = 1.0
+
+    def __init__(self, models, workers, threads, max_restarts=3):
+        self.models = models
+        self.workers = workers
+        self.threads = threads
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.broken = None  # lý do khi pool không còn dùng được
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._processes = []
+
+    def start(self):
+        import torch.multiprocessing as mp
+
+        for wrapper in self.models.values():
+            # Mô hình ONNX Runtime không phải nn.Module, mỗi worker giữ session riêng
+            for model in (wrapper.model, getattr(wrapper, 'assistant', None)):
+                if hasattr(model, 'share_memory'):
+                    model.share_memory()
+        self._start(mp.get_context('spawn'), _worker_main)
+        logger.info(f"Inference pool started: {self.workers} workers x {self.threads} threads")
+
+    def _start(self, ctx, worker_main):
+        self._ctx = ctx
+        self._worker_main = worker_main
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._processes = [self._spawn(i) for i in range(self.workers)]
+        threading.Thread(target=self._dispatch, name="inference-dispatcher", daemon=True).start()
+
+    def _spawn(self, index):
+        process = self._ctx.Process(
+            target=self._worker_main,
+            args=(self.models, self.threads, self._tasks, self._results),
+            name=f"inference-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def submit(self, target, method, *args, **kwargs):
+        future = Future()
+        if self.broken:
+            future.set_exception(WorkerCrashed(self.broken))
+            return future
+        task_id = next(self._ids)
+        # Đăng ký và đưa vào hàng đợi cùng lúc để không rơi vào hàng đợi vừa bị thay sau crash
+        with self._lock:
+            self._pending[task_id] = future
+            self._tasks.put((task_id, target, method, args, kwargs))
+        return future
+
+    def call(self, target, method, *args, timeout=None, **kwargs):
+        return self.submit(target, method, *args, **kwargs).result(timeout)
+
+    def _dispatch(self):
+        last_check = time.monotonic()
+        while True:
+            if time.monotonic() - last_check >= self.poll_interval:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                task_id, ok, value, observations = self._results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            metrics.replay(observations)
+            with self._lock:
+                future = self._pending.pop(task_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _check_workers(self):
+        dead = [i for i, process in enumerate(self._processes) if not process.is_alive()]
+        if not dead:
+            return
+        reason = ", ".join(f"{self._processes[i].name} exited with code {self._processes[i].exitcode}" for i in dead)
+        # Worker chết có thể còn giữ khóa đọc/ghi dùng chung của hàng đợi (vd. bị kill giữa lúc gửi kết quả),
+        # nên thay cả hai hàng đợi và khởi động lại mọi worker thay vì dùng tiếp hàng đợi cũ
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            old_tasks, self._tasks = self._tasks, self._ctx.Queue()
+            self._results = self._ctx.Queue()
+        old_tasks.cancel_join_thread()
+        for process in self._processes:
+            process.terminate()
+        logger.error(f"Inference worker died ({reason}); failing {len(pending)} pending calls")
+        for future in pending.values():
+            future.set_exception(WorkerCrashed(reason))
+        if self.restarts + len(dead) > self.max_restarts:
+            self.broken = f"inference pool stopped after {self.restarts} restarts ({reason})"
+            logger.error(self.broken)
+            return
+        self.restarts += len(dead)
+        self._processes = [self._spawn(i) for i in range(self.workers)]
+        logger.warning(f"Restarted inference workers after {len(dead)} crashed ({self.restarts}/{self.max_restarts} restarts)")
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._pending)
+        return {
+            'workers': self.workers,
+            'threads_per_worker': self.threads,
+            'alive': sum(process.is_alive() for process in self._processes),
+            'in_flight': in_flight,
+            'restarts': self.restarts,
+            'broken': self.broken,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_inference_pool():
+    """Return the process-wide pool, or None when INFERENCE_WORKERS is 0 (in-process inference)."""
+    global _pool
+    if settings.INFERENCE_WORKERS <= 0:
+        return None
+    if _pool is None:
+        from .inference import get_model
+
+        with _pool_lock:
+            if _pool is None:
+                if int(os.getenv('WEB_CONCURRENCY', '1')) > 1:
+                    # Mỗi tiến trình web có pool và bản trọng số riêng
+                    logger.warning("INFERENCE_WORKERS > 0 needs a single web process; WEB_CONCURRENCY is set above 1")
+                pool = InferencePool(
+                    {'phowhisper': get_model('phowhisper'), 'translator': get_model('translator')},
+                    workers=settings.INFERENCE_WORKERS,
+                    threads=settings.INFERENCE_THREADS,
+                )
+                pool.start()
+                _pool = pool
+    return _pool
+
+
+def inference_pool_stats():
+    """Pool statistics without starting it (None when not running)."""
+    return _pool.stats() if _pool is not None else None
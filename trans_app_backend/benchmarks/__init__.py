@@ -0,0 +1,13 @@
+"""
+Performance benchmarks for the backend.
+
+- `python -m benchmarks.micro`: model wrappers in-process (PhoWhisper,
+  MarianMT) across audio durations and text lengths.
+- `python -m benchmarks.load`: concurrent HTTP load on transcribe/,
+  translate/ and tts/ (offline with TTS_BACKEND=stub).
+- `python -m benchmarks.compare old.json new.json`: latency deltas between
+  two runs, e.g. before and after a commit.
+
+Run from trans_app_backend/. Results are written as JSON to
+benchmarks/results/ together with the git commit and environment.
+"""
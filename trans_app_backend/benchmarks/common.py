@@ -0,0 +1,139 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+from itertools import cycle, islice
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+VI_SENTENCES = [
+    "Xin chào, bạn có khỏe không?",
+    "Hôm nay trời đẹp quá, chúng ta đi dạo công viên nhé.",
+    "Tôi muốn đặt một bàn cho bốn người vào tối thứ sáu.",
+    "Cuộc họp sẽ bắt đầu lúc chín giờ sáng mai tại phòng hội nghị tầng ba.",
+    "Xin lỗi, bạn có thể nói chậm hơn một chút được không?",
+    "Giá vé tàu từ Hà Nội đến Thành phố Hồ Chí Minh là bao nhiêu?",
+    "Chúng tôi đã hoàn thành dự án trước thời hạn hai tuần.",
+    "Bác sĩ khuyên tôi nên uống nhiều nước và nghỉ ngơi đầy đủ.",
+]
+EN_SENTENCES = [
+    "Hello, how are you?",
+    "The weather is lovely today, let's take a walk in the park.",
+    "I would like to book a table for four on Friday evening.",
+    "The meeting starts at nine tomorrow morning in the third floor conference room.",
+]
+
+
+def vietnamese_text(sentences):
+    return " ".join(islice(cycle(VI_SENTENCES), sentences))
+
+
+def synthetic_speech(seconds, sample_rate=16000, seed=0):
+    """
+    Speech-like test signal: voiced harmonic bursts at syllable rate with
+    short pauses, loud enough to pass the VAD. Different seeds give
+    different audio (and therefore different cache keys).
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, np.pi))
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi)), 0, None)
+    pauses = (np.sin(2 * np.pi * 0.25 * t) > -0.7).astype(np.float32)
+    audio = 0.3 * voiced * syllables * pauses + 0.005 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+def fit_duration(audio, seconds, sample_rate=16000):
+    """Crop or tile a recording to exactly `seconds`."""
+    length = int(seconds * sample_rate)
+    repeats = -(-length // max(1, len(audio)))
+    return np.tile(audio, repeats)[:length]
+
+
+def summarize(latencies, wall_seconds=None, errors=0):
+    """Latency percentiles (ms) and throughput for a list of per-call durations in seconds."""
+    values = np.asarray(latencies, dtype=np.float64) * 1000
+    summary = {'count': len(values), 'errors': errors}
+    if len(values):
+        summary.update({
+            'mean_ms': round(float(values.mean()), 1),
+            'p50_ms': round(float(np.percentile(values, 50)), 1),
+            'p95_ms': round(float(np.percentile(values, 95)), 1),
+            'p99_ms': round(float(np.percentile(values, 99)), 1),
+            'max_ms': round(float(values.max()), 1),
+        })
+    wall = wall_seconds if wall_seconds is not None else values.sum() / 1000
+    summary['throughput_per_s'] = round(len(values) / wall, 2) if wall else 0.0
+    return summary
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ['git', *args], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def environment(**extra):
+    info = {
+        'commit': _git('rev-parse', '--short', 'HEAD') or 'unknown',
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    try:
+        import torch
+
+        info['torch'] = torch.__version__
+        info['torch_threads'] = torch.get_num_threads()
+    except ImportError:
+        pass
+    info.update(extra)
+    return info
+
+
+def save_results(kind, rows, output=None, **extra):
+    """Write rows plus environment metadata to JSON; returns the file path."""
+    env = environment(**extra)
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        output = RESULTS_DIR / f"{kind}-{env['commit']}-{stamp}.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'kind': kind,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'environment': env,
+            'results': rows,
+        }, f, ensure_ascii=False, indent=2)
+    return output
+
+
+def print_rows(rows):
+    for row in rows:
+        if not row.get('count'):
+            print(f"{row['name']:<24} no successful calls ({row.get('errors', 0)} errors{_rejections(row)})")
+            continue
+        print(
+            f"{row['name']:<24} n={row['count']:<5} err={row['errors']:<3} "
+            f"p50={row['p50_ms']:>8.1f}ms  p95={row['p95_ms']:>8.1f}ms  p99={row['p99_ms']:>8.1f}ms  "
+            f"{row['throughput_per_s']:>7.2f}/s{_rejections(row)}"
+        )
+
+
+def _rejections(row):
+    # Chỉ bài đo tải HTTP có số request bị từ chối (429/503)
+    if 'rate_limited' not in row:
+        return ''
+    return f"  429={row['rate_limited']} 503={row['overloaded']}"
@@ -0,0 +1,58 @@
+"""
+Compare two benchmark result files and flag latency regressions.
+
+    python -m benchmarks.compare results/micro-abc123-....json results/micro-def456-....json
+
+Exits with status 1 when any case's p50 or p95 grew by more than --threshold percent.
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s')
+CHECKED = ('p50_ms', 'p95_ms')
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data['environment'].get('commit', '?'), {row['name']: row for row in data['results']}
+
+
+def change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed latency increase in percent.")
+    args = parser.parse_args(argv)
+
+    old_commit, old = load(args.baseline)
+    new_commit, new = load(args.candidate)
+    print(f"{old_commit} -> {new_commit}")
+
+    regressions = []
+    for name in sorted(old.keys() & new.keys()):
+        cells = []
+        for metric in METRICS:
+            if metric not in old[name] or metric not in new[name]:
+                continue
+            delta = change(old[name][metric], new[name][metric])
+            cells.append(f"{metric}={new[name][metric]} ({delta:+.1f}%)")
+            if metric in CHECKED and delta > args.threshold:
+                regressions.append(f"{name} {metric}")
+        print(f"{name:<24} " + "  ".join(cells))
+    for name in sorted(old.keys() ^ new.keys()):
+        print(f"{name:<24} only in {'baseline' if name in old else 'candidate'}")
+
+    if regressions:
+        print(f"Regressions over {args.threshold}%: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
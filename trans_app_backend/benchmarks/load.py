@@ -0,0 +1,177 @@
+"""
+HTTP load generator for the transcribe/, translate/ and tts/ endpoints.
+
+Runs each endpoint at every concurrency level and reports latency
+percentiles and throughput. Point it at a running server started with
+TTS_BACKEND=stub, or let it start a local one (stub TTS, no ngrok lookup):
+
+    python -m benchmarks.load --serve --concurrency 1 4 16 --requests 100
+
+Inputs are unique per request by default so the caches do not hide model
+latency; pass --cached to repeat one input and measure the cache path.
+"""
+
+import argparse
+import io
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import soundfile as sf
+
+from .common import (
+    BACKEND_DIR, EN_SENTENCES, VI_SENTENCES, fit_duration, print_rows, save_results, summarize, synthetic_speech,
+)
+
+SAMPLE_RATE = 16000
+
+
+class Payloads:
+    """Request bodies for each endpoint; request `i` gets its own input unless `cached`."""
+
+    def __init__(self, audio_seconds, audio_path=None, cached=False):
+        self.cached = cached
+        self.audio_seconds = audio_seconds
+        self.source = None
+        if audio_path:
+            audio, sample_rate = sf.read(audio_path, dtype='float32', always_2d=True)
+            if sample_rate != SAMPLE_RATE:
+                raise SystemExit(f"--audio must be {SAMPLE_RATE}Hz (got {sample_rate}Hz)")
+            self.source = audio.mean(axis=1)
+
+    def _wav(self, i):
+        if self.source is not None:
+            audio = fit_duration(self.source, self.audio_seconds).copy()
+            # Thêm nhiễu rất nhỏ để mỗi request có fingerprint riêng
+            audio[i % len(audio)] += 1e-4 * (i + 1)
+        else:
+            audio = synthetic_speech(self.audio_seconds, SAMPLE_RATE, seed=i)
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, SAMPLE_RATE, format='WAV', subtype='PCM_16')
+        return buffer.getvalue()
+
+    def __call__(self, endpoint, i):
+        i = 0 if self.cached else i
+        if endpoint == 'transcribe':
+            return {'files': {'audio': ('bench.wav', self._wav(i), 'audio/wav')}}
+        if endpoint == 'translate':
+            text = VI_SENTENCES[i % len(VI_SENTENCES)]
+            return {'json': {'text': text if self.cached else f"{text} Mã số {i}."}}
+        text = EN_SENTENCES[i % len(EN_SENTENCES)]
+        return {'json': {'text': text if self.cached else f"{text} Number {i}."}}
+
+
+def run_level(base_url, endpoint, concurrency, total, payloads, timeout):
+    local = threading.local()
+    bodies = [payloads(endpoint, i) for i in range(total)]  # tạo sẵn để không tính vào độ trễ
+
+    def call(body):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            status_code = session.post(f"{base_url}/{endpoint}/", timeout=timeout, **body).status_code
+        except requests.RequestException:
+            status_code = None
+        return status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(call, bodies))
+    wall = time.perf_counter() - started
+
+    latencies = [elapsed for status_code, elapsed in outcomes if status_code == 200]
+    # 429 (rate limit) và 503 (admission control) là từ chối có chủ đích, không phải lỗi
+    rate_limited = sum(status_code == 429 for status_code, _ in outcomes)
+    overloaded = sum(status_code == 503 for status_code, _ in outcomes)
+    return {
+        'name': f"{endpoint}/c{concurrency}",
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        **summarize(latencies, wall, errors=len(outcomes) - len(latencies) - rate_limited - overloaded),
+        'rate_limited': rate_limited,
+        'overloaded': overloaded,
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(startup_timeout):
+    """
+    Start `manage.py runserver` with the stub TTS backend and wait until the models are loaded.
+
+    The per-client rate limit is disabled, since every benchmark request
+    comes from the same client; admission control stays on.
+    """
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, 'TTS_BACKEND': 'stub', 'BASE_URL': base_url, 'CLIENT_RATE_LIMIT': '0'}
+    process = subprocess.Popen(
+        [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("Server exited during startup")
+        try:
+            if requests.get(f"{base_url}/api/v1/ping/", params={'check': 'ready'}, timeout=2).status_code == 200:
+                return process, f"{base_url}/api/v1"
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    process.terminate()
+    raise SystemExit(f"Server not ready after {startup_timeout}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--serve", action="store_true", help="Start a local server (stub TTS) for the run.")
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument(
+        "--endpoints", nargs="+", default=['transcribe', 'translate', 'tts'], choices=['transcribe', 'translate', 'tts'],
+    )
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint and concurrency level.")
+    parser.add_argument("--audio", help="16kHz recording for transcribe/ (default: synthetic signal).")
+    parser.add_argument("--audio-seconds", type=float, default=5.0)
+    parser.add_argument("--cached", action="store_true", help="Send the same input every time (cache hits).")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/load-<commit>-<time>.json).")
+    args = parser.parse_args(argv)
+
+    server, base_url = start_server(args.startup_timeout) if args.serve else (None, args.base_url.rstrip('/'))
+    try:
+        payloads = Payloads(args.audio_seconds, args.audio, args.cached)
+        rows = []
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                row = run_level(base_url, endpoint, concurrency, args.requests, payloads, args.timeout)
+                print_rows([row])
+                rows.append(row)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    path = save_results(
+        'load', rows, args.output,
+        base_url=base_url, requests_per_level=args.requests,
+        audio_seconds=args.audio_seconds, cached=args.cached,
+    )
+    print(f"Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Microbenchmarks of PhoWhisper.transcribe and TranslationModel.translate.
+
+Models run in-process (no HTTP, batching or caches), one call at a time:
+
+    python -m benchmarks.micro --durations 5 10 30 --sentences 1 4 16
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import django
+
+from .common import (
+    fit_duration, print_rows, save_results, summarize, synthetic_speech, vietnamese_text,
+)
+
+
+def time_calls(func, repeat, warmup):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_whisper(args):
+    import soundfile as sf
+
+    from api.audio import WHISPER_SAMPLE_RATE, WHISPER_WINDOW_SECONDS, decode_audio
+    from api.inference import PhoWhisper
+
+    model = PhoWhisper()
+    source = decode_audio(args.audio, WHISPER_SAMPLE_RATE) if args.audio else None
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in args.durations:
+            # transcribe() đọc một cửa sổ Whisper (tối đa 30s)
+            seconds = min(seconds, WHISPER_WINDOW_SECONDS)
+            audio = (
+                fit_duration(source, seconds) if source is not None
+                else synthetic_speech(seconds, WHISPER_SAMPLE_RATE)
+            )
+            path = os.path.join(tmp, f"{seconds}s.wav")
+            sf.write(path, audio, WHISPER_SAMPLE_RATE)
+            timings = time_calls(lambda: model.transcribe(path, profile=args.profile), args.repeat, args.warmup)
+            summary = summarize(timings)
+            rows.append({
+                'name': f"phowhisper/{seconds:g}s",
+                'input': {'seconds': seconds},
+                **summary,
+                'realtime_factor': round(summary['p50_ms'] / 1000 / seconds, 3),
+            })
+    return rows
+
+
+def bench_translation(args):
+    from api.inference import TranslationModel
+
+    model = TranslationModel()
+    rows = []
+    for sentences in args.sentences:
+        text = vietnamese_text(sentences)
+        timings = time_calls(lambda: model.translate(text, profile=args.profile), args.repeat, args.warmup)
+        rows.append({
+            'name': f"translator/{sentences}sent",
+            'input': {'sentences': sentences, 'chars': len(text)},
+            **summarize(timings),
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=['phowhisper', 'translator'], choices=['phowhisper', 'translator'])
+    parser.add_argument("--audio", help="Speech recording cropped/tiled to each duration (default: synthetic signal).")
+    parser.add_argument("--durations", nargs="+", type=float, default=[5, 10, 20, 30], help="Audio lengths (s).")
+    parser.add_argument("--sentences", nargs="+", type=int, default=[1, 4, 16], help="Text lengths (sentences).")
+    parser.add_argument("--profile", help="Decoding profile (default: DECODING_PROFILE).")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/micro-<commit>-<time>.json).")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "trans_app.settings")
+    django.setup()
+    from django.conf import settings
+
+    rows = []
+    if 'phowhisper' in args.models:
+        rows += bench_whisper(args)
+    if 'translator' in args.models:
+        rows += bench_translation(args)
+    print_rows(rows)
+
+    path = save_results(
+        'micro', rows, args.output,
+        profile=args.profile or settings.DECODING_PROFILE,
+        whisper_backend=settings.WHISPER_BACKEND,
+        translation_backend=settings.TRANSLATION_BACKEND,
+        assisted_decoding=settings.WHISPER_ASSISTED_DECODING,
+    )
+    print(f"Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
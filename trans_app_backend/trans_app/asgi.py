@@ -2,15 +2,68 @@
 ASGI config for trans_app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections to ``/ws/v1/transcribe/``
+are handled by the streaming transcription endpoint. HTTP requests whose
+Content-Length exceeds MAX_REQUEST_BYTES are refused with 413 before Django
+reads (and spools) the body. Run with an ASGI server,
+e.g. ``uvicorn trans_app.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
+import json
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "trans_app.settings")
+os.environ.setdefault("TRANS_APP_SERVING", "1")  # bật warm-up mô hình khi khởi động
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Import sau khi Django đã được khởi tạo
+from api.streaming import transcription_stream  # noqa: E402
+
+websocket_routes = {
+    "/ws/v1/transcribe/": transcription_stream,
+}
+
+
+def content_length(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+async def reject_too_large(send):
+    body = json.dumps({"error": f"Request too large, maximum size is {settings.MAX_REQUEST_BYTES} bytes"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        handler = websocket_routes.get(scope["path"])
+        if handler is None:
+            await send({"type": "websocket.close", "code": 4404})
+            return
+        await handler(scope, receive, send)
+        return
+    if scope["type"] == "http" and (content_length(scope) or 0) > settings.MAX_REQUEST_BYTES:
+        await reject_too_large(send)
+        return
+    await django_application(scope, receive, send)
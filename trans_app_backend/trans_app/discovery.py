@@ -0,0 +1,116 @@
+"""
+Network discovery for the public API URL (local IP, ngrok tunnel, Firebase).
+
+Nothing here waits on the network at import time: BASE_URL is lazy,
+ALLOWED_HOSTS only needs the local IP (a UDP connect sends no packet), and
+the server resolves and publishes its URL from a background thread at
+startup, so management commands never block on ngrok or Firebase.
+"""
+
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+_lock = threading.Lock()
+_locks = {}
+_cache = {}
+
+
+def _cached(name, func):
+    # Chỉ dò mạng một lần cho mỗi tiến trình
+    with _lock:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _cache:
+            _cache[name] = func()
+        return _cache[name]
+
+
+# Function to get local IP
+def get_local_ip():
+    def probe():
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))  # Connect to Google DNS to get IP
+            ip = s.getsockname()[0]
+            s.close()
+            return ip
+        except Exception:
+            return '127.0.0.1'
+    return _cached('local_ip', probe)
+
+
+# Function to get ngrok public URL with retry mechanism
+def get_ngrok_url(max_retries=5, delay=2):
+    def probe():
+        for attempt in range(max_retries):
+            try:
+                response = requests.get("http://localhost:4040/api/tunnels", timeout=2)
+                response.raise_for_status()  # Kiểm tra lỗi HTTP
+                tunnels = response.json().get("tunnels", [])
+                for tunnel in tunnels:
+                    if tunnel.get("proto") == "https":
+                        return tunnel.get("public_url")  # Trả về full URL (bao gồm https://)
+            except (requests.RequestException, ValueError) as e:
+                print(f"Không thể lấy ngrok URL (lần thử {attempt + 1}/{max_retries}): {e}")
+                if attempt < max_retries - 1:
+                    time.sleep(delay)  # Chờ trước khi thử lại
+        return None
+    return _cached('ngrok_url', probe)
+
+
+def get_base_url():
+    # BASE_URL trong môi trường bỏ qua việc dò ngrok
+    override = os.getenv('BASE_URL')
+    if override:
+        return override.rstrip('/')
+    return get_ngrok_url() or f"http://{get_local_ip()}:8000"
+
+
+def default_allowed_hosts():
+    # Tên miền ngrok được cho phép theo hậu tố nên không cần dò tunnel trước
+    return [
+        '127.0.0.1', 'localhost', '0.0.0.0', get_local_ip(),
+        '.ngrok-free.app', '.ngrok-free.dev', '.ngrok.app', '.ngrok.io',
+    ]
+
+
+def publish_base_url():
+    """Resolve BASE_URL and store it in Firebase (when configured) so the mobile app can find the backend."""
+    # Luôn dò địa chỉ, kể cả khi không có Firebase, để lần dùng BASE_URL đầu tiên không phải chờ ngrok
+    base_url = get_base_url()
+    print(f"BASE_URL: {base_url}")
+    try:
+        import firebase_admin
+        from firebase_admin import credentials, db
+
+        cred_path = BASE_DIR / 'transapp-firebase-adminsdk.json'
+        if not cred_path.exists():
+            raise FileNotFoundError(f"Firebase credentials file not found at {cred_path}")
+
+        with open(cred_path, 'r') as f:
+            if not f.read().strip():
+                raise ValueError(f"Firebase credentials file is empty at {cred_path}")
+
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(cred_path)
+            firebase_admin.initialize_app(cred, {
+                'databaseURL': 'https://transapp-f4ceb-default-rtdb.firebaseio.com/'
+            })
+            print("Firebase initialized successfully")
+    except Exception as e:
+        print(f"Failed to initialize Firebase: {str(e)}")
+        # Tiếp tục chạy backend, nhưng không lưu URL vào Firebase
+        return
+
+    try:
+        db.reference('api_url').set(base_url)
+        print(f"Stored BASE_URL in Firebase: {base_url}")
+    except Exception as e:
+        print(f"Failed to store BASE_URL in Firebase: {str(e)}")
@@ -1,12 +1,8 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-import socket
-import requests
-import time
-from urllib.parse import urlparse
-import firebase_admin
-from firebase_admin import credentials, db
+from django.utils.functional import lazy
+from .discovery import default_allowed_hosts, get_base_url, get_local_ip
 
 # Load environment variables
 load_dotenv()
@@ -14,86 +10,19 @@ load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Khởi tạo Firebase với xử lý lỗi
-firebase_initialized = False
-try:
-    cred_path = BASE_DIR / 'transapp-firebase-adminsdk.json'
-    if not cred_path.exists():
-        raise FileNotFoundError(f"Firebase credentials file not found at {cred_path}")
-    
-    with open(cred_path, 'r') as f:
-        if not f.read().strip():
-            raise ValueError(f"Firebase credentials file is empty at {cred_path}")
-    
-    cred = credentials.Certificate(cred_path)
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://transapp-f4ceb-default-rtdb.firebaseio.com/'
-    })
-    firebase_initialized = True
-    print("Firebase initialized successfully")
-except Exception as e:
-    print(f"Failed to initialize Firebase: {str(e)}")
-    # Tiếp tục chạy backend, nhưng không lưu URL vào Firebase
-
-# Function to get local IP
-def get_local_ip():
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))  # Connect to Google DNS to get IP
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception:
-        return '127.0.0.1'
-
-# Function to get ngrok public URL with retry mechanism
-def get_ngrok_url(max_retries=5, delay=2):
-    for attempt in range(max_retries):
-        try:
-            response = requests.get("http://localhost:4040/api/tunnels")
-            response.raise_for_status()  # Kiểm tra lỗi HTTP
-            tunnels = response.json().get("tunnels", [])
-            for tunnel in tunnels:
-                if tunnel.get("proto") == "https":
-                    public_url = tunnel.get("public_url")
-                    return public_url  # Trả về full URL (bao gồm https://)
-        except (requests.RequestException, ValueError) as e:
-            print(f"Không thể lấy ngrok URL (lần thử {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(delay)  # Chờ trước khi thử lại
-    return None
-
-# Get local IP and ngrok URL
-LOCAL_IP = get_local_ip()
-NGROK_URL = get_ngrok_url()
-
-# Dùng NGROK_URL từ hàm get_ngrok_url()
-BASE_URL = NGROK_URL if NGROK_URL else f"http://{LOCAL_IP}:8000"
-
-# Lưu BASE_URL vào Firebase nếu Firebase được khởi tạo
-if BASE_URL and firebase_initialized:
-    try:
-        ref = db.reference('api_url')
-        ref.set(BASE_URL)
-        print(f"Stored BASE_URL in Firebase: {BASE_URL}")
-    except Exception as e:
-        print(f"Failed to store BASE_URL in Firebase: {str(e)}")
-else:
-    print("Skipping Firebase storage: Firebase not initialized or BASE_URL not available")
+# Địa chỉ public được dò lười (lần dùng đầu tiên), không chặn lúc import settings
+BASE_URL = lazy(get_base_url, str)()
 
 # Quick-start development settings
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'your-secret-key-here')
 DEBUG = os.getenv('DJANGO_DEBUG', 'False') == 'True'
 
 # Set ALLOWED_HOSTS dynamically
-default_hosts = ['127.0.0.1', 'localhost', '0.0.0.0', LOCAL_IP]
-NGROK_HOST = urlparse(BASE_URL).netloc if BASE_URL.startswith('https') else None
-if NGROK_HOST:
-    default_hosts.append(NGROK_HOST)
-    print(f"Đã thêm ngrok host vào ALLOWED_HOSTS: {NGROK_HOST}")
+if os.getenv('DJANGO_ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS').split(',')
 else:
-    print("Không tìm thấy ngrok host, sử dụng default ALLOWED_HOSTS")
-ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS', ','.join(default_hosts)).split(',')
+    # Danh sách thật (Django kiểm tra kiểu); get_local_ip không gửi gói tin nào nên không chặn
+    ALLOWED_HOSTS = default_allowed_hosts()
 
 # Application definition
 INSTALLED_APPS = [
@@ -118,6 +47,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.RequestTimingMiddleware',
 ]
 
 # CORS Configuration for Development
@@ -125,11 +55,11 @@ CORS_ALLOW_ALL_ORIGINS = True
 if not CORS_ALLOW_ALL_ORIGINS:
     default_origins = [
         'http://localhost:19006',
-        f'exp://{LOCAL_IP}:19000',
+        f'exp://{get_local_ip()}:19000',
         'http://localhost:8000',
     ]
-    if NGROK_HOST:
-        default_origins.append(f"https://{NGROK_HOST}")
+    if str(BASE_URL).startswith('https'):
+        default_origins.append(str(BASE_URL))
     CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', ','.join(default_origins)).split(',')
 else:
     CORS_ALLOWED_ORIGINS = []
@@ -163,6 +93,133 @@ SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
+# Đường dẫn mô hình
+WHISPER_MODEL_PATH = Path(os.getenv('WHISPER_MODEL_PATH', BASE_DIR / 'models' / 'PhoWhisper-small'))
+TRANSLATION_MODEL_PATH = Path(os.getenv('TRANSLATION_MODEL_PATH', BASE_DIR / 'models' / 'opus-mt-vi-en'))
+
+# Backend suy luận CPU cho từng mô hình: eager | int8 | compile | onnx
+# (artifact được cache trong models/<tên mô hình>/optimized/)
+WHISPER_BACKEND = os.getenv('WHISPER_BACKEND', 'eager')
+TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'eager')
+
+# Assisted decoding: mô hình nháp nhỏ đề xuất token, PhoWhisper-small kiểm tra
+# (chỉ áp dụng cho request dùng profile 'fast' - greedy, kết quả giống hệt greedy;
+# profile balanced/accurate luôn chạy beam search trên mô hình chính)
+WHISPER_ASSISTED_DECODING = os.getenv('WHISPER_ASSISTED_DECODING', 'False') == 'True'
+WHISPER_DRAFT_MODEL_PATH = Path(os.getenv('WHISPER_DRAFT_MODEL_PATH', BASE_DIR / 'models' / 'PhoWhisper-tiny'))
+
+# Nạp mô hình ở background khi server khởi động (lệnh manage.py khác không nạp)
+MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'True') == 'True'
+
+# Inference worker pool: số tiến trình suy luận dùng chung trọng số (0 = trong tiến trình web).
+# Pool thuộc về một tiến trình web: khi INFERENCE_WORKERS > 0 chỉ chạy MỘT tiến trình web
+# (uvicorn không có --workers, WEB_CONCURRENCY=1), nếu không mỗi tiến trình giữ một bản trọng số
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0'))
+INFERENCE_THREADS = int(os.getenv(
+    'INFERENCE_THREADS', str(max(1, (os.cpu_count() or 1) // max(1, INFERENCE_WORKERS)))
+))
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', '300'))  # tối đa cho một batch trong pool (giây)
+
+# Inference batching
+TRANSCRIPTION_BATCH_MAX_SIZE = int(os.getenv('TRANSCRIPTION_BATCH_MAX_SIZE', '4'))
+TRANSCRIPTION_BATCH_WAIT_MS = float(os.getenv('TRANSCRIPTION_BATCH_WAIT_MS', '50'))
+TRANSCRIPTION_TIMEOUT = float(os.getenv('TRANSCRIPTION_TIMEOUT', '120'))
+TRANSLATION_BATCH_MAX_SIZE = int(os.getenv('TRANSLATION_BATCH_MAX_SIZE', '16'))
+TRANSLATION_BATCH_WAIT_MS = float(os.getenv('TRANSLATION_BATCH_WAIT_MS', '10'))
+# Profile giải mã mặc định (fast | balanced | accurate), mỗi request có thể chọn profile riêng;
+# mặc định fast (greedy, 1 beam) để giữ độ trễ như cũ
+DECODING_PROFILE = os.getenv('DECODING_PROFILE', 'fast')
+# Văn bản dài được tách câu; mỗi batch được chia theo độ dài để giới hạn token đệm
+TRANSLATION_MAX_SENTENCE_CHARS = int(os.getenv('TRANSLATION_MAX_SENTENCE_CHARS', '400'))
+TRANSLATION_BATCH_MAX_TOKENS = int(os.getenv('TRANSLATION_BATCH_MAX_TOKENS', '4096'))
+LONG_FORM_OVERLAP_SECONDS = float(os.getenv('LONG_FORM_OVERLAP_SECONDS', '5'))
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '8'))
+
+# Admission control: số request được chạy mô hình cùng lúc và số request được xếp hàng chờ;
+# quá tải (hàng đợi đầy hoặc dự kiến chờ lâu hơn ADMISSION_MAX_WAIT giây) trả về 503 + Retry-After
+WHISPER_MAX_IN_FLIGHT = int(os.getenv(
+    'WHISPER_MAX_IN_FLIGHT', str(TRANSCRIPTION_BATCH_MAX_SIZE * max(1, INFERENCE_WORKERS))
+))
+WHISPER_ADMISSION_QUEUE = int(os.getenv('WHISPER_ADMISSION_QUEUE', '16'))
+TRANSLATION_MAX_IN_FLIGHT = int(os.getenv(
+    'TRANSLATION_MAX_IN_FLIGHT', str(TRANSLATION_BATCH_MAX_SIZE * max(1, INFERENCE_WORKERS))
+))
+TRANSLATION_ADMISSION_QUEUE = int(os.getenv('TRANSLATION_ADMISSION_QUEUE', '64'))
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', '10'))
+
+# Giới hạn theo client (token bucket) cho các endpoint chạy mô hình: CLIENT_RATE_LIMIT request/giây,
+# cho phép dồn tối đa CLIENT_RATE_BURST request; vượt quá trả về 429 (0 = tắt)
+CLIENT_RATE_LIMIT = float(os.getenv('CLIENT_RATE_LIMIT', '2'))
+CLIENT_RATE_BURST = float(os.getenv('CLIENT_RATE_BURST', '10'))
+
+# Voice activity detection: bỏ khoảng lặng trước khi đưa vào Whisper
+VAD_ENABLED = os.getenv('VAD_ENABLED', 'True') == 'True'
+VAD_THRESHOLD_DB = float(os.getenv('VAD_THRESHOLD_DB', '-45'))
+VAD_MIN_SILENCE_SECONDS = float(os.getenv('VAD_MIN_SILENCE_SECONDS', '0.6'))
+
+# Streaming transcription (WebSocket): giải mã tạm sau mỗi N giây âm thanh mới
+STREAMING_PARTIAL_INTERVAL = float(os.getenv('STREAMING_PARTIAL_INTERVAL', '1.0'))
+
+# Async transcription jobs
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_MAX_WAIT = float(os.getenv('JOB_MAX_WAIT', '30'))  # long-poll tối đa (giây)
+# Job đang chạy được gia hạn lease định kỳ; job running có lease hết hạn (tiến trình chủ
+# đã chết) mới được đưa lại vào hàng đợi, nên nhiều tiến trình không chạy trùng một job
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))
+# Âm thanh chờ xử lý của job: nằm ngoài MEDIA_ROOT để không bị phục vụ công khai qua /media/
+JOB_STORAGE_DIR = Path(os.getenv('JOB_STORAGE_DIR', BASE_DIR / 'job_storage'))
+
+# Translation cache (LRU trong tiến trình + bảng TranslationCacheEntry)
+TRANSLATION_CACHE_SIZE = int(os.getenv('TRANSLATION_CACHE_SIZE', '10000'))
+TRANSLATION_CACHE_PERSISTENT = os.getenv('TRANSLATION_CACHE_PERSISTENT', 'True') == 'True'
+# Chu kỳ (giây) kiểm tra cache có bị xóa từ tiến trình khác (clear_translation_cache, admin) không
+TRANSLATION_CACHE_GENERATION_CHECK = float(os.getenv('TRANSLATION_CACHE_GENERATION_CHECK', '5'))
+
+# Translation memory: câu chỉ khác câu đã dịch ở hoa/thường, khoảng trắng hoặc dấu câu
+# (cùng từ, cùng dấu thanh, cùng profile) được trả bản dịch cũ mà không chạy Marian
+TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', 'True') == 'True'
+TRANSLATION_MEMORY_SIZE = int(os.getenv('TRANSLATION_MEMORY_SIZE', '50000'))
+
+# Transcription cache theo dấu vân tay âm thanh (TTL tính bằng giây, 0 = không hết hạn)
+TRANSCRIPTION_CACHE_SIZE = int(os.getenv('TRANSCRIPTION_CACHE_SIZE', '256'))
+TRANSCRIPTION_CACHE_TTL = float(os.getenv('TRANSCRIPTION_CACHE_TTL', '3600'))
+
+# Lịch sử request (TranslationHistory): ghi theo lô bằng luồng nền, không chặn request
+HISTORY_ENABLED = os.getenv('HISTORY_ENABLED', 'True') == 'True'
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', '100'))
+HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', '1.0'))  # giây
+HISTORY_MAX_PENDING = int(os.getenv('HISTORY_MAX_PENDING', '10000'))  # đầy thì bỏ bản ghi mới
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '50'))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', '200'))
+
+# Ghi nội dung văn bản (transcription/translation) vào log; tắt mặc định vì tốn kém khi tải lớn
+LOG_TEXT_PAYLOADS = os.getenv('LOG_TEXT_PAYLOADS', 'False') == 'True'
+
+# TTS backend: 'gtts' (cần mạng), 'pyttsx3' (offline) hoặc 'stub' (chỉ dùng cho benchmark)
+TTS_BACKEND = os.getenv('TTS_BACKEND', 'gtts')
+TTS_LANG = os.getenv('TTS_LANG', 'en')
+TTS_RATE = int(os.getenv('TTS_RATE', '150'))
+TTS_VOLUME = float(os.getenv('TTS_VOLUME', '0.9'))
+TTS_STUB_DELAY_MS = float(os.getenv('TTS_STUB_DELAY_MS', '0'))  # độ trễ giả lập của backend 'stub'
+
+# TTS store: file âm thanh theo nội dung, dọn theo tuổi (giây) và tổng dung lượng (byte)
+TTS_STORE_MAX_BYTES = int(os.getenv('TTS_STORE_MAX_BYTES', str(500 * 1024 * 1024)))
+TTS_STORE_MAX_AGE = float(os.getenv('TTS_STORE_MAX_AGE', str(7 * 24 * 3600)))
+TTS_STORE_SWEEP_INTERVAL = float(os.getenv('TTS_STORE_SWEEP_INTERVAL', '600'))
+
+# Upload nhỏ hơn ngưỡng này được giữ trong bộ nhớ, lớn hơn thì Django ghi ra file tạm
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', str(5 * 1024 * 1024)))
+
+# Field 'audio' được kiểm tra định dạng (WAV/FLAC/Ogg Opus) và giải mã ngay khi đang nhận upload
+AUDIO_UPLOAD_MAX_BYTES = int(os.getenv('AUDIO_UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+FILE_UPLOAD_HANDLERS = [
+    'api.uploads.AudioUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Request lớn hơn mức này bị từ chối (413) ở tầng ASGI trước khi đọc body
+MAX_REQUEST_BYTES = AUDIO_UPLOAD_MAX_BYTES + 1024 * 1024
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -233,7 +290,8 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'rest_framework.throttling.UserRateThrottle',
+        'api.throttling.TokenBucketThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '1000/day',  # Tăng giới hạn cho development
@@ -12,5 +12,6 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "trans_app.settings")
+os.environ.setdefault("TRANS_APP_SERVING", "1")  # bật warm-up mô hình khi khởi động
 
 application = get_wsgi_application()